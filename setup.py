@@ -13,6 +13,11 @@ setup(
         "python-dateutil",
         "argcomplete"
     ],
+    extras_require={
+        "async": ["aiohttp"],
+        "numpy": ["numpy"],
+        "zstd": ["zstandard"],
+    },
     entry_points={
         "console_scripts": [
             "wikidata-update=wikidata_update.sparql_updates:main", 
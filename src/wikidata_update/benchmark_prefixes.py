@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import argparse
+import timeit
+from wikidata_update import ttl_compare
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values
+TRIPLES = 10000
+REPEAT = 5
+
+
+def linear_replace_prefixes(url):
+    # the former replace_prefixes, one str.replace per namespace
+    for uri, prefix in ttl_compare.PREFIXES.items():
+        url = url.replace(uri, f"{prefix}:")
+    return url
+
+
+def linear_has_prefix(element):
+    # the former has_prefix, one startswith per prefix
+    for prefix in ttl_compare.PREFIXES.values():
+        if element.startswith(f"{prefix}:"):
+            return True
+    return False
+
+
+def sample_terms(count):
+    """
+    Builds the subjects, predicates and objects of typical Wikidata triples.
+
+    Args:
+        count (int): The number of triples.
+
+    Returns:
+        list: The terms, three per triple.
+    """
+    terms = []
+    for i in range(count):
+        prop = f"P{i % 200}"
+        kind = i % 4
+        if kind == 0:
+            terms += [
+                "http://www.wikidata.org/entity/Q42",
+                f"http://www.wikidata.org/prop/direct/{prop}",
+                f"http://www.wikidata.org/entity/Q{i}",
+            ]
+        elif kind == 1:
+            terms += [
+                f"http://www.wikidata.org/entity/statement/Q42-{i:08x}",
+                f"http://www.wikidata.org/prop/statement/{prop}",
+                f"Label number {i}",
+            ]
+        elif kind == 2:
+            terms += [
+                f"http://www.wikidata.org/reference/{i:040x}",
+                f"http://www.wikidata.org/prop/reference/value/{prop}",
+                f"http://www.wikidata.org/value/{i:032x}",
+            ]
+        else:
+            terms += [
+                "http://www.wikidata.org/entity/Q42",
+                "http://www.w3.org/2000/01/rdf-schema#label",
+                "http://wikiba.se/ontology#Statement",
+            ]
+    return terms
+
+
+def run(count=TRIPLES, repeat=REPEAT):
+    """
+    Times the former and the current prefix compaction over the same terms.
+
+    Args:
+        count (int): The number of triples.
+        repeat (int): The number of timed runs, the best one is reported.
+
+    Returns:
+        dict: The best time in seconds of each implementation.
+    """
+    terms = sample_terms(count)
+    compacted = [ttl_compare.replace_prefixes(term) for term in terms]
+    if compacted != [linear_replace_prefixes(term) for term in terms]:
+        raise AssertionError("replace_prefixes differs from the linear implementation")
+
+    timings = {
+        "linear replace_prefixes": lambda: [linear_replace_prefixes(term) for term in terms],
+        "replace_prefixes": lambda: [ttl_compare.replace_prefixes(term) for term in terms],
+        "linear has_prefix": lambda: [linear_has_prefix(term) for term in compacted],
+        "has_prefix": lambda: [ttl_compare.has_prefix(term) for term in compacted],
+    }
+    return {
+        name: min(timeit.repeat(function, number=1, repeat=repeat))
+        for name, function in timings.items()
+    }
+
+
+def main():
+    """
+    Compares the prefix compaction of ttl_compare with the former linear scan.
+
+    Command-line arguments:
+        --triples: int
+            Number of triples, three terms each. Default is 10000.
+        --repeat: int
+            Number of timed runs, the best one is reported. Default is 5.
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmarks replace_prefixes and has_prefix against the former linear scan"
+    )
+    parser.add_argument("--triples", type=int, default=TRIPLES, help="number of triples, default is 10000")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="number of timed runs, default is 5")
+    args = parser.parse_args()
+
+    for name, seconds in run(args.triples, args.repeat).items():
+        logger.info(f"{name}: {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
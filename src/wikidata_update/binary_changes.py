@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+
+import argparse
+import calendar
+import struct
+import sys
+import time
+import zlib
+from array import array
+from rdflib.util import from_n3
+from wikidata_update import ttl_compare
+from wikidata_update import changeset_formats
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# The file starts with MAGIC and VERSION, followed by chunks of up to CHUNK_ROWS
+# triple changes. Every chunk starts with CHUNK_HEADER: the number of rows, the
+# number of terms first used in the chunk, the size of their UTF-8 text and the
+# size of the zlib compressed body. The body holds the terms as an uint32 array of
+# their lengths and their concatenated text, in N-Triples notation; they extend
+# the dictionary of the earlier chunks, so a term id is its position in all the
+# terms read so far. Then come the columns, one array each: op (uint8), subject,
+# predicate, object and entity (uint32 term ids), revid (uint64) and timestamp
+# (int64 seconds since the epoch). All numbers are little endian.
+MAGIC = b"WDCS"
+VERSION = 1
+CHUNK_HEADER = struct.Struct("<IIII")
+CHUNK_ROWS = 65536
+COMPRESS_LEVEL = 6
+
+OPS = {"D": 0, "A": 1}
+OP_NAMES = "DA"
+# array type codes of the columns, in the order they are written
+COLUMNS = (
+    ("op", "B"),
+    ("subject", "I"),
+    ("predicate", "I"),
+    ("object", "I"),
+    ("entity", "I"),
+    ("revid", "Q"),
+    ("timestamp", "q"),
+)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def open_writer(file_name):
+    """
+    Opens a binary changeset file for writing.
+
+    Args:
+        file_name (str): The file, it is overwritten.
+
+    Returns:
+        dict: The writer, passed to write_changeset and close_writer.
+
+    Raises:
+        IOError: If the file cannot be opened.
+    """
+    writer = {
+        "file_name": file_name,
+        "file": open(file_name, "wb"),
+        "terms": {},
+        "new_terms": [],
+        "columns": {name: array(code) for name, code in COLUMNS},
+        "rows": 0,
+        "changes": 0,
+    }
+    writer["file"].write(MAGIC + bytes([VERSION]))
+    return writer
+
+
+def term_id(writer, term):
+    # interns a term, terms seen for the first time are written with the next chunk
+    terms = writer["terms"]
+    index = terms.get(term)
+    if index is None:
+        index = terms[term] = len(terms)
+        writer["new_terms"].append(
+            changeset_formats.nt_term(term) if hasattr(term, "n3") else str(term)
+        )
+    return index
+
+
+def write_changeset(writer, changeset):
+    """
+    Adds the triples of one change, a chunk is written every CHUNK_ROWS rows.
+    Changes without a diff or without changed triples are skipped.
+
+    Args:
+        writer (dict): The writer from open_writer.
+        changeset (dict): The entity, revid and timestamp of the change and its
+                          changes, the rows of ttl_compare.diff_result, or None.
+    """
+    if not changeset or not changeset["changes"]:
+        return
+    columns = writer["columns"]
+    entity = term_id(writer, changeset["entity"])
+    revid = int(changeset["revid"])
+    timestamp = calendar.timegm(time.strptime(changeset["timestamp"], TIMESTAMP_FORMAT))
+    for op, s, p, o in changeset["changes"]:
+        columns["op"].append(OPS[op])
+        columns["subject"].append(term_id(writer, s))
+        columns["predicate"].append(term_id(writer, p))
+        columns["object"].append(term_id(writer, o))
+        columns["entity"].append(entity)
+        columns["revid"].append(revid)
+        columns["timestamp"].append(timestamp)
+        if len(columns["op"]) >= CHUNK_ROWS:
+            write_chunk(writer)
+            columns = writer["columns"]
+    writer["changes"] += 1
+
+
+def write_chunk(writer):
+    """
+    Writes the buffered rows and the terms they use for the first time.
+
+    Args:
+        writer (dict): The writer from open_writer.
+    """
+    columns = writer["columns"]
+    rows = len(columns["op"])
+    if not rows:
+        return
+    text = [term.encode("utf-8") for term in writer["new_terms"]]
+    blob = b"".join(text)
+    lengths = array("I", (len(term) for term in text))
+    body = [_little_endian(lengths).tobytes(), blob]
+    body.extend(_little_endian(columns[name]).tobytes() for name, _ in COLUMNS)
+    body = zlib.compress(b"".join(body), COMPRESS_LEVEL)
+    writer["file"].write(CHUNK_HEADER.pack(rows, len(lengths), len(blob), len(body)))
+    writer["file"].write(body)
+    writer["rows"] += rows
+    writer["new_terms"] = []
+    writer["columns"] = {name: array(code) for name, code in COLUMNS}
+
+
+def close_writer(writer):
+    """
+    Writes the last chunk and closes the file.
+
+    Args:
+        writer (dict): The writer from open_writer.
+    """
+    try:
+        write_chunk(writer)
+    finally:
+        writer["file"].close()
+    logger.info(
+        "Wrote %s triple changes of %s changes with %s distinct terms to %s",
+        writer["rows"],
+        writer["changes"],
+        len(writer["terms"]),
+        writer["file_name"],
+    )
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _read_array(data, offset, typecode, count):
+    values = array(typecode)
+    size = values.itemsize * count
+    values.frombytes(data[offset : offset + size])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, offset + size
+
+
+def iter_chunks(file_name):
+    """
+    Reads a binary changeset file chunk by chunk, without converting the rows.
+    Loaders can use the columns directly, e.g. to bulk insert them.
+
+    Args:
+        file_name (str): The file written by open_writer.
+
+    Yields:
+        tuple: The dictionary of all terms read so far, as a list of N-Triples terms
+               indexed by term id, and the columns of the chunk, a dict of arrays.
+
+    Raises:
+        ValueError: If the file is not a binary changeset file.
+    """
+    terms = []
+    with open(file_name, "rb") as file:
+        if file.read(len(MAGIC) + 1) != MAGIC + bytes([VERSION]):
+            raise ValueError(f"{file_name} is not a binary changeset file")
+        while True:
+            header = file.read(CHUNK_HEADER.size)
+            if not header:
+                return
+            if len(header) < CHUNK_HEADER.size:
+                raise ValueError(f"{file_name} ends within a chunk")
+            rows, term_count, blob_size, body_size = CHUNK_HEADER.unpack(header)
+            body = file.read(body_size)
+            if len(body) < body_size:
+                raise ValueError(f"{file_name} ends within a chunk")
+            data = zlib.decompress(body)
+            size = array("I").itemsize * term_count + blob_size + rows * sum(
+                array(code).itemsize for _, code in COLUMNS
+            )
+            if len(data) != size:
+                raise ValueError(f"{file_name} has a chunk of the wrong size")
+            lengths, offset = _read_array(data, 0, "I", term_count)
+            for length in lengths:
+                terms.append(data[offset : offset + length].decode("utf-8"))
+                offset += length
+            columns = {}
+            for name, code in COLUMNS:
+                columns[name], offset = _read_array(data, offset, code, rows)
+            yield terms, columns
+
+
+def iter_changes(file_name):
+    """
+    Iterates the triple changes of a binary changeset file.
+
+    Args:
+        file_name (str): The file written by open_writer.
+
+    Yields:
+        tuple: The op (D or A), subject, predicate and object in N-Triples notation,
+               the entity, the revid and the timestamp of each triple change.
+    """
+    for terms, columns in iter_chunks(file_name):
+        timestamps = {}
+        for op, s, p, o, entity, revid, timestamp in zip(
+            *(columns[name] for name, _ in COLUMNS)
+        ):
+            if timestamp not in timestamps:
+                timestamps[timestamp] = time.strftime(TIMESTAMP_FORMAT, time.gmtime(timestamp))
+            yield (
+                OP_NAMES[op],
+                terms[s],
+                terms[p],
+                terms[o],
+                terms[entity],
+                revid,
+                timestamps[timestamp],
+            )
+
+
+def iter_changesets(file_name):
+    """
+    Groups the triple changes of a binary changeset file by change.
+
+    Args:
+        file_name (str): The file written by open_writer.
+
+    Yields:
+        dict: The entity, revid and timestamp of each change and its changes, the
+              ("D", s, p, o) and ("A", s, p, o) rows as rdflib terms.
+    """
+    rdflib_terms = {}
+    changeset = None
+    for op, s, p, o, entity, revid, timestamp in iter_changes(file_name):
+        if changeset is None or changeset["revid"] != revid or changeset["entity"] != entity:
+            if changeset is not None:
+                yield changeset
+            changeset = {"entity": entity, "revid": revid, "timestamp": timestamp, "changes": []}
+        row = [op]
+        for term in (s, p, o):
+            if term not in rdflib_terms:
+                rdflib_terms[term] = from_n3(term)
+            row.append(rdflib_terms[term])
+        changeset["changes"].append(tuple(row))
+    if changeset is not None:
+        yield changeset
+
+
+def to_sparql(file_name):
+    """
+    Converts a binary changeset file back to SPARQL Update.
+
+    Args:
+        file_name (str): The file written by open_writer.
+
+    Yields:
+        str: The SPARQL update of each change, the same ttl_compare writes, after a
+             comment naming the entity, revid and timestamp.
+    """
+    for changeset in iter_changesets(file_name):
+        yield (
+            f'# {changeset["entity"]} revid {changeset["revid"]} at {changeset["timestamp"]}\n'
+            + ttl_compare.changes_to_sparql(changeset["changes"], changeset["entity"])
+        )
+
+
+def main():
+    """
+    Converts a binary changeset file to SPARQL Update.
+
+    Command-line arguments:
+        file: str
+            The binary changeset file.
+        -f, --file: str
+            File to write the SPARQL update to, not setting it prints it.
+        -g, --group-triples: bool
+            Group the triples by subject and predicate, see ttl_compare.group_triples.
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Converts a binary changeset file written with --format binary to SPARQL Update"
+    )
+    parser.add_argument("changes", help="the binary changeset file")
+    parser.add_argument("-f", "--file", help="file to write the SPARQL update to, not setting it prints it")
+    parser.add_argument(
+        "-g",
+        "--group-triples",
+        help="group the triples by subject and predicate, with the ; and , abbreviations of Turtle",
+        action="store_true",
+    )
+    args = parser.parse_args()
+    ttl_compare.GROUP_TRIPLES = args.group_triples
+
+    # imported here, sparql_updates imports this module to write the files
+    from wikidata_update import sparql_updates
+
+    output = open(args.file, "w", encoding="utf-8") if args.file else sys.stdout
+    try:
+        output.write(sparql_updates.PREFIXES)
+        output.write("\n")
+        for sparql in to_sparql(args.changes):
+            output.write(sparql)
+            output.write("\n\n")
+    finally:
+        if args.file:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import functools
+from rdflib.term import BNode, Literal
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# the graph of the quads of a revision, the removed triples go to the graph of the
+# revision with REMOVED appended, so both kinds of changes can be bulk loaded
+REVISION_GRAPH = "https://www.wikidata.org/wiki/Special:EntityData/{entity}?revision={revid}"
+REMOVED = "#removed"
+
+TERM_MEMO_SIZE = 65536
+
+NT_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+@functools.lru_cache(maxsize=TERM_MEMO_SIZE, typed=True)
+def nt_term(term):
+    """
+    Serializes an rdflib term in N-Triples notation. Unlike Literal.n3, literals
+    spanning lines are escaped instead of written with triple quotes.
+
+    Args:
+        term (rdflib.term.Identifier): The URIRef, BNode or Literal.
+
+    Returns:
+        str: The term in N-Triples notation.
+    """
+    if isinstance(term, Literal):
+        lexical = '"' + str(term).translate(NT_ESCAPES) + '"'
+        if term.language:
+            return f"{lexical}@{term.language}"
+        if term.datatype:
+            return f"{lexical}^^<{term.datatype}>"
+        return lexical
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    return f"<{term}>"
+
+
+def rdf_patch(changeset):
+    """
+    Serializes a change as an RDF Patch transaction, one D or A row per triple.
+
+    Args:
+        changeset (dict): The entity, revid and timestamp of the change and its
+                          changes, the rows of ttl_compare.diff_result.
+
+    Returns:
+        str: The transaction, from TX to TC.
+    """
+    rows = ["TX ."]
+    for op, s, p, o in changeset["changes"]:
+        rows.append(f"{op} {nt_term(s)} {nt_term(p)} {nt_term(o)} .")
+    rows.append("TC .")
+    return "\n".join(rows)
+
+
+def nquads(changeset):
+    """
+    Serializes a change as N-Quads, with the added triples in the graph of the
+    revision and the removed triples in its REMOVED graph, see REVISION_GRAPH.
+
+    Args:
+        changeset (dict): The entity, revid and timestamp of the change and its
+                          changes, the rows of ttl_compare.diff_result.
+
+    Returns:
+        str: The quads, one per line.
+    """
+    graph = REVISION_GRAPH.format(entity=changeset["entity"], revid=changeset["revid"])
+    graphs = {"A": f"<{graph}>", "D": f"<{graph}{REMOVED}>"}
+    return "\n".join(
+        f"{nt_term(s)} {nt_term(p)} {nt_term(o)} {graphs[op]} ."
+        for op, s, p, o in changeset["changes"]
+    )
+
+
+# output format -> serializer of a change
+SERIALIZERS = {"rdf-patch": rdf_patch, "nquads": nquads}
+
+
+def serialize(changeset, output_format):
+    """
+    Serializes a change in one of the formats of SERIALIZERS.
+
+    Args:
+        changeset (dict): The entity, revid and timestamp of the change and its changes.
+        output_format (str): rdf-patch or nquads.
+
+    Returns:
+        str: The serialized change.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    try:
+        serializer = SERIALIZERS[output_format]
+    except KeyError:
+        raise ValueError(f"Unknown output format {output_format}") from None
+    return serializer(changeset)
+
+
+def iter_serialized(changesets, output_format):
+    """
+    Serializes changes one after the other, e.g. the changes of
+    sparql_updates.process_changes with ttl_compare.DIFF_RESULT set to changes.
+
+    Args:
+        changesets (iterable): The changes, dicts with entity, revid, timestamp and changes.
+        output_format (str): rdf-patch or nquads.
+
+    Yields:
+        str: The serialized changes, empty changes are skipped.
+    """
+    for changeset in changesets:
+        if changeset and changeset["changes"]:
+            yield serialize(changeset, output_format)
@@ -0,0 +1,208 @@
+import json
+import time
+from datetime import datetime, timezone
+import requests
+from wikidata_update import http_client
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values
+STREAM_URL = "https://stream.wikimedia.org/v2/stream/recentchange"
+WIKI = "wikidatawiki"
+# seconds to wait before reconnecting, the server may change it with a retry field
+RECONNECT_DELAY = 1
+# seconds without any data, including the keep-alive comments, before reconnecting
+READ_TIMEOUT = 60
+
+
+def parse_events(lines):
+    """
+    Parses a server-sent events stream.
+
+    Args:
+        lines (iterable): The decoded lines of the stream, without line endings.
+
+    Yields:
+        tuple: The id, event type, data and retry field of each event. The id is
+               None if the event did not set one.
+    """
+    event_id = None
+    event_type = "message"
+    data = []
+    retry = None
+    for line in lines:
+        if not line:
+            # a blank line dispatches the event
+            if data:
+                yield event_id, event_type, "\n".join(data), retry
+            event_id = None
+            event_type = "message"
+            data = []
+            retry = None
+            continue
+        if line.startswith(":"):
+            # comments keep the connection alive
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            data.append(value)
+        elif field == "id":
+            event_id = value
+        elif field == "event":
+            event_type = value
+        elif field == "retry" and value.isdigit():
+            retry = int(value)
+
+
+def to_change(event, wiki=WIKI, change_types=("edit", "new")):
+    """
+    Converts a recentchange event to a change of the recentchanges listing.
+
+    Args:
+        event (dict): The recentchange event, see the mediawiki/recentchange schema.
+        wiki (str): The wiki the changes are taken from.
+        change_types (tuple): The types of changes that are kept.
+
+    Returns:
+        dict: The change with the fields of the recentchanges listing, or None if
+              the event is about another wiki or another type of change.
+    """
+    if event.get("wiki") != wiki or event.get("type") not in change_types:
+        return None
+    revision = event.get("revision") or {}
+    return {
+        "type": event["type"],
+        "ns": event.get("namespace"),
+        "title": event["title"],
+        "rcid": event.get("id"),
+        "revid": revision.get("new"),
+        "old_revid": revision.get("old") or 0,
+        "user": event.get("user"),
+        "timestamp": datetime.fromtimestamp(event["timestamp"], timezone.utc).strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        ),
+    }
+
+
+def iter_stream_events(url=STREAM_URL, last_event_id=None, reconnect=True, since=None):
+    """
+    Reads the events of an EventStreams stream, reconnecting with the Last-Event-ID
+    header when the connection drops.
+
+    Args:
+        url (str): The URL of the stream.
+        last_event_id (str): Resumes the stream after this event.
+        reconnect (bool): Reconnects when the stream ends or the connection fails.
+        since (str): Starts the stream at this ISO 8601 timestamp if no last_event_id is known.
+
+    Yields:
+        tuple: The id and the decoded data of each message event.
+
+    Raises:
+        requests.exceptions.RequestException: If the connection fails and reconnect is not set.
+    """
+    delay = RECONNECT_DELAY
+    while True:
+        headers = {"Accept": "text/event-stream"}
+        params = None
+        if last_event_id:
+            headers["Last-Event-ID"] = last_event_id
+        elif since:
+            params = {"since": since}
+        try:
+            with http_client.get_session().get(
+                url,
+                params=params,
+                headers=headers,
+                stream=True,
+                timeout=(http_client.TIMEOUT, READ_TIMEOUT),
+            ) as response:
+                response.raise_for_status()
+                lines = response.iter_lines(decode_unicode=True)
+                for event_id, event_type, data, retry in parse_events(lines):
+                    if retry is not None:
+                        delay = retry / 1000
+                    if event_id:
+                        last_event_id = event_id
+                    if event_type != "message":
+                        continue
+                    try:
+                        yield event_id, json.loads(data)
+                    except ValueError:
+                        logger.warning(f"Skipping event {event_id} with invalid data")
+        except requests.exceptions.RequestException as e:
+            if not reconnect:
+                raise
+            logger.warning(f"Event stream failed: {e}")
+        if not reconnect:
+            return
+        logger.info(f"Reconnecting to the event stream after {last_event_id}")
+        time.sleep(delay)
+
+
+def iter_stream_changes(
+    url=STREAM_URL,
+    last_event_id=None,
+    max_changes=None,
+    change_types=("edit", "new"),
+    entity_id=None,
+    reconnect=True,
+    since=None,
+):
+    """
+    Lazily reads Wikidata changes from a recentchange event stream, in the format of
+    the recentchanges listing, so they can be processed like the changes of
+    sparql_updates.iter_wikidata_updates.
+
+    Args:
+        url (str): The URL of the stream.
+        last_event_id (str): Resumes the stream after this event.
+        max_changes (int): The maximum number of changes to yield. Not setting it reads forever.
+        change_types (tuple): The types of changes that are kept.
+        entity_id (str): Only keeps the changes of this entity.
+        reconnect (bool): Reconnects when the stream ends or the connection fails.
+        since (str): Starts the stream at this ISO 8601 timestamp if no last_event_id is known.
+
+    Yields:
+        dict: The changes, with the id of their event in "event_id".
+    """
+    yielded = 0
+    if max_changes is not None and max_changes <= 0:
+        return
+    for event_id, event in iter_stream_events(url, last_event_id, reconnect, since):
+        change = to_change(event, WIKI, change_types)
+        if change is None or (entity_id and change["title"] != entity_id):
+            continue
+        change["event_id"] = event_id
+        yield change
+        yielded += 1
+        if max_changes is not None and yielded >= max_changes:
+            return
+
+
+def record_events(path, url=STREAM_URL, count=100):
+    """
+    Records the events of a stream into a JSON lines file, to be replayed with sse_server.
+
+    Args:
+        path (str): The file the events are written to.
+        url (str): The URL of the stream.
+        count (int): The number of events to record.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        for recorded, (_, event) in enumerate(iter_stream_events(url), 1):
+            file.write(json.dumps(event))
+            file.write("\n")
+            if recorded >= count:
+                break
+    logger.info(f"Recorded {count} events to {path}")
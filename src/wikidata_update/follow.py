@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values, the polling interval in seconds
+MIN_INTERVAL = 1
+MAX_INTERVAL = 60
+# a poll listing at least this many changes switches to the shortest interval
+BUSY_CHANGES = 100
+
+
+def load_checkpoint(path):
+    """
+    Reads the checkpoint of a follow run.
+
+    Args:
+        path (str): The checkpoint file.
+
+    Returns:
+        dict: The rcid and timestamp of the last processed change and the size of
+              the output file after it was written, or None if there is no checkpoint yet.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Writes the checkpoint of a follow run. The checkpoint is written to a temporary
+    file that is renamed into place, so a crash never leaves a partial checkpoint.
+
+    Args:
+        path (str): The checkpoint file.
+        checkpoint (dict): The checkpoint, see load_checkpoint.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(checkpoint, file)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def new_changes(changes, checkpoint):
+    """
+    Skips the changes that were processed before the checkpoint was written.
+    Polls start at the timestamp of the checkpoint, so the changes of that second
+    are listed again.
+
+    Args:
+        changes (iterable): The changes from the recentchanges listing, oldest first.
+        checkpoint (dict): The checkpoint, see load_checkpoint.
+
+    Yields:
+        dict: The changes with a rcid greater than the rcid of the checkpoint.
+    """
+    for change in changes:
+        if change["rcid"] > checkpoint["rcid"]:
+            yield change
+
+
+def next_interval(interval, change_count, min_interval=None, max_interval=None):
+    """
+    Adapts the polling interval to the edit rate. The interval is halved after a
+    poll that listed changes and doubled after an idle poll.
+
+    Args:
+        interval (float): The current interval in seconds.
+        change_count (int): The number of changes the last poll listed.
+        min_interval (float): The shortest interval. Default is MIN_INTERVAL.
+        max_interval (float): The longest interval. Default is MAX_INTERVAL.
+
+    Returns:
+        float: The interval to wait before the next poll.
+    """
+    if min_interval is None:
+        min_interval = MIN_INTERVAL
+    if max_interval is None:
+        max_interval = MAX_INTERVAL
+    if change_count >= BUSY_CHANGES:
+        interval = min_interval
+    elif change_count:
+        interval = interval / 2
+    else:
+        interval = interval * 2
+    return min(max(interval, min_interval), max_interval)
@@ -4,8 +4,10 @@ import sys
 from datetime import datetime
 from bs4 import BeautifulSoup
 from rdflib import Graph, Namespace
-import new_entity_rdf
-import ttl_compare
+from wikidata_update import new_entity_rdf
+from wikidata_update import ttl_compare
+from wikidata_update import http_client
+from wikidata_update import output_sink
 import argparse
 from dateutil.relativedelta import relativedelta
 import time
@@ -95,10 +97,14 @@ PREFIXES = (
 EDIT_DELETE_RDFS = []
 EDIT_INSERT_RDFS = []
 NEW_INSERT_RDFS = []
+# while writing to a file the statements are streamed to it instead of collected in the lists above
+OUTPUT_SINK = None
 
 ADD_REMOVE_CLAIM = False
 OLD_REV_ID = None
 NEW_REV_ID = None
+# entity id -> INSERT DATA statement of the new entities fetched in batches
+NEW_ENTITY_RDFS = {}
 STATEMENT_ID = None
 
 def get_wikidata_updates(start_time, end_time):
@@ -126,7 +132,7 @@ def get_wikidata_updates(start_time, end_time):
         print("DEBUG: Query changes curl request: ", curl_request, "\n")
 
     # Make the request
-    response = requests.get(api_url, params=params)
+    response = http_client.get(api_url, params=params)
     data = response.json()
     # Check for errors in the response
     if "error" in data:
@@ -136,6 +142,21 @@ def get_wikidata_updates(start_time, end_time):
     return changes
 
 
+def store_rdf(rdfs, rdf):
+    """
+    Keeps a generated statement. While writing to a file it is streamed to OUTPUT_SINK
+    right away, the changes are listed newest first so the file keeps that order.
+
+    Args:
+        rdfs (list): EDIT_DELETE_RDFS, EDIT_INSERT_RDFS or NEW_INSERT_RDFS.
+        rdf (tuple): The subject, the statement and the timestamp of the change.
+    """
+    if OUTPUT_SINK:
+        output_sink.write_change(OUTPUT_SINK, [rdf[1]])
+    else:
+        rdfs.append(rdf)
+
+
 def compare_changes(api_url, change):
     global NEW_INSERT_RDFS, OLD_REV_ID, NEW_REV_ID
     NEW_REV_ID = change["revid"]
@@ -143,11 +164,14 @@ def compare_changes(api_url, change):
     diff = ""
     if change["type"] == "new":
         # Fetch the JSON data for the new entity
-        new_insert_statement = new_entity_rdf.main(change["title"], debug=DEBUG)
+        if change["title"] in NEW_ENTITY_RDFS:
+            new_insert_statement = NEW_ENTITY_RDFS[change["title"]]
+        else:
+            new_insert_statement = new_entity_rdf.main(change["title"], debug=DEBUG)
         if PRINT_OUTPUT == True:
             print(new_insert_statement)
-        NEW_INSERT_RDFS.append(
-            (change["title"], new_insert_statement, change["timestamp"])
+        store_rdf(
+            NEW_INSERT_RDFS, (change["title"], new_insert_statement, change["timestamp"])
         )
         return
     elif change["type"] != "edit":
@@ -168,7 +192,7 @@ def compare_changes(api_url, change):
                     curl_request += f" --data-urlencode '{key}={value}'"
             print("\nCompare revisions curl request: ", curl_request, "\n")
 
-        response = requests.get(api_url, params=params)
+        response = http_client.get(api_url, params=params)
         comparison_data = response.json()
         if "compare" in comparison_data:
             # Fetch The HTML diff of the changes using compare API
@@ -560,12 +584,12 @@ def generate_rdf(
         )
 
     if delete_statements != []:
-        EDIT_DELETE_RDFS.append((subject, delete_rdf, timestamp))
+        store_rdf(EDIT_DELETE_RDFS, (subject, delete_rdf, timestamp))
         if PRINT_OUTPUT == True:
             print(delete_rdf)
             print("\n")
     if insert_statements != []:
-        EDIT_INSERT_RDFS.append((subject, insert_rdf, timestamp))
+        store_rdf(EDIT_INSERT_RDFS, (subject, insert_rdf, timestamp))
         if PRINT_OUTPUT == True:
             print(insert_rdf)
             print("\n")
@@ -650,9 +674,9 @@ def handle_time_node(object, time_node_id, action, change_timestamp):
     change_statement += "};\n"
 
     if action == "delete":
-        EDIT_DELETE_RDFS.append((time_node_id, change_statement, change_timestamp))
+        store_rdf(EDIT_DELETE_RDFS, (time_node_id, change_statement, change_timestamp))
     elif action == "add":
-        EDIT_INSERT_RDFS.append((time_node_id, change_statement, change_timestamp))
+        store_rdf(EDIT_INSERT_RDFS, (time_node_id, change_statement, change_timestamp))
     if PRINT_OUTPUT == True:
         print(change_statement)
     return
@@ -667,7 +691,7 @@ def replace_statements(statement_id, changes_statements):
 
 def get_entity_json(entity_id, revision_id):
     api_url = f"https://www.wikidata.org/wiki/Special:EntityData/{entity_id}.json?revision={revision_id}"
-    response = requests.get(api_url)
+    response = http_client.get(api_url)
     if DEBUG:
         print("\nRetrieving entity JSON API...")
         print("Entity JSON API URL: ", api_url, "\n")
@@ -749,13 +773,9 @@ def get_time_node(entity_id, revision_id, reference_id, property_id):
     """
 
     sparql_endpoint = "https://query.wikidata.org/sparql"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; MyWikidataQueryBot/1.0; +https://www.example.com/bot)"
-    }
-    response = requests.get(
+    response = http_client.get(
         sparql_endpoint,
         params={"query": sparql_query, "format": "json"},
-        headers=headers,
     )
     if response.status_code == 200:
         data = response.json()
@@ -775,7 +795,7 @@ def get_time_node(entity_id, revision_id, reference_id, property_id):
 
     api_url = f"https://www.wikidata.org/wiki/Special:EntityData/{entity_id}.ttl?revision={revision_id}"
     try:
-        response = requests.get(api_url)
+        response = http_client.get(api_url)
         response.raise_for_status()
     except requests.RequestException as e:
         print(f"Error fetching TTL data: {e}")
@@ -821,18 +841,14 @@ def get_statement_id(entity_id, revision_id, property_id, object_value):
     """
     
     sparql_endpoint = "https://query.wikidata.org/sparql"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; MyWikidataQueryBot/1.0; +https://www.example.com/bot)"
-    }
 
     # Query the SPARQL endpoint
     if DEBUG:
         print("SPARQL Query:\n", sparql_query)
 
-    response = requests.get(
+    response = http_client.get(
         sparql_endpoint,
         params={"query": sparql_query, "format": "json"},
-        headers=headers,
     )
 
     if response.status_code == 200:
@@ -851,7 +867,7 @@ def get_statement_id(entity_id, revision_id, property_id, object_value):
     print("Fallback to TTL parsing...")
     api_url = f"https://www.wikidata.org/wiki/Special:EntityData/{entity_id}.ttl?revision={revision_id}"
     try:
-        ttl_response = requests.get(api_url)
+        ttl_response = http_client.get(api_url)
         ttl_response.raise_for_status()
     except requests.RequestException as e:
         print(f"Error fetching TTL data: {e}")
@@ -1074,18 +1090,8 @@ def verify_date(date):
     return True
 
 
-def write_to_file(data):
-    print("Writing changes to file...")
-    with open(FILE_NAME, "w") as file:
-        file.write(PREFIXES)
-        file.write("\n")
-        for subject, change, time in data:
-            file.write(change)
-            file.write("\n\n")
-    print("Changes written to file.")
-
-
 def main():
+    global OUTPUT_SINK
     # define some command line arguments
     parser = argparse.ArgumentParser(
         description="This script retrieves recent changes of the wikidata, allowing you to store the output in a file"
@@ -1162,19 +1168,24 @@ def main():
             print(
                 "Retrieving wikidata changes...\nChanges will not be printed to console."
             )
-        all_changes = []
-        for change in changes:
-            if change["title"].startswith("Q") and change["title"][1:].isdigit():
-                compare_changes("https://www.wikidata.org/w/api.php", change)
-        # write the changes to a file
-        if FILE_NAME:
-            # merge all the changes into one list sorted by timestamp
-            all_changes = sorted(
-                EDIT_INSERT_RDFS + EDIT_DELETE_RDFS + NEW_INSERT_RDFS,
-                key=lambda x: x[2],
-                reverse=True,
+        # fetch the new entities of the window in batches instead of one by one
+        NEW_ENTITY_RDFS.update(
+            new_entity_rdf.render_many(
+                [change["title"] for change in changes if change["type"] == "new"],
+                debug=DEBUG,
             )
-            write_to_file(all_changes)
+        )
+        # write the changes to the file while they are compared
+        if FILE_NAME:
+            OUTPUT_SINK = output_sink.open_sink(FILE_NAME, PREFIXES)
+        try:
+            for change in changes:
+                if change["title"].startswith("Q") and change["title"][1:].isdigit():
+                    compare_changes("https://www.wikidata.org/w/api.php", change)
+        finally:
+            if OUTPUT_SINK:
+                output_sink.close_sink(OUTPUT_SINK)
+                OUTPUT_SINK = None
         end_time = time.time()
         print(f"Execution time: {end_time - start_time} seconds")
 
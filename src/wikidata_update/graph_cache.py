@@ -0,0 +1,121 @@
+import threading
+import logging
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values, the total number of triples kept in memory. 0 disables the cache
+MAX_TRIPLES = 500000
+
+HITS = 0
+MISSES = 0
+
+# (source, revision id) -> frozenset of triples, the sources parse revisions into
+# different kinds of triples, see ttl_compare.REVISION_SOURCE. Ordered from the least
+# to the most recently used revision
+_ENTRIES = OrderedDict()
+_SIZE = 0
+_LOCK = threading.Lock()
+
+
+def configure(max_triples):
+    """
+    Sets the number of triples the cache keeps in memory, evicting revisions if needed.
+
+    Args:
+        max_triples (int): The maximum number of triples over all cached revisions. 0 disables the cache.
+    """
+    global MAX_TRIPLES
+    MAX_TRIPLES = max_triples
+    with _LOCK:
+        _evict(0)
+
+
+def get(revision_id, source="ttl"):
+    """
+    Returns the parsed triples of a revision.
+
+    Args:
+        revision_id (int): The revision ID.
+        source (str): Where the triples came from, see ttl_compare.REVISION_SOURCE.
+
+    Returns:
+        frozenset: The triples of the revision, or None if the revision is not cached.
+    """
+    global HITS, MISSES
+    if MAX_TRIPLES <= 0:
+        return None
+    key = (source, int(revision_id))
+    with _LOCK:
+        triples = _ENTRIES.get(key)
+        if triples is None:
+            MISSES += 1
+            return None
+        HITS += 1
+        _ENTRIES.move_to_end(key)
+        return triples
+
+
+def put(revision_id, triples, source="ttl"):
+    """
+    Stores the parsed triples of a revision. The least recently used revisions
+    are evicted until the new revision fits into MAX_TRIPLES, so revisions that
+    were used a lot long ago do not crowd out the revisions of recent changes.
+
+    Args:
+        revision_id (int): The revision ID.
+        triples (frozenset): The triples of the revision.
+        source (str): Where the triples came from, see ttl_compare.REVISION_SOURCE.
+    """
+    global _SIZE
+    key = (source, int(revision_id))
+    if len(triples) > MAX_TRIPLES:
+        return
+    with _LOCK:
+        if key in _ENTRIES:
+            _ENTRIES.move_to_end(key)
+            return
+        _evict(len(triples))
+        _ENTRIES[key] = triples
+        _SIZE += len(triples)
+
+
+def clear():
+    """
+    Removes every revision from the cache and resets the counters.
+    """
+    global _SIZE, HITS, MISSES
+    with _LOCK:
+        _ENTRIES.clear()
+        _SIZE = 0
+        HITS = 0
+        MISSES = 0
+
+
+def _evict(needed):
+    global _SIZE
+    while _ENTRIES and _SIZE + needed > MAX_TRIPLES:
+        _, triples = _ENTRIES.popitem(last=False)
+        _SIZE -= len(triples)
+
+
+def log_stats():
+    """
+    Logs the hit and miss counters of the graph cache.
+    """
+    if MAX_TRIPLES <= 0:
+        return
+    logger.info(
+        "Graph cache: %s hits, %s misses, %s triples of %s revisions in memory",
+        HITS,
+        MISSES,
+        _SIZE,
+        len(_ENTRIES),
+    )
@@ -0,0 +1,101 @@
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, diff_triples falls back to set operations
+    np = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+COLLISIONS = 0
+
+
+def available():
+    """
+    Returns:
+        bool: True if numpy is installed and the hashed diff can be used.
+    """
+    return np is not None
+
+
+def triple_hashes(triples):
+    """
+    Hashes every triple into a uint64 array.
+
+    Args:
+        triples (list): The triples.
+
+    Returns:
+        numpy.ndarray: The hash of each triple, in the order of the list.
+    """
+    hashes = (hash(triple) for triple in triples)
+    return np.fromiter(hashes, dtype=np.int64, count=len(triples)).view(np.uint64)
+
+
+def _missing(triples, hashes, other_triples, other_hashes, other_set):
+    # the indexes of the triples that are not among the other triples
+    order = np.argsort(other_hashes, kind="stable")
+    sorted_hashes = other_hashes[order]
+    positions = np.searchsorted(sorted_hashes, hashes)
+    np.minimum(positions, max(sorted_hashes.size - 1, 0), out=positions)
+    if sorted_hashes.size:
+        found = sorted_hashes[positions] == hashes
+    else:
+        found = np.zeros(hashes.size, dtype=bool)
+    missing = ~found
+
+    # a matching hash can be a collision, compare the triples of the pairs, a second
+    # hash would collide along with the first one for terms whose hashes are equal
+    matched = np.flatnonzero(found)
+    partners = order[positions[matched]]
+    suspects = [
+        index
+        for index, other in zip(matched.tolist(), partners.tolist())
+        if triples[index] != other_triples[other]
+    ]
+    if suspects:
+        # duplicated or colliding hashes, decided by looking the triples up
+        global COLLISIONS
+        COLLISIONS += len(suspects)
+        if other_set is None:
+            other_set = set(other_triples)
+        for index in suspects:
+            if triples[index] not in other_set:
+                missing[index] = True
+    return np.flatnonzero(missing)
+
+
+def diff_hashed(old_triples, new_triples):
+    """
+    Computes the removed and added triples of two revisions with sorted uint64 hash
+    arrays instead of Python set subtraction. The triples are copied into lists next
+    to their hash arrays, so this uses more memory than subtracting sets, and it is
+    slower than subtracting triples that already are sets. Triples whose hashes match
+    are compared with the triple they matched, and the rare pairs that differ are
+    looked up among all the other triples, so collisions never hide a change.
+
+    Args:
+        old_triples (iterable): The triples of the old revision, without duplicates.
+        new_triples (iterable): The triples of the new revision, without duplicates.
+
+    Returns:
+        tuple: The removed and the added triples, as lists.
+    """
+    # sets are reused for the verification of suspects
+    old_set = old_triples if isinstance(old_triples, (set, frozenset)) else None
+    new_set = new_triples if isinstance(new_triples, (set, frozenset)) else None
+    old_list = list(old_triples)
+    new_list = list(new_triples)
+    old_hashes = triple_hashes(old_list)
+    new_hashes = triple_hashes(new_list)
+
+    removed = _missing(old_list, old_hashes, new_list, new_hashes, new_set)
+    added = _missing(new_list, new_hashes, old_list, old_hashes, old_set)
+    return [old_list[index] for index in removed], [new_list[index] for index in added]
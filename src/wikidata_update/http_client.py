@@ -0,0 +1,245 @@
+import asyncio
+import functools
+import threading
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional, the shared session is used from a thread pool instead
+    aiohttp = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values
+USER_AGENT = (
+    "wikidata-update/0.1.0 (https://github.com/sinaazimii/Wikidata-tools; sinaazm15@gmail.com) "
+    f"python-requests/{requests.__version__}"
+)
+# number of per-host pools kept alive (api.php / Special:EntityData share
+# www.wikidata.org, the query service lives on query.wikidata.org)
+POOL_CONNECTIONS = 4
+# number of keep-alive connections kept per host
+POOL_MAXSIZE = 16
+TIMEOUT = 60
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def create_session(
+    user_agent=None,
+    pool_connections=None,
+    pool_maxsize=None,
+    retries=None,
+    backoff_factor=None,
+):
+    """
+    Creates a requests session with keep-alive connection pools, compression and retries.
+
+    Args:
+        user_agent (str): The User-Agent header sent with every request.
+        pool_connections (int): The number of per-host connection pools to keep.
+        pool_maxsize (int): The number of connections kept alive per host.
+        retries (int): How many times failed connections and 429/5xx responses are retried.
+        backoff_factor (float): The backoff factor between retries.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=RETRIES if retries is None else retries,
+        backoff_factor=BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections or POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize or POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(make_headers(accept_encoding=True))
+    session.headers["User-Agent"] = user_agent or USER_AGENT
+    return session
+
+
+def configure(
+    user_agent=None,
+    pool_connections=None,
+    pool_maxsize=None,
+    timeout=None,
+    retries=None,
+    backoff_factor=None,
+):
+    """
+    Replaces the shared session with one built from the given settings.
+    Settings that are not given keep their module default.
+
+    Args:
+        user_agent (str): The User-Agent header sent with every request.
+        pool_connections (int): The number of per-host connection pools to keep.
+        pool_maxsize (int): The number of connections kept alive per host.
+        timeout (float): The default timeout in seconds for every request.
+        retries (int): How many times failed requests are retried.
+        backoff_factor (float): The backoff factor between retries.
+
+    Returns:
+        requests.Session: The new shared session.
+    """
+    global _SESSION, TIMEOUT
+    if timeout is not None:
+        TIMEOUT = timeout
+    session = create_session(
+        user_agent, pool_connections, pool_maxsize, retries, backoff_factor
+    )
+    with _SESSION_LOCK:
+        old_session, _SESSION = _SESSION, session
+    if old_session is not None:
+        old_session.close()
+    return session
+
+
+def get_session():
+    """
+    Returns the session shared by every module, creating it on first use.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = create_session()
+    return _SESSION
+
+
+def get(url, params=None, **kwargs):
+    """
+    Sends a GET request through the shared session.
+
+    Args:
+        url (str): The URL to request.
+        params (dict): The query parameters of the request.
+        **kwargs: Any other argument accepted by requests.Session.get.
+
+    Returns:
+        requests.Response: The response of the request.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails.
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    return get_session().get(url, params=params, **kwargs)
+
+
+def pool_stats():
+    """
+    Collects the connection pool statistics of the shared session.
+
+    Returns:
+        list: One dictionary per host pool with the host, the number of
+              connections opened and the number of requests served.
+    """
+    if _SESSION is None:
+        return []
+    stats = []
+    adapters = {id(adapter): adapter for adapter in _SESSION.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats.append(
+                {
+                    "host": f"{pool.scheme}://{pool.host}",
+                    "connections": pool.num_connections,
+                    "requests": pool.num_requests,
+                }
+            )
+    return stats
+
+
+def log_pool_stats():
+    """
+    Logs the connection pool statistics of the shared session.
+    """
+    for stat in pool_stats():
+        logger.info(
+            "HTTP pool %s: %s requests over %s connections",
+            stat["host"],
+            stat["requests"],
+            stat["connections"],
+        )
+
+
+
+def create_async_session(limit=None, user_agent=None):
+    """
+    Creates an aiohttp session for the asyncio fetch API.
+
+    Args:
+        limit (int): The maximum number of connections kept open per host.
+        user_agent (str): The User-Agent header sent with every request.
+
+    Returns:
+        aiohttp.ClientSession: The session, or None if aiohttp is not installed.
+                               Must be created and closed inside a running event loop.
+    """
+    if aiohttp is None:
+        return None
+    connector = aiohttp.TCPConnector(limit_per_host=limit or POOL_MAXSIZE)
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={"User-Agent": user_agent or get_session().headers["User-Agent"]},
+        timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+    )
+
+
+async def get_text_async(url, params=None, session=None):
+    """
+    Fetches the body of a URL as text without blocking the event loop.
+
+    With an aiohttp session the request is sent through it. Otherwise the
+    request is sent through the shared requests session on the loop's
+    default executor.
+
+    Args:
+        url (str): The URL to request.
+        params (dict): The query parameters of the request.
+        session (aiohttp.ClientSession): The session created by create_async_session.
+
+    Returns:
+        str: The body of the response.
+
+    Raises:
+        aiohttp.ClientError: If the request through aiohttp fails.
+        requests.exceptions.RequestException: If the request through requests fails.
+    """
+    if session is not None:
+        async with session.get(url, params=params) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(None, functools.partial(get, url, params=params))
+    response.raise_for_status()
+    return response.text
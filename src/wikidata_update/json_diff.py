@@ -0,0 +1,232 @@
+from wikidata_update import ttl_compare
+from wikidata_update import revision_content
+from wikidata_update import wikibase_rdf
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+TERM_KINDS = ("labels", "descriptions", "aliases")
+
+
+def index_statements(entity):
+    """
+    Indexes the statements of an entity by their GUID.
+
+    Args:
+        entity (dict): The entity JSON.
+
+    Returns:
+        dict: The statements by GUID.
+    """
+    return {
+        statement["id"]: statement
+        for statements in entity.get("claims", {}).values()
+        for statement in statements
+    }
+
+
+def snak_nodes(snaks):
+    # the value nodes of a list of snaks
+    for snak in snaks:
+        if snak.get("snaktype") == "value":
+            value_id = wikibase_rdf.value_hash(snak["datavalue"])
+            if value_id is not None:
+                yield wikibase_rdf.V[value_id]
+
+
+def statement_nodes(statement):
+    """
+    Lists the shared nodes a statement links to: its value nodes and references.
+
+    Args:
+        statement (dict): The statement.
+
+    Yields:
+        URIRef: The value and reference nodes.
+    """
+    yield from snak_nodes([statement["mainsnak"]])
+    for snaks in statement.get("qualifiers", {}).values():
+        yield from snak_nodes(snaks)
+    for reference in statement.get("references", []):
+        yield wikibase_rdf.REF[reference["hash"]]
+        for snaks in reference["snaks"].values():
+            yield from snak_nodes(snaks)
+
+
+def diff_terms(entity_id, old_entity, new_entity, removed, added):
+    # compares labels, descriptions and aliases language by language
+    for kind in TERM_KINDS:
+        old_terms = old_entity.get(kind) or {}
+        new_terms = new_entity.get(kind) or {}
+        for language in old_terms.keys() | new_terms.keys():
+            old_value = old_terms.get(language)
+            new_value = new_terms.get(language)
+            if old_value == new_value:
+                continue
+            old_triples = set(wikibase_rdf.term_triples(entity_id, kind, language, old_value)) if old_value else set()
+            new_triples = set(wikibase_rdf.term_triples(entity_id, kind, language, new_value)) if new_value else set()
+            removed |= old_triples - new_triples
+            added |= new_triples - old_triples
+
+
+def diff_sitelinks(entity_id, old_entity, new_entity, removed, added):
+    # compares sitelinks site by site
+    old_sitelinks = old_entity.get("sitelinks") or {}
+    new_sitelinks = new_entity.get("sitelinks") or {}
+    for site in old_sitelinks.keys() | new_sitelinks.keys():
+        old_sitelink = old_sitelinks.get(site)
+        new_sitelink = new_sitelinks.get(site)
+        if old_sitelink == new_sitelink:
+            continue
+        old_triples = set(wikibase_rdf.sitelink_triples(entity_id, site, old_sitelink)) if old_sitelink else set()
+        new_triples = set(wikibase_rdf.sitelink_triples(entity_id, site, new_sitelink)) if new_sitelink else set()
+        removed |= old_triples - new_triples
+        added |= new_triples - old_triples
+
+
+def diff_statements(entity_id, old_entity, new_entity, removed, added):
+    # compares statements by GUID, including their qualifiers, references and rank
+    old_statements = index_statements(old_entity)
+    new_statements = index_statements(new_entity)
+    changed = [
+        guid
+        for guid in old_statements.keys() | new_statements.keys()
+        if old_statements.get(guid) != new_statements.get(guid)
+    ]
+    if not changed:
+        return
+
+    old_triples = set()
+    new_triples = set()
+    old_nodes = {}
+    new_nodes = {}
+    properties = set()
+    for guid in changed:
+        if guid in old_statements:
+            statement = old_statements[guid]
+            old_triples.update(wikibase_rdf.statement_triples(entity_id, statement, old_nodes))
+            properties.add(statement["mainsnak"]["property"])
+        if guid in new_statements:
+            statement = new_statements[guid]
+            new_triples.update(wikibase_rdf.statement_triples(entity_id, statement, new_nodes))
+            properties.add(statement["mainsnak"]["property"])
+
+    # best ranks and truthy triples depend on all statements of a property
+    for prop in properties:
+        old_triples.update(
+            wikibase_rdf.truthy_triples(entity_id, old_entity.get("claims", {}).get(prop, []))
+        )
+        new_triples.update(
+            wikibase_rdf.truthy_triples(entity_id, new_entity.get("claims", {}).get(prop, []))
+        )
+
+    # value and reference nodes are shared, they stay while unchanged statements use them
+    changed = set(changed)
+    old_kept = set()
+    new_kept = set()
+    if old_nodes or new_nodes:
+        old_kept.update(
+            node
+            for guid, statement in old_statements.items()
+            if guid not in changed
+            for node in statement_nodes(statement)
+        )
+        new_kept.update(
+            node
+            for guid, statement in new_statements.items()
+            if guid not in changed
+            for node in statement_nodes(statement)
+        )
+    for node, triples in old_nodes.items():
+        if node not in new_nodes and node not in new_kept:
+            old_triples.update(triples)
+    for node, triples in new_nodes.items():
+        if node not in old_nodes and node not in old_kept:
+            new_triples.update(triples)
+
+    removed |= old_triples - new_triples
+    added |= new_triples - old_triples
+
+
+def diff_entities(old_entity, new_entity):
+    """
+    Computes the triples that changed between two revisions of an entity from their
+    JSON, mapping only the terms, sitelinks and statements that differ to RDF.
+
+    Args:
+        old_entity (dict): The entity JSON of the old revision, None for new entities.
+        new_entity (dict): The entity JSON of the new revision.
+
+    Returns:
+        tuple: The removed and the added triples, as sets of rdflib terms.
+    """
+    old_entity = old_entity or {}
+    entity_id = new_entity["id"]
+    removed = set()
+    added = set()
+
+    old_metadata = set(wikibase_rdf.metadata_triples(old_entity)) if old_entity else set()
+    new_metadata = set(wikibase_rdf.metadata_triples(new_entity))
+    removed |= old_metadata - new_metadata
+    added |= new_metadata - old_metadata
+
+    diff_terms(entity_id, old_entity, new_entity, removed, added)
+    diff_sitelinks(entity_id, old_entity, new_entity, removed, added)
+    diff_statements(entity_id, old_entity, new_entity, removed, added)
+
+    # a triple can move between components, e.g. a value node used by another statement
+    return removed - added, added - removed
+
+
+def diff_json(old_entity, new_entity, entity_id):
+    """
+    Generates the SPARQL update between two revisions of an entity from their JSON,
+    in the same format as ttl_compare.diff_triples.
+
+    Args:
+        old_entity (dict): The entity JSON of the old revision, None for new entities.
+        new_entity (dict): The entity JSON of the new revision.
+        entity_id (str): The ID of the entity.
+
+    Returns:
+        str: A SPARQL update command string that includes both DELETE and INSERT commands,
+             or the changed rows, see ttl_compare.diff_result.
+    """
+    removed_triples, added_triples = diff_entities(old_entity, new_entity)
+    return ttl_compare.diff_result(removed_triples, added_triples, entity_id)
+
+
+def main(entity_id, old_revision_id, new_revision_id, debug, print_output=True):
+    """
+    Compares two revisions of an entity using their JSON instead of their TTL.
+    Args:
+        entity_id (str): The ID of the entity to compare.
+        old_revision_id (int): The ID of the old revision. If 0, the old revision has no triples.
+        new_revision_id (int): The ID of the new revision.
+        debug (bool): Flag to enable or disable debug mode.
+        print_output (bool): Prints the SPARQL update.
+    Returns:
+        str: The SPARQL update, or None if a revision could not be fetched.
+    """
+    ttl_compare.DEBUG = debug
+    ttl_compare.PRINT_OUTPUT = print_output
+    try:
+        contents = revision_content.fetch_revisions([old_revision_id, new_revision_id])
+    except Exception as e:
+        logger.error(f"Error fetching revisions of {entity_id}: {e}")
+        return None
+    new_entity = contents.get(int(new_revision_id))
+    old_entity = contents.get(int(old_revision_id)) if int(old_revision_id) else None
+    if new_entity is None or (int(old_revision_id) and old_entity is None):
+        logger.error(
+            f"Revisions {old_revision_id} and {new_revision_id} of {entity_id} are not available"
+        )
+        return None
+    return diff_json(old_entity, new_entity, entity_id)
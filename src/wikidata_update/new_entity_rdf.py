@@ -1,6 +1,7 @@
-import requests
 import json
 import logging
+import requests
+from wikidata_update import http_client
 
 # Configure logging
 logging.basicConfig(
@@ -11,9 +12,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)  # Create a logger
 
 
+# the maximum number of ids wbgetentities accepts in one request
+BATCH_SIZE = 50
+
+
 def main(entity_id, debug=False):
     # check if entity_id is correct format
-    if not entity_id.startswith("Q"):
+    if not is_entity_id(entity_id):
         print("\n")
         logger.error("Invalid entity ID")
         print(
@@ -22,15 +27,53 @@ def main(entity_id, debug=False):
         )
         print("\n")
         return None
+    data = fetch_entities([entity_id], debug)
+
+    # Check for errors in the response
+    try:
+        entity = data["entities"][entity_id]
+    except KeyError:
+        print("\n")
+        logger.error("Entity not found")
+        print("\n")
+        return None
+    return render_entity(entity)
+
+
+def is_entity_id(entity_id):
+    """
+    Checks if an id is an item id that wbgetentities can fetch.
+
+    Args:
+        entity_id (str): The entity ID.
+
+    Returns:
+        bool: True for ids in the format Q<number>.
+    """
+    return entity_id.startswith("Q") and entity_id[1:].isdigit()
+
+
+def fetch_entities(entity_ids, debug=False):
+    """
+    Fetches entities with a single wbgetentities request.
+
+    Args:
+        entity_ids (list): Up to BATCH_SIZE entity IDs.
+        debug (bool): Logs the request as a curl command.
+
+    Returns:
+        dict: The decoded response, with the entities in "entities".
+    """
     # Fetch JSON data for the entity
     # url = f"https://www.wikidata.org/wiki/Special:EntityData/{entity_id}.json"
     # else:
     url = f"https://www.wikidata.org/w/api.php"
-    response = requests.get(
+    ids = "|".join(entity_ids)
+    response = http_client.get(
         url,
         params={
             "action": "wbgetentities",
-            "ids": entity_id,
+            "ids": ids,
             "format": "json",
             "languages": "en",
         },
@@ -38,19 +81,84 @@ def main(entity_id, debug=False):
 
     if debug:
         logger.setLevel(logging.DEBUG)
-        curl_command = f"curl -G '{url}?action=wbgetentities&ids={entity_id}&format=json&languages=en'"
-        logger.debug("Get new entity data curl command:", curl_command)
+        curl_command = f"curl -G '{url}?action=wbgetentities&ids={ids}&format=json&languages=en'"
+        logger.debug("Get new entity data curl command: %s", curl_command)
 
-    data = response.json()
+    return response.json()
 
-    # Check for errors in the response
+
+def render_many(entity_ids, debug=False):
+    """
+    Fetches new entities in batches of up to BATCH_SIZE ids and renders each one.
+    A failing id does not fail the others: invalid and missing ids are rendered as
+    None, and if the API rejects a whole batch its ids are fetched one by one.
+
+    Args:
+        entity_ids (iterable): The entity IDs.
+        debug (bool): Logs the requests as curl commands.
+
+    Returns:
+        dict: The INSERT DATA statement of each entity ID, or None if it could not be rendered.
+    """
+    rendered = {}
+    valid_ids = []
+    for entity_id in entity_ids:
+        if entity_id in rendered:
+            continue
+        if is_entity_id(entity_id):
+            # keeps the order of entity_ids, the result is filled in below
+            rendered[entity_id] = None
+            valid_ids.append(entity_id)
+        else:
+            logger.error(f"Invalid entity ID {entity_id}")
+            rendered[entity_id] = None
+
+    for start in range(0, len(valid_ids), BATCH_SIZE):
+        batch = valid_ids[start : start + BATCH_SIZE]
+        for entity_id, entity in _fetch_batch(batch, debug).items():
+            try:
+                rendered[entity_id] = render_entity(entity)
+            except (KeyError, TypeError) as e:
+                logger.error(f"Could not render entity {entity_id}: {e}")
+    return rendered
+
+
+def _fetch_batch(entity_ids, debug=False):
+    # returns the entities of the batch that were found
     try:
-        entity = data["entities"][entity_id]
-    except KeyError:
-        print("\n")
-        logger.error("Entity not found")
-        print("\n")
-        return None
+        data = fetch_entities(entity_ids, debug)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        data = {"error": {"info": str(e)}}
+    if "error" in data:
+        if len(entity_ids) == 1:
+            logger.error(f"Could not fetch entity {entity_ids[0]}: {data['error'].get('info')}")
+            return {}
+        # wbgetentities fails the whole request for a single bad id
+        entities = {}
+        for entity_id in entity_ids:
+            entities.update(_fetch_batch([entity_id], debug))
+        return entities
+
+    entities = {}
+    for entity_id in entity_ids:
+        entity = data.get("entities", {}).get(entity_id)
+        if entity is None or "missing" in entity:
+            logger.error(f"Entity {entity_id} not found")
+            continue
+        entities[entity_id] = entity
+    return entities
+
+
+def render_entity(entity):
+    """
+    Renders an entity as an INSERT DATA statement.
+
+    Args:
+        entity (dict): The entity as returned by wbgetentities.
+
+    Returns:
+        str: The INSERT DATA statement.
+    """
     # Initialize the INSERT DATA statement
     insert_data = "INSERT DATA {\n"
 
@@ -0,0 +1,327 @@
+import gzip
+import os
+import queue
+import threading
+import time
+import logging
+from wikidata_update import changeset_formats
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, only needed for .zst output files
+    zstandard = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values, buffered changes are written once they reach FLUSH_BYTES
+# characters or FLUSH_INTERVAL seconds after the last flush, whichever comes first
+FLUSH_BYTES = 1024 * 1024
+FLUSH_INTERVAL = 5
+# the number of flushed buffers waiting for the compression thread, a slower
+# compression blocks the diff loop only once they are all taken
+QUEUE_SIZE = 16
+ZSTD_LEVEL = 3
+
+# the text written after every change, the output file keeps one blank line between changes
+SEPARATOR = "\n\n"
+
+# file extension -> compression of the output file
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+
+def compression_of(file_name):
+    """
+    Returns:
+        str: The compression chosen by the extension of the file, gzip or zstd,
+             or None for a plain file.
+    """
+    return COMPRESSIONS.get(os.path.splitext(file_name)[1].lower())
+
+
+def available(compression):
+    """
+    Returns:
+        bool: True if files can be written with the compression.
+    """
+    return compression != "zstd" or zstandard is not None
+
+
+def part_name(file_name, part):
+    """
+    Returns the name of a part of a rotated output, the number of the part goes
+    before the extensions, e.g. changes.0002.ttl.gz.
+
+    Args:
+        file_name (str): The output file given by the user.
+        part (int): The number of the part, starting at 1.
+
+    Returns:
+        str: The name of the part.
+    """
+    root, compression_extension = os.path.splitext(file_name)
+    if compression_extension.lower() not in COMPRESSIONS:
+        root, compression_extension = file_name, ""
+    root, extension = os.path.splitext(root)
+    return f"{root}.{part:04d}{extension}{compression_extension}"
+
+
+def open_file(path, compression=None):
+    """
+    Opens an output file for writing text, compressing it if requested.
+
+    Args:
+        path (str): The file, it is overwritten.
+        compression (str): gzip, zstd or None.
+
+    Returns:
+        file: The file object.
+
+    Raises:
+        IOError: If the file cannot be opened.
+        ValueError: If zstandard is not installed for a zstd file.
+    """
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Writing .zst files requires the zstandard package")
+        return zstandard.open(
+            path, "wt", cctx=zstandard.ZstdCompressor(level=ZSTD_LEVEL), encoding="utf-8"
+        )
+    return open(path, "w", encoding="utf-8")
+
+
+def open_sink(
+    file_name,
+    header=None,
+    rotate_bytes=None,
+    rotate_seconds=None,
+    rotate_changes=None,
+    output_format="sparql",
+):
+    """
+    Opens an output file that changes are streamed to as soon as they are ready,
+    instead of collecting the output of a whole run in memory. Files ending with .gz
+    or .zst are compressed in a background thread, so the diff loop never waits for
+    the compression. Setting a rotation limit splits the output into numbered parts,
+    each starting with the header, see part_name. The sparql format writes the
+    text of the changes, the formats of changeset_formats serialize their triples.
+
+    Args:
+        file_name (str): The file the changes are written to, it is overwritten.
+        header (str): Written at the start of the file, e.g. the prefixes.
+        rotate_bytes (int): Starts a new part once a part holds this many characters
+                            of uncompressed output.
+        rotate_seconds (int): Starts a new part once a part is this many seconds old.
+        rotate_changes (int): Starts a new part once a part holds this many changes.
+        output_format (str): sparql or one of changeset_formats.SERIALIZERS.
+
+    Returns:
+        dict: The sink, passed to write, write_change, flush and close_sink.
+
+    Raises:
+        IOError: If the file cannot be opened.
+        ValueError: If zstandard is not installed for a zstd file.
+    """
+    rotate = bool(rotate_bytes or rotate_seconds or rotate_changes)
+    compression = compression_of(file_name)
+    path = part_name(file_name, 1) if rotate else file_name
+    now = time.monotonic()
+    sink = {
+        "file_name": file_name,
+        "header": header,
+        "format": output_format,
+        "compression": compression,
+        "rotate": rotate,
+        "rotate_bytes": rotate_bytes,
+        "rotate_seconds": rotate_seconds,
+        "rotate_changes": rotate_changes,
+        "paths": [path],
+        "file": open_file(path, compression),
+        "buffer": [],
+        "buffered": 0,
+        "flushed_at": now,
+        "part_started": now,
+        "part_bytes": 0,
+        "part_changes": 0,
+        "changes": 0,
+        "written": 0,
+        "queue": None,
+        "thread": None,
+        "error": None,
+    }
+    if compression:
+        sink["queue"] = queue.Queue(QUEUE_SIZE)
+        sink["thread"] = threading.Thread(
+            target=_write_queued, args=(sink,), name="output-sink", daemon=True
+        )
+        sink["thread"].start()
+    if header is not None:
+        write(sink, header + "\n")
+    return sink
+
+
+def write(sink, text):
+    """
+    Buffers text and writes the buffer to the file when it is large or old enough.
+
+    Args:
+        sink (dict): The sink from open_sink.
+        text (str): The text to write.
+    """
+    sink["buffer"].append(text)
+    sink["buffered"] += len(text)
+    sink["part_bytes"] += len(text)
+    if (
+        sink["buffered"] >= FLUSH_BYTES
+        or time.monotonic() - sink["flushed_at"] >= FLUSH_INTERVAL
+    ):
+        flush(sink)
+
+
+def write_change(sink, change_output):
+    """
+    Writes the output of one change, each part followed by a blank line. In the
+    other formats than sparql, only the serialized triples of the change are written.
+    A rotated output starts a new part before the change once the current part
+    reached a limit, so parts always hold complete changes.
+
+    Args:
+        sink (dict): The sink from open_sink.
+        change_output (iterable): The strings of the change, e.g. its description and diff,
+                                  or the description, changeset and separator in the other formats.
+    """
+    if sink["rotate"] and sink["part_changes"] and should_rotate(sink):
+        rotate(sink)
+    if sink["format"] != "sparql":
+        for text in changeset_formats.iter_serialized([change_output[1]], sink["format"]):
+            write(sink, text + "\n")
+    else:
+        for entity_change in change_output:
+            write(sink, entity_change + SEPARATOR)
+    sink["changes"] += 1
+    sink["part_changes"] += 1
+
+
+def should_rotate(sink):
+    """
+    Returns:
+        bool: True if the current part reached one of the rotation limits of the sink.
+    """
+    if sink["rotate_bytes"] and sink["part_bytes"] >= sink["rotate_bytes"]:
+        return True
+    if sink["rotate_changes"] and sink["part_changes"] >= sink["rotate_changes"]:
+        return True
+    return bool(
+        sink["rotate_seconds"]
+        and time.monotonic() - sink["part_started"] >= sink["rotate_seconds"]
+    )
+
+
+def rotate(sink):
+    """
+    Closes the current part and starts the next one with the header.
+
+    Args:
+        sink (dict): The sink from open_sink.
+    """
+    flush(sink)
+    path = part_name(sink["file_name"], len(sink["paths"]) + 1)
+    sink["paths"].append(path)
+    _submit(sink, "open", path)
+    sink["part_started"] = time.monotonic()
+    sink["part_bytes"] = 0
+    sink["part_changes"] = 0
+    if sink["header"] is not None:
+        write(sink, sink["header"] + "\n")
+
+
+def flush(sink):
+    """
+    Writes the buffered text to the file and flushes the file, so it reaches the
+    disk even if the run is interrupted later. Compressed files are written by the
+    background thread.
+
+    Args:
+        sink (dict): The sink from open_sink.
+
+    Raises:
+        IOError: If the background thread failed to write an earlier buffer.
+    """
+    text = "".join(sink["buffer"])
+    sink["written"] += len(text)
+    sink["buffer"] = []
+    sink["buffered"] = 0
+    _submit(sink, "write", text)
+    sink["flushed_at"] = time.monotonic()
+
+
+def close_sink(sink):
+    """
+    Flushes the remaining changes, waits for the background thread and closes the file.
+
+    Args:
+        sink (dict): The sink from open_sink.
+
+    Raises:
+        IOError: If the background thread failed to write the output.
+    """
+    try:
+        flush(sink)
+    finally:
+        if sink["thread"]:
+            sink["queue"].put(("close", None))
+            sink["thread"].join()
+        else:
+            _run(sink, "close", None)
+    if sink["error"]:
+        raise sink["error"]
+    logger.info(
+        "Wrote %s changes (%s characters) to %s",
+        sink["changes"],
+        sink["written"],
+        ", ".join(sink["paths"]),
+    )
+
+
+def _submit(sink, operation, argument):
+    # hands a file operation to the background thread, plain files are written right away
+    if sink["queue"] is None:
+        _run(sink, operation, argument)
+        return
+    if sink["error"]:
+        raise sink["error"]
+    sink["queue"].put((operation, argument))
+
+
+def _run(sink, operation, argument):
+    if operation == "write":
+        if argument:
+            sink["file"].write(argument)
+        sink["file"].flush()
+    elif operation == "open":
+        sink["file"].close()
+        sink["file"] = open_file(argument, sink["compression"])
+    elif operation == "close":
+        sink["file"].close()
+
+
+def _write_queued(sink):
+    # the background thread, compresses and writes the flushed buffers in order
+    while True:
+        operation, argument = sink["queue"].get()
+        if sink["error"] is None or operation == "close":
+            try:
+                _run(sink, operation, argument)
+            except Exception as e:
+                logger.error("Writing %s failed: %s", sink["paths"][-1], e)
+                sink["error"] = sink["error"] or e
+        if operation == "close":
+            return
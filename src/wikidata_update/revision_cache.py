@@ -0,0 +1,186 @@
+import hashlib
+import os
+import tempfile
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values, the cache is disabled until configure() is called with a directory
+CACHE_DIR = None
+CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# eviction frees space down to this fraction of CACHE_MAX_BYTES
+LOW_WATERMARK = 0.9
+
+HITS = 0
+MISSES = 0
+
+_CACHE_BYTES = 0
+_CACHE_LOCK = threading.Lock()
+
+
+def configure(cache_dir, max_bytes=None):
+    """
+    Enables the revision cache in the given directory.
+
+    Args:
+        cache_dir (str): The directory the cached revisions are stored in. None disables the cache.
+        max_bytes (int): The maximum size of the cache in bytes.
+    """
+    global CACHE_DIR, CACHE_MAX_BYTES, _CACHE_BYTES
+    if max_bytes is not None:
+        CACHE_MAX_BYTES = max_bytes
+    CACHE_DIR = cache_dir
+    if CACHE_DIR is None:
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _CACHE_BYTES = sum(size for _, _, size in _cached_files())
+    if _CACHE_BYTES > CACHE_MAX_BYTES:
+        evict()
+
+
+def cache_path(entity_id, revision_id, fmt="ttl"):
+    """
+    Returns the path a revision is stored at. The file name is the SHA-256 of
+    the entity, revision and format, spread over 256 sub directories.
+
+    Args:
+        entity_id (str): The ID of the Wikidata entity.
+        revision_id (str): The revision ID of the entity.
+        fmt (str): The format of the cached revision, e.g. ttl.
+
+    Returns:
+        str: The path of the cached revision.
+    """
+    key = hashlib.sha256(f"{entity_id}/{revision_id}.{fmt}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.{fmt}")
+
+
+def get(entity_id, revision_id, fmt="ttl"):
+    """
+    Reads a revision from the cache.
+
+    Args:
+        entity_id (str): The ID of the Wikidata entity.
+        revision_id (str): The revision ID of the entity.
+        fmt (str): The format of the cached revision, e.g. ttl.
+
+    Returns:
+        str: The cached revision, or None if it is not cached or the cache is disabled.
+    """
+    global HITS, MISSES
+    if CACHE_DIR is None or not revision_id:
+        return None
+    path = cache_path(entity_id, revision_id, fmt)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            data = file.read()
+        # the modification time is the recency used by evict()
+        os.utime(path)
+    except FileNotFoundError:
+        with _CACHE_LOCK:
+            MISSES += 1
+        return None
+    with _CACHE_LOCK:
+        HITS += 1
+    return data
+
+
+def put(entity_id, revision_id, data, fmt="ttl"):
+    """
+    Stores a revision in the cache. The revision is written to a temporary file
+    that is renamed into place, so readers in other threads or processes never
+    see a partial file.
+
+    Args:
+        entity_id (str): The ID of the Wikidata entity.
+        revision_id (str): The revision ID of the entity.
+        data (str): The revision.
+        fmt (str): The format of the cached revision, e.g. ttl.
+    """
+    global _CACHE_BYTES
+    if CACHE_DIR is None or not revision_id:
+        return
+    path = cache_path(entity_id, revision_id, fmt)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    encoded = data.encode("utf-8")
+    try:
+        # rewriting a cached revision replaces its file, its old size is not counted twice
+        replaced_size = os.path.getsize(path)
+    except OSError:
+        replaced_size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(encoded)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write {path} to the revision cache: {e}")
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return
+    with _CACHE_LOCK:
+        _CACHE_BYTES += len(encoded) - replaced_size
+        over_budget = _CACHE_BYTES > CACHE_MAX_BYTES
+    if over_budget:
+        evict()
+
+
+def evict():
+    """
+    Removes the least recently used revisions until the cache is below
+    LOW_WATERMARK of CACHE_MAX_BYTES.
+    """
+    global _CACHE_BYTES
+    with _CACHE_LOCK:
+        files = sorted(_cached_files(), key=lambda cached_file: cached_file[1])
+        total = sum(size for _, _, size in files)
+        target = CACHE_MAX_BYTES * LOW_WATERMARK
+        for path, _, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # already evicted by another process
+                pass
+            total -= size
+        _CACHE_BYTES = total
+
+
+def _cached_files():
+    for root, _, file_names in os.walk(CACHE_DIR):
+        for file_name in file_names:
+            if file_name.startswith(".tmp-"):
+                continue
+            path = os.path.join(root, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_mtime, stat.st_size
+
+
+def log_stats():
+    """
+    Logs the hit and miss counters of the revision cache.
+    """
+    if CACHE_DIR is None:
+        return
+    logger.info(
+        "Revision cache: %s hits, %s misses, %s bytes in %s",
+        HITS,
+        MISSES,
+        _CACHE_BYTES,
+        CACHE_DIR,
+    )
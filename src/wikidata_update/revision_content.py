@@ -0,0 +1,273 @@
+import json
+import threading
+import requests
+from collections import OrderedDict
+from wikidata_update import http_client
+from wikidata_update import revision_cache
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values
+API_URL = "https://www.wikidata.org/w/api.php"
+# the maximum number of revisions the API returns with content in one request
+CHUNK_SIZE = 50
+
+# the number of recently fetched revisions kept in memory for the diff engines
+MEMORY_REVISIONS = 1000
+
+REQUESTS = 0
+
+# revision id -> entity JSON, in the order the revisions were fetched
+_RECENT = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def change_revision_ids(changes):
+    """
+    Collects the old and new revisions needed to diff a window of changes.
+
+    Args:
+        changes (iterable): The changes from the recentchanges listing.
+
+    Returns:
+        list: The sorted revision IDs, without duplicates and without the 0 of new entities.
+    """
+    revision_ids = set()
+    for change in changes:
+        for key in ("old_revid", "revid"):
+            if change.get(key):
+                revision_ids.add(int(change[key]))
+    return sorted(revision_ids)
+
+
+def parse_revision(revision):
+    """
+    Decodes the entity of a revision returned by prop=revisions. Like the JSON of
+    Special:EntityData, the entity gets the lastrevid and modified fields of the revision.
+
+    Args:
+        revision (dict): The revision, in formatversion 2.
+
+    Returns:
+        dict: The entity JSON of the main slot, or None if the revision has no content.
+    """
+    content = revision.get("slots", {}).get("main", {}).get("content")
+    if content is None:
+        return None
+    entity = json.loads(content)
+    entity.setdefault("lastrevid", revision["revid"])
+    if "timestamp" in revision:
+        entity.setdefault("modified", revision["timestamp"])
+    return entity
+
+
+def remember(contents):
+    """
+    Keeps revisions in memory, evicting the oldest beyond MEMORY_REVISIONS.
+
+    Args:
+        contents (dict): The entity JSON of each revision ID.
+    """
+    with _LOCK:
+        for revision_id, entity in contents.items():
+            _RECENT[revision_id] = entity
+            _RECENT.move_to_end(revision_id)
+        while len(_RECENT) > MEMORY_REVISIONS:
+            _RECENT.popitem(last=False)
+
+
+def clear():
+    """
+    Removes the revisions kept in memory.
+    """
+    with _LOCK:
+        _RECENT.clear()
+
+
+def _query(params):
+    # runs a query and follows its continuation, yielding every page of the result
+    global REQUESTS
+    continue_params = {}
+    while True:
+        response = http_client.get(API_URL, params=dict(params, **continue_params))
+        REQUESTS += 1
+        response.raise_for_status()
+        data = response.json()
+        if "error" in data:
+            raise ValueError(data["error"].get("info"))
+        yield data
+        if "continue" not in data:
+            return
+        continue_params = data["continue"]
+
+
+def fetch_revisions(revision_ids, chunk_size=None):
+    """
+    Downloads the entity JSON of many revisions with prop=revisions, chunk_size
+    revisions per request. Revisions kept in memory or found in the revision cache
+    are not downloaded.
+
+    Args:
+        revision_ids (iterable): The revision IDs.
+        chunk_size (int): The number of revisions per request. Default is CHUNK_SIZE.
+
+    Returns:
+        dict: The entity JSON of each revision ID. Deleted, suppressed and unknown
+              revisions are left out.
+
+    Raises:
+        requests.exceptions.RequestException: If there is an issue with the network request.
+        ValueError: If the API answers with an error.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    contents = {}
+    missing = []
+    for revision_id in revision_ids:
+        revision_id = int(revision_id)
+        if not revision_id or revision_id in contents:
+            continue
+        with _LOCK:
+            entity = _RECENT.get(revision_id)
+        if entity is not None:
+            contents[revision_id] = entity
+            continue
+        # the cache is keyed by entity, revisions fetched here are unique by id alone
+        cached = revision_cache.get("revision", revision_id, fmt="json")
+        if cached is not None:
+            contents[revision_id] = json.loads(cached)
+        else:
+            missing.append(revision_id)
+
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start : start + chunk_size]
+        params = {
+            "action": "query",
+            "prop": "revisions",
+            "revids": "|".join(str(revision_id) for revision_id in chunk),
+            "rvslots": "main",
+            "rvprop": "content|ids|sha1|timestamp",
+            "format": "json",
+            "formatversion": 2,
+        }
+        for data in _query(params):
+            for revision_id in data.get("query", {}).get("badrevids", {}):
+                logger.warning(f"Revision {revision_id} not found")
+            for page in data.get("query", {}).get("pages", []):
+                for revision in page.get("revisions", []):
+                    entity = parse_revision(revision)
+                    if entity is None:
+                        logger.warning(f"Revision {revision['revid']} has no content")
+                        continue
+                    contents[revision["revid"]] = entity
+                    revision_cache.put(
+                        "revision", revision["revid"], json.dumps(entity), fmt="json"
+                    )
+    remember(contents)
+    return contents
+
+
+def fetch_change_revisions(changes, chunk_size=None):
+    """
+    Downloads the old and new revisions of a window of changes in chunks.
+
+    Args:
+        changes (iterable): The changes from the recentchanges listing.
+        chunk_size (int): The number of revisions per request. Default is CHUNK_SIZE.
+
+    Returns:
+        dict: The entity JSON of each revision ID, see fetch_revisions.
+    """
+    return fetch_revisions(change_revision_ids(changes), chunk_size)
+
+
+def iter_latest_revisions(start_time, end_time, change_types="edit|new", chunk_size=None):
+    """
+    Lists the entities changed in a time range together with the content of their
+    latest revision, using generator=recentchanges so the listing and the content
+    come in the same requests.
+
+    Args:
+        start_time (str): The start time in ISO 8601 format.
+        end_time (str): The end time in ISO 8601 format.
+        change_types (str): The types of changes, e.g. edit|new.
+        chunk_size (int): The number of entities per request. Default is CHUNK_SIZE.
+
+    Yields:
+        tuple: The entity ID, the revision ID and the entity JSON of the latest
+               revision of each changed entity.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    params = {
+        "action": "query",
+        "generator": "recentchanges",
+        "grcstart": end_time,
+        "grcend": start_time,
+        "grctype": change_types,
+        "grctoponly": 1,
+        "grclimit": chunk_size,
+        "prop": "revisions",
+        "rvslots": "main",
+        "rvprop": "content|ids|sha1|timestamp",
+        "format": "json",
+        "formatversion": 2,
+    }
+    for data in _query(params):
+        for page in data.get("query", {}).get("pages", []):
+            for revision in page.get("revisions", []):
+                entity = parse_revision(revision)
+                if entity is not None:
+                    yield page["title"], revision["revid"], entity
+
+
+def prefetch_changes(changes, chunk_size=None):
+    """
+    Downloads the revisions of changes chunk by chunk ahead of processing them, so
+    the diff of each change finds its revisions in memory.
+
+    Args:
+        changes (iterable): The changes from the recentchanges listing.
+        chunk_size (int): The number of revisions per request. Default is CHUNK_SIZE.
+
+    Yields:
+        dict: The changes, after the revisions of their chunk were fetched.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    # every change needs up to two revisions
+    changes_per_chunk = max(1, chunk_size // 2)
+    chunk = []
+    for change in changes:
+        chunk.append(change)
+        if len(chunk) >= changes_per_chunk:
+            _prefetch(chunk, chunk_size)
+            yield from chunk
+            chunk = []
+    if chunk:
+        _prefetch(chunk, chunk_size)
+        yield from chunk
+
+
+def _prefetch(changes, chunk_size):
+    # a failed prefetch only costs the requests of fetching the revisions one by one
+    try:
+        fetch_change_revisions(changes, chunk_size)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"Prefetching revisions failed: {e}")
+
+
+def log_stats():
+    """
+    Logs the number of requests made for revision contents.
+    """
+    if REQUESTS:
+        logger.info("Revision contents: %s requests", REQUESTS)
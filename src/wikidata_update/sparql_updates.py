@@ -2,13 +2,26 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import requests
-from datetime import datetime
+from datetime import datetime, timezone
 from wikidata_update import ttl_compare
+from wikidata_update import http_client
+from wikidata_update import revision_cache
+from wikidata_update import graph_cache
+from wikidata_update import follow
+from wikidata_update import event_stream
+from wikidata_update import json_diff
+from wikidata_update import revision_content
+from wikidata_update import output_sink
+from wikidata_update import binary_changes
 import argparse
+import os
 import argcomplete
 from dateutil.relativedelta import relativedelta
 import time
 import logging
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +42,40 @@ FILE_NAME = None
 TARGET_ENTITY_ID = None
 PRINT_OUTPUT = True
 DEBUG = False
+USER_AGENT = None
+WORKERS = 1
+ASYNC_LIMIT = None
+PROCESSES = None
+CHUNKSIZE = 1
+CACHE_DIR = None
+CACHE_MAX_BYTES = None
+GRAPH_CACHE_TRIPLES = None
+COALESCE = False
+COALESCE_WINDOW = None
+KEEP_REVISIONS = False
+FOLLOW = False
+CHECKPOINT_FILE = None
+POLL_MIN_INTERVAL = None
+POLL_MAX_INTERVAL = None
+STREAM_URL = None
+LAST_EVENT_ID = None
+ENGINE = "ttl"
+# the output file starts a new part once a part holds this much output, changes or seconds
+ROTATE_SIZE = None
+ROTATE_CHANGES = None
+ROTATE_SECONDS = None
+# format of the output file, sparql writes the SPARQL update text, rdf-patch and nquads
+# the serializations of changeset_formats, binary the columnar file of binary_changes
+OUTPUT_FORMAT = "sparql"
+# output format -> extensions of its files, before a .gz or .zst extension
+OUTPUT_EXTENSIONS = {
+    "sparql": (".ttl", ".txt"),
+    "rdf-patch": (".rdfp", ".txt"),
+    "nquads": (".nq", ".txt"),
+    "binary": (".wdcs",),
+}
+# writes the SPARQL updates grouped by subject and predicate, see ttl_compare.group_triples
+GROUP_TRIPLES = False
 
 
 # Define prefixes for the SPARQL query
@@ -101,59 +148,509 @@ PREFIXES = (
 SEPERATOR = "\n" + 80 * "=" + "\n"
 
 
-def get_wikidata_updates(start_time, end_time):
+class WikidataAPIError(Exception):
     """
-    Fetches recent changes from Wikidata within the specified time range.
+    Raised when the Wikidata API answers a request with an error.
+    """
+
+
+def iter_wikidata_updates(start_time, end_time, max_changes=None, direction="older"):
+    """
+    Lazily fetches recent changes from Wikidata within the specified time range,
+    following the rccontinue token from page to page.
     Args:
         start_time (str): The start time for fetching updates in ISO 8601 format.
         end_time (str): The end time for fetching updates in ISO 8601 format.
-    Returns:
-        list: A list of recent changes from Wikidata, where each change is represented as a dictionary.
-              Returns an empty list if no changes are found or if an error occurs.
+        max_changes (int): The maximum number of changes to yield. Not setting it
+                           yields every change of the time range.
+        direction (str): "older" lists the newest changes first, "newer" the oldest first.
+    Yields:
+        dict: The recent changes, page by page, so they can be processed while
+              later pages are still being listed.
     Raises:
         requests.exceptions.RequestException: If there is an issue with the network request.
+        WikidataAPIError: If the API answers with an error.
     Notes:
-        - The function constructs a query to the Wikidata API to fetch recent changes.
-        - The query parameters include the type of changes, the limit on the number of changes, and other properties.
-        - If the DEBUG flag is set, the function prints the curl request for debugging purposes.
-        - If the TARGET_ENTITY_ID is set, the function filters changes to only include those related to the specified entity.
+        - A page holds at most 500 changes, the limit of the API for regular users.
+        - If the TARGET_ENTITY_ID is set, only changes of the specified entity are listed.
     """
-    # Construct the API request URL
     api_url = "https://www.wikidata.org/w/api.php"
     params = {
         "action": "query",
         "list": "recentchanges",
-        "rcstart": end_time,
-        "rcend": start_time,
-        "rclimit": CHANGE_COUNT,
+        "rcdir": direction,
         "rcprop": "title|ids|sizes|flags|user|timestamp",
         "format": "json",
         "rctype": CHANGES_TYPE,  # Limit the type of changes to edits and new entities
     }
+    # rcstart is where the listing starts, so it depends on the direction
+    if direction == "older":
+        params["rcstart"] = end_time
+        params["rcend"] = start_time
+    else:
+        params["rcstart"] = start_time
+        params["rcend"] = end_time
     if TARGET_ENTITY_ID:
         params["rctitle"] = TARGET_ENTITY_ID
 
-    # create curl request for debug
+    yielded = 0
+    continue_params = {}
+    while max_changes is None or yielded < max_changes:
+        page_params = dict(params, **continue_params)
+        page_params["rclimit"] = 500 if max_changes is None else min(500, max_changes - yielded)
 
-    curl_request = f"curl -G '{api_url}'"
-    for key, value in params.items():
-        if value is not None:
-            curl_request += f" --data-urlencode '{key}={value}'"
-    logger.debug(("Query changes curl request: ", curl_request, "\n"))
+        # create curl request for debug
+        curl_request = f"curl -G '{api_url}'"
+        for key, value in page_params.items():
+            if value is not None:
+                curl_request += f" --data-urlencode '{key}={value}'"
+        logger.debug(("Query changes curl request: ", curl_request, "\n"))
 
-    try:
-        response = requests.get(api_url, params=params)
+        response = http_client.get(api_url, params=page_params)
         response.raise_for_status()
         data = response.json()
         if "error" in data:
-            logger.error("Error:", data["error"]["info"])
+            raise WikidataAPIError(data["error"]["info"])
+
+        for change in data.get("query", {}).get("recentchanges", []):
+            yield change
+            yielded += 1
+
+        if "continue" not in data:
             return
+        continue_params = data["continue"]
+
+
+def iter_listed_changes(changes):
+    """
+    Stops iterating the listed changes when listing more of them fails, so the
+    changes listed so far are still processed and written.
+    Args:
+        changes (iterable): The changes from the recentchanges listing or the event stream.
+    Yields:
+        dict: The changes, until the listing fails.
+    """
+    try:
+        yield from changes
+    except WikidataAPIError as e:
+        logger.error("Error: %s", e)
+    except requests.exceptions.RequestException as e:
+        logger.error("Listing changes failed: %s", e)
+
+
+def get_wikidata_updates(start_time, end_time):
+    """
+    Fetches recent changes from Wikidata within the specified time range.
+    Args:
+        start_time (str): The start time for fetching updates in ISO 8601 format.
+        end_time (str): The end time for fetching updates in ISO 8601 format.
+    Returns:
+        list: A list of recent changes from Wikidata, where each change is represented as a dictionary.
+              Returns None if an error occurs.
+    Notes:
+        - At most CHANGE_COUNT changes are listed, see iter_wikidata_updates.
+        - If the DEBUG flag is set, the function prints the curl request for debugging purposes.
+        - If the TARGET_ENTITY_ID is set, the function filters changes to only include those related to the specified entity.
+    """
+    try:
+        return list(iter_wikidata_updates(start_time, end_time, CHANGE_COUNT))
+    except WikidataAPIError as e:
+        logger.error("Error: %s", e)
+        return
     except requests.exceptions.RequestException as e:
-        logger.info("Request failed:", e)
+        logger.info("Request failed: %s", e)
+        return
+
+
+def describe_change(change):
+    """
+    Describes which revisions of an entity a change compares.
+    Args:
+        change (dict): A change from the recentchanges listing.
+    Returns:
+        str: The description written before the SPARQL update of the change.
+             Coalesced changes that kept their revisions also list every revision.
+    """
+    change_info = f'changes for entity: {change["title"]} between old_revid: {change["old_revid"]} and new_revid: {change["revid"]}'
+    if change.get("revisions"):
+        revisions = ", ".join(
+            f'{revision["revid"]} by {revision.get("user")} at {revision.get("timestamp")}'
+            for revision in change["revisions"]
+        )
+        change_info += f' merging {len(change["revisions"])} revisions: {revisions}'
+    return change_info
+
+
+def parse_timestamp(timestamp):
+    """
+    Parses a timestamp of the recentchanges listing.
+    Args:
+        timestamp (str): The timestamp in the form of 'YYYY-MM-DDTHH:MM:SSZ'.
+    Returns:
+        datetime: The parsed timestamp.
+    """
+    return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ")
+
+
+def merge_changes(changes, keep_revisions=False):
+    """
+    Merges consecutive revisions of one entity into a single net change.
+    Args:
+        changes (list): The changes of the entity, newest first, where the old_revid
+                        of each change is the revid of the next one.
+        keep_revisions (bool): Keeps the revid, user and timestamp of every merged
+                               change in the "revisions" field, oldest first.
+    Returns:
+        dict: The newest change, comparing the old revision of the oldest change to its revision.
+    """
+    merged_change = dict(changes[0])
+    merged_change["old_revid"] = changes[-1]["old_revid"]
+    if changes[-1].get("type") == "new":
+        merged_change["type"] = "new"
+    if keep_revisions and len(changes) > 1:
+        merged_change["revisions"] = [
+            {
+                "revid": change["revid"],
+                "old_revid": change["old_revid"],
+                "user": change.get("user"),
+                "timestamp": change.get("timestamp"),
+            }
+            for change in reversed(changes)
+        ]
+    return merged_change
+
+
+def coalesce_changes(changes, window=None, keep_revisions=False):
+    """
+    Coalesces bursts of edits to the same entity, so that only the first old_revid
+    and the last revid of a burst are diffed.
+    Args:
+        changes (iterable): The changes from the recentchanges listing, newest first.
+        window (int): The number of seconds a burst may span. Not setting it only
+                      merges changes that are next to each other in the listing.
+                      With a window, changes of other entities may come in between.
+        keep_revisions (bool): Keeps the merged revisions as metadata, see merge_changes.
+    Yields:
+        dict: The coalesced changes, in the order of the newest change of each burst.
+    Notes:
+        - Changes are only merged if their revisions form a chain, i.e. the old_revid of
+          a change is the revid of the older change merged into it.
+    """
+    # burst number -> changes of the burst, in the order the bursts started
+    bursts = OrderedDict()
+    # entity id -> burst number of the latest burst of the entity
+    latest_bursts = {}
+    for burst_number, change in enumerate(changes):
+        timestamp = parse_timestamp(change["timestamp"])
+
+        # bursts are started newest first, so they expire from the front
+        while bursts:
+            first_number, first_burst = next(iter(bursts.items()))
+            if window is None:
+                expired = first_number != latest_bursts.get(change["title"])
+            else:
+                newest = parse_timestamp(first_burst[0]["timestamp"])
+                expired = (newest - timestamp).total_seconds() > window
+            if not expired:
+                break
+            bursts.popitem(last=False)
+            yield merge_changes(first_burst, keep_revisions)
+
+        burst = bursts.get(latest_bursts.get(change["title"]))
+        if burst is not None and burst[-1]["old_revid"] == change["revid"]:
+            burst.append(change)
+        else:
+            bursts[burst_number] = [change]
+            latest_bursts[change["title"]] = burst_number
+
+    for burst in bursts.values():
+        yield merge_changes(burst, keep_revisions)
+
+
+def is_item_change(change):
+    """
+    Checks if a change is about an item (Q-entity).
+    Args:
+        change (dict): A change from the recentchanges listing.
+    Returns:
+        bool: True if the title of the change is an item ID, False otherwise.
+    """
+    return change["title"].startswith("Q") and change["title"][1:].isdigit()
+
+
+def process_change(change):
+    """
+    Computes the SPARQL update of a single change.
+    Args:
+        change (dict): A change from the recentchanges listing.
+    Returns:
+        list: The change description, the SPARQL update and the separator.
+              Returns an empty list if the change is not about an item.
+    """
+    if not is_item_change(change):
+        return []
+    change_info = describe_change(change)
+    engine = json_diff if ENGINE == "json" else ttl_compare
+    change_diff = engine.main(
+        change["title"],
+        change["old_revid"],
+        change["revid"],
+        DEBUG,
+        False,
+    )
+    return [change_info, changeset(change, change_diff), SEPERATOR]
+
+
+def changeset(change, change_diff):
+    """
+    Keeps the entity, revid and timestamp of a change next to its changed triples,
+    when the diffs return them instead of the SPARQL update, see ttl_compare.DIFF_RESULT.
+    Args:
+        change (dict): A change from the recentchanges listing.
+        change_diff (str or list): The result of the diff of the change.
+    Returns:
+        str or dict: The SPARQL update, or the entity, revid, timestamp and changes of the change.
+    """
+    if ttl_compare.DIFF_RESULT != "changes" or change_diff is None:
+        return change_diff
+    return {
+        "entity": change["title"],
+        "revid": change["revid"],
+        "timestamp": change["timestamp"],
+        "changes": change_diff,
+    }
+
+
+def ordered_map(function, items, workers):
+    """
+    Applies a function to items with a bounded pool of worker threads.
+    Args:
+        function (callable): The function applied to each item.
+        items (iterable): The items, consumed lazily.
+        workers (int): The number of items processed concurrently.
+    Yields:
+        The result of function for each item, in the order of items.
+    Notes:
+        - At most 2 * workers items are in flight, later items are only submitted
+          once the oldest pending one has been yielded.
+    """
+    if workers <= 1:
+        for item in items:
+            yield function(item)
         return
 
-    changes = data.get("query", {}).get("recentchanges", [])
-    return changes
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def process_changes(changes, workers=1):
+    """
+    Processes changes with a bounded pool of worker threads.
+    Args:
+        changes (iterable): The changes from the recentchanges listing.
+        workers (int): The number of changes processed concurrently.
+    Yields:
+        list: The output of process_change for each change, in the order of changes.
+    """
+    return ordered_map(process_change, changes, workers)
+
+
+def fetch_change_ttls(change):
+    """
+    Fetches the TTL of both revisions of a change.
+    Args:
+        change (dict): A change from the recentchanges listing.
+    Returns:
+        tuple: The change and the TTL pair returned by ttl_compare.get_ttl_pair,
+               or None if a revision could not be fetched.
+    """
+    try:
+        return change, ttl_compare.get_ttl_pair(
+            change["title"], change["old_revid"], change["revid"]
+        )
+    except requests.exceptions.RequestException as e:
+        logger.error("Error fetching TTL data of %s: %s", change["title"], e)
+        return change, None
+
+
+def process_changes_in_processes(changes, workers=1, processes=None, chunksize=1):
+    """
+    Processes changes by downloading the revisions in worker threads and diffing
+    them in the warm pool of diff worker processes of ttl_compare.
+    Args:
+        changes (iterable): The changes from the recentchanges listing.
+        workers (int): The number of changes downloaded concurrently.
+        processes (int): The number of diff worker processes.
+        chunksize (int): The number of TTL pairs sent to a diff worker at once.
+    Yields:
+        list: The change description, the SPARQL update and the separator of each
+              item change, in the order of changes.
+    Notes:
+        - The changes are diffed in batches of 2 * processes * chunksize, the next
+          batch is downloaded while the worker processes diff the current one.
+    """
+    item_changes = (change for change in changes if is_item_change(change))
+    fetched = ordered_map(fetch_change_ttls, item_changes, workers)
+    batch_size = 2 * (processes or 1) * chunksize
+    batch = list(islice(fetched, batch_size))
+    while batch:
+        # the batch is diffed in the worker processes while the next batch is downloaded
+        change_diffs = iter(
+            ttl_compare.diff_ttl_pairs(
+                [ttl_pair for _, ttl_pair in batch if ttl_pair is not None], processes, chunksize
+            )
+        )
+        next_batch = list(islice(fetched, batch_size))
+        for change, ttl_pair in batch:
+            # changes whose revisions could not be fetched have no diff
+            change_diff = None if ttl_pair is None else next(change_diffs)
+            yield [describe_change(change), changeset(change, change_diff), SEPERATOR]
+        batch = next_batch
+
+
+def process_changes_async(changes, limit):
+    """
+    Processes changes with the asyncio fetch API of ttl_compare.
+    Args:
+        changes (iterable): The changes from the recentchanges listing.
+        limit (int): The maximum number of revision downloads in flight.
+    Yields:
+        list: The change description, the SPARQL update and the separator of each
+              item change, in the order of changes.
+    """
+    # the changes in flight, the diffs are returned in their order
+    item_changes = deque()
+
+    def listed_item_changes():
+        for change in changes:
+            if is_item_change(change):
+                item_changes.append(change)
+                yield change
+
+    for change_diff in ttl_compare.diff_changes(listed_item_changes(), limit):
+        change = item_changes.popleft()
+        yield [describe_change(change), changeset(change, change_diff), SEPERATOR]
+
+
+def change_text(change_diff):
+    """
+    Returns:
+        str: The SPARQL update of a change, also when the diffs return the changed triples.
+    """
+    if isinstance(change_diff, dict):
+        return ttl_compare.changes_to_sparql(change_diff["changes"], change_diff["entity"])
+    return change_diff
+
+
+def process_change_with_change(change):
+    """
+    Computes the SPARQL update of a change, keeping the change next to its output.
+    Args:
+        change (dict): A change from the recentchanges listing.
+    Returns:
+        tuple: The change and the output of process_change.
+    """
+    return change, process_change(change)
+
+
+def follow_changes(checkpoint_file, file_name=None, workers=1, max_polls=None):
+    """
+    Keeps polling the recentchanges listing and processes new changes as they arrive.
+    After every change the checkpoint is updated with its rcid and timestamp and the
+    size of the output file, so a restarted run continues exactly after the last
+    processed change: the output file is truncated to the size in the checkpoint
+    and changes up to the rcid of the checkpoint are skipped.
+    Args:
+        checkpoint_file (str): The file the checkpoint is persisted in.
+        file_name (str): The file the changes are appended to.
+        workers (int): The number of changes processed concurrently.
+        max_polls (int): Stops after this many polls. Not setting it follows forever.
+    Notes:
+        - Without a checkpoint, following starts at START_DATE or at the current time.
+        - The polling interval adapts to the edit rate, see follow.next_interval.
+    """
+    checkpoint = follow.load_checkpoint(checkpoint_file)
+    if checkpoint is None:
+        start = START_DATE or datetime.now(timezone.utc)
+        checkpoint = {
+            "rcid": 0,
+            "timestamp": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "offset": None,
+        }
+        logger.info("No checkpoint found, following from %s", checkpoint["timestamp"])
+    else:
+        logger.info(
+            "Resuming after change %s at %s", checkpoint["rcid"], checkpoint["timestamp"]
+        )
+
+    output_file = None
+    if file_name:
+        output_file = open(file_name, "a+")
+        if checkpoint["offset"] is not None:
+            # drop the output of changes that were written but not checkpointed
+            output_file.truncate(checkpoint["offset"])
+        output_file.seek(0, 2)
+        if output_file.tell() == 0:
+            output_file.write(PREFIXES)
+            output_file.write("\n")
+
+    interval = follow.MIN_INTERVAL if POLL_MIN_INTERVAL is None else POLL_MIN_INTERVAL
+    polls = 0
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            changes = follow.new_changes(
+                iter_wikidata_updates(checkpoint["timestamp"], now, None, "newer"),
+                checkpoint,
+            )
+            change_count = 0
+            try:
+                for change, change_output in ordered_map(
+                    process_change_with_change, changes, workers
+                ):
+                    change_count += 1
+                    if change_output and change_output[1] is None:
+                        # the revisions could not be fetched, the change is skipped
+                        logger.warning("Skipped change without a diff: %s", change_output[0])
+                    elif change_output:
+                        change_info, change_diff, _ = change_output
+                        logger.info(change_info)
+                        if PRINT_OUTPUT:
+                            print(change_diff)
+                            print(SEPERATOR)
+                        if output_file:
+                            for entity_change in change_output:
+                                output_file.write(entity_change)
+                                output_file.write("\n\n")
+                    if output_file:
+                        output_file.flush()
+                    checkpoint = {
+                        "rcid": change["rcid"],
+                        "timestamp": change["timestamp"],
+                        "offset": output_file.tell() if output_file else None,
+                    }
+                    follow.save_checkpoint(checkpoint_file, checkpoint)
+            except WikidataAPIError as e:
+                logger.error("Error: %s", e)
+            except requests.exceptions.RequestException as e:
+                logger.error("Listing changes failed: %s", e)
+
+            interval = follow.next_interval(
+                interval, change_count, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL
+            )
+            logger.debug("Polled %s changes, next poll in %s seconds", change_count, interval)
+            if max_polls is None or polls < max_polls:
+                time.sleep(interval)
+    finally:
+        if output_file:
+            output_file.close()
 
 
 def verify_args(args):
@@ -168,11 +665,30 @@ def verify_args(args):
         - start: Ensures it is set with end date and is a valid date.
         - end: Ensures it is set with start date and is a valid date.
         - type: Ensures it is one of ["edit|new", "edit", "new"].
-        - file: Ensures it has a .ttl or .txt extension.
-        - number: Ensures it is an integer between 1 and 500.
+        - file: Ensures it has an extension of OUTPUT_EXTENSIONS for the format, e.g. .ttl
+          or .txt, optionally followed by .gz or .zst.
+        - number: Ensures it is an integer greater than 0 or 'all'.
         - id: Ensures it starts with "Q" followed by digits.
         - omit_print: Sets PRINT_OUTPUT to False if provided.
         - debug: Sets DEBUG to True if provided.
+        - user_agent: Sets the User-Agent header of the shared HTTP session.
+        - workers: Ensures it is an integer greater than 0.
+        - async_limit: Ensures it is an integer greater than 0.
+        - processes: Ensures it is an integer greater than 0.
+        - chunksize: Ensures it is an integer greater than 0.
+        - cache_dir: Sets the directory of the revision cache.
+        - cache_max_bytes: Ensures it is an integer greater than 0 and set with cache_dir.
+        - graph_cache_triples: Ensures it is an integer, 0 disables the graph cache.
+        - coalesce: Sets COALESCE to True if provided.
+        - coalesce_window: Ensures it is an integer greater than 0 and set with coalesce.
+        - keep_revisions: Ensures it is set with coalesce.
+        - stream: Ensures it is not set with follow or coalesce, coalesce_changes expects
+          the changes newest first and the stream lists them oldest first.
+        - rotate_size, rotate_changes, rotate_seconds: Ensure they are integers greater than 0,
+          set with file and not set with follow.
+        - format: Ensures it is one of OUTPUT_EXTENSIONS, set with file and not set with follow.
+          The binary format is only written to an uncompressed, not rotated file.
+        - group_triples: Ensures the format is sparql.
     Sets global variables based on the provided arguments:
         - CHANGES_TYPE
         - CHANGE_COUNT
@@ -183,8 +699,31 @@ def verify_args(args):
         - TARGET_ENTITY_ID
         - PRINT_OUTPUT
         - DEBUG
+        - USER_AGENT
+        - WORKERS
+        - ASYNC_LIMIT
+        - PROCESSES
+        - CHUNKSIZE
+        - CACHE_DIR
+        - CACHE_MAX_BYTES
+        - GRAPH_CACHE_TRIPLES
+        - COALESCE
+        - COALESCE_WINDOW
+        - KEEP_REVISIONS
+        - FOLLOW
+        - CHECKPOINT_FILE
+        - POLL_MIN_INTERVAL
+        - POLL_MAX_INTERVAL
+        - STREAM_URL
+        - LAST_EVENT_ID
+        - ENGINE
+        - ROTATE_SIZE
+        - ROTATE_CHANGES
+        - ROTATE_SECONDS
+        - OUTPUT_FORMAT
+        - GROUP_TRIPLES
     """
-    global CHANGES_TYPE, CHANGE_COUNT, LATEST, START_DATE, END_DATE, FILE_NAME, TARGET_ENTITY_ID, PRINT_OUTPUT, DEBUG
+    global CHANGES_TYPE, CHANGE_COUNT, LATEST, START_DATE, END_DATE, FILE_NAME, TARGET_ENTITY_ID, PRINT_OUTPUT, DEBUG, USER_AGENT, WORKERS, ASYNC_LIMIT, PROCESSES, CHUNKSIZE, CACHE_DIR, CACHE_MAX_BYTES, GRAPH_CACHE_TRIPLES, COALESCE, COALESCE_WINDOW, KEEP_REVISIONS, FOLLOW, CHECKPOINT_FILE, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, STREAM_URL, LAST_EVENT_ID, ENGINE, ROTATE_SIZE, ROTATE_CHANGES, ROTATE_SECONDS, OUTPUT_FORMAT, GROUP_TRIPLES
     if args.latest and (args.start or args.end):
         print("Cannot set latest and start or end date at the same time.")
         return False
@@ -208,27 +747,35 @@ def verify_args(args):
         LATEST = True
 
     if args.file:
-        if not args.file.endswith(".ttl") and not args.file.endswith(".txt"):
+        compression = output_sink.compression_of(args.file)
+        file_name = args.file[: -len(os.path.splitext(args.file)[1])] if compression else args.file
+        if not file_name.endswith(sum(OUTPUT_EXTENSIONS.values(), ())):
             print(
-                "Invalid file name. Please provide a file with .ttl or .txt extension."
+                "Invalid file name. Please provide a file with .ttl or .txt extension, or the "
+                "extension of the format, optionally compressed with .gz or .zst."
             )
             return False
+        if not output_sink.available(compression):
+            print("Cannot write .zst files, zstandard is not installed.")
+            return False
         FILE_NAME = args.file
 
     if args.number:
-        try:
-            if not int(args.number) or int(args.number) not in range(1, 501):
+        if args.number == "all":
+            CHANGE_COUNT = None
+        else:
+            try:
+                if int(args.number) < 1:
+                    print(
+                        "Invalid number argument. Please provide a number greater than 0 or 'all'."
+                    )
+                    return False
+                CHANGE_COUNT = int(args.number)
+            except ValueError:
                 print(
-                    "Invalid number argument. Please provide a valid number between 1 and 501."
+                    "Invalid number argument. Please provide a number greater than 0 or 'all'."
                 )
                 return False
-            else:
-                CHANGE_COUNT = args.number
-        except ValueError:
-            print(
-                "Invalid number argument. Please provide a valid number between 1 and 500."
-            )
-            return False
 
     if args.i:
         if args.i.startswith("Q") and args.i[1:].isdigit():
@@ -266,6 +813,234 @@ def verify_args(args):
 
     if args.no_log:
         logging.disable()
+
+    if args.user_agent:
+        USER_AGENT = args.user_agent
+
+    if args.workers:
+        try:
+            if int(args.workers) < 1:
+                print("Invalid workers argument. Please provide a number greater than 0.")
+                return False
+            WORKERS = int(args.workers)
+        except ValueError:
+            print("Invalid workers argument. Please provide a number greater than 0.")
+            return False
+
+    if args.async_limit:
+        try:
+            if int(args.async_limit) < 1:
+                print("Invalid async limit argument. Please provide a number greater than 0.")
+                return False
+            ASYNC_LIMIT = int(args.async_limit)
+        except ValueError:
+            print("Invalid async limit argument. Please provide a number greater than 0.")
+            return False
+
+    if args.processes:
+        try:
+            if int(args.processes) < 1:
+                print("Invalid processes argument. Please provide a number greater than 0.")
+                return False
+            PROCESSES = int(args.processes)
+        except ValueError:
+            print("Invalid processes argument. Please provide a number greater than 0.")
+            return False
+
+    if args.chunksize:
+        try:
+            if int(args.chunksize) < 1:
+                print("Invalid chunksize argument. Please provide a number greater than 0.")
+                return False
+            CHUNKSIZE = int(args.chunksize)
+        except ValueError:
+            print("Invalid chunksize argument. Please provide a number greater than 0.")
+            return False
+
+    if ASYNC_LIMIT and PROCESSES:
+        print("Cannot set async limit and processes at the same time.")
+        return False
+
+    if args.cache_dir:
+        CACHE_DIR = args.cache_dir
+
+    if args.cache_max_bytes:
+        if not args.cache_dir:
+            print("Cannot set cache max bytes without cache dir.")
+            return False
+        try:
+            if int(args.cache_max_bytes) < 1:
+                print("Invalid cache max bytes argument. Please provide a number greater than 0.")
+                return False
+            CACHE_MAX_BYTES = int(args.cache_max_bytes)
+        except ValueError:
+            print("Invalid cache max bytes argument. Please provide a number greater than 0.")
+            return False
+
+    if args.graph_cache_triples:
+        try:
+            if int(args.graph_cache_triples) < 0:
+                print("Invalid graph cache triples argument. Please provide a positive number or 0.")
+                return False
+            GRAPH_CACHE_TRIPLES = int(args.graph_cache_triples)
+        except ValueError:
+            print("Invalid graph cache triples argument. Please provide a positive number or 0.")
+            return False
+
+    if args.coalesce:
+        COALESCE = True
+
+    if args.coalesce_window:
+        if not args.coalesce:
+            print("Cannot set coalesce window without coalesce.")
+            return False
+        try:
+            if int(args.coalesce_window) < 1:
+                print("Invalid coalesce window argument. Please provide a number of seconds greater than 0.")
+                return False
+            COALESCE_WINDOW = int(args.coalesce_window)
+        except ValueError:
+            print("Invalid coalesce window argument. Please provide a number of seconds greater than 0.")
+            return False
+
+    if args.keep_revisions:
+        if not args.coalesce:
+            print("Cannot set keep revisions without coalesce.")
+            return False
+        KEEP_REVISIONS = True
+
+    if args.follow:
+        if not args.checkpoint:
+            print("Cannot follow changes without a checkpoint file.")
+            return False
+        if ASYNC_LIMIT or PROCESSES or COALESCE:
+            print("Cannot follow changes with async limit, processes or coalesce.")
+            return False
+        FOLLOW = True
+        CHECKPOINT_FILE = args.checkpoint
+
+    for name in ("poll_min_interval", "poll_max_interval"):
+        value = getattr(args, name)
+        if not value:
+            continue
+        option = name.replace("_", " ")
+        if not args.follow:
+            print(f"Cannot set {option} without follow.")
+            return False
+        try:
+            if float(value) <= 0:
+                print(f"Invalid {option} argument. Please provide a number of seconds greater than 0.")
+                return False
+        except ValueError:
+            print(f"Invalid {option} argument. Please provide a number of seconds greater than 0.")
+            return False
+        if name == "poll_min_interval":
+            POLL_MIN_INTERVAL = float(value)
+        else:
+            POLL_MAX_INTERVAL = float(value)
+
+    if POLL_MIN_INTERVAL and POLL_MAX_INTERVAL and POLL_MIN_INTERVAL > POLL_MAX_INTERVAL:
+        print("Poll min interval cannot be greater than poll max interval.")
+        return False
+
+    if args.stream:
+        if args.follow:
+            print("Cannot follow changes and read the event stream at the same time.")
+            return False
+        if args.coalesce:
+            print("Cannot coalesce the changes of the event stream, they arrive oldest first.")
+            return False
+        STREAM_URL = args.stream
+
+    if args.last_event_id:
+        if not args.stream:
+            print("Cannot set last event id without stream.")
+            return False
+        LAST_EVENT_ID = args.last_event_id
+
+    if args.engine:
+        if args.engine not in ("ttl", "json", "mapped", "ntriples"):
+            print("Invalid engine argument. Please provide one of ttl, json, mapped, ntriples.")
+            return False
+        if args.engine in ("json", "mapped", "ntriples") and (ASYNC_LIMIT or PROCESSES):
+            print(f"Cannot use the {args.engine} engine with async limit or processes.")
+            return False
+        ENGINE = args.engine
+
+    if args.rotate_size:
+        if not args.file:
+            print("Cannot set rotate size without file.")
+            return False
+        try:
+            if int(args.rotate_size) < 1:
+                print("Invalid rotate size argument. Please provide a number greater than 0.")
+                return False
+            ROTATE_SIZE = int(args.rotate_size)
+        except ValueError:
+            print("Invalid rotate size argument. Please provide a number greater than 0.")
+            return False
+
+    if args.rotate_changes:
+        if not args.file:
+            print("Cannot set rotate changes without file.")
+            return False
+        try:
+            if int(args.rotate_changes) < 1:
+                print("Invalid rotate changes argument. Please provide a number greater than 0.")
+                return False
+            ROTATE_CHANGES = int(args.rotate_changes)
+        except ValueError:
+            print("Invalid rotate changes argument. Please provide a number greater than 0.")
+            return False
+
+    if args.rotate_seconds:
+        if not args.file:
+            print("Cannot set rotate seconds without file.")
+            return False
+        try:
+            if int(args.rotate_seconds) < 1:
+                print("Invalid rotate seconds argument. Please provide a number greater than 0.")
+                return False
+            ROTATE_SECONDS = int(args.rotate_seconds)
+        except ValueError:
+            print("Invalid rotate seconds argument. Please provide a number greater than 0.")
+            return False
+
+    if args.follow and args.file and (
+        output_sink.compression_of(args.file) or ROTATE_SIZE or ROTATE_CHANGES or ROTATE_SECONDS
+    ):
+        print("Cannot follow changes into a compressed or rotated file.")
+        return False
+
+    if args.format:
+        if args.format not in OUTPUT_EXTENSIONS:
+            print(f"Invalid format argument. Please provide one of {', '.join(OUTPUT_EXTENSIONS)}.")
+            return False
+        if args.format != "sparql" and (not args.file or args.follow):
+            print(f"Cannot write the {args.format} format without file or while following changes.")
+            return False
+        if args.format == "binary" and (
+            output_sink.compression_of(args.file) or ROTATE_SIZE or ROTATE_CHANGES or ROTATE_SECONDS
+        ):
+            print("Cannot compress or rotate files of the binary format.")
+            return False
+        OUTPUT_FORMAT = args.format
+
+    if FILE_NAME:
+        compression = output_sink.compression_of(FILE_NAME)
+        file_name = FILE_NAME[: -len(os.path.splitext(FILE_NAME)[1])] if compression else FILE_NAME
+        if not file_name.endswith(OUTPUT_EXTENSIONS[OUTPUT_FORMAT]):
+            print(
+                f"Invalid file name. Please provide a file with "
+                f"{' or '.join(OUTPUT_EXTENSIONS[OUTPUT_FORMAT])} extension for the {OUTPUT_FORMAT} format."
+            )
+            return False
+
+    if args.group_triples:
+        if OUTPUT_FORMAT != "sparql":
+            print(f"Cannot group triples in the {OUTPUT_FORMAT} format, only in sparql.")
+            return False
+        GROUP_TRIPLES = True
     return True
 
 
@@ -310,29 +1085,6 @@ def verify_date(date):
     return True
 
 
-def write_to_file(data, file_name, prefixes):
-    """
-    Writes a list of entity changes to a file.
-
-    This function takes a list of entity changes, writes predefined prefixes to the file,
-    and then writes each entity change followed by two newline characters.
-
-    Args:
-        data (list): A list of strings, where each string represents an entity change.
-
-    Raises:
-        IOError: If the file cannot be opened or written to.
-    """
-    logger.info("Writing changes to file...")
-    with open(file_name, "w") as file:
-        file.write(prefixes)
-        file.write("\n")
-        for entity_change in data:
-            file.write(entity_change)
-            file.write("\n\n")
-    logger.info("Changes written to file.")
-
-
 def main():
     """
     Main function to retrieve recent changes from Wikidata and optionally store the output in a file.
@@ -347,7 +1099,7 @@ def main():
         -t, --type: str
             Filter the type of changes. Possible values are 'edit|new', 'edit', 'new'.
         -n, --number: int
-            Number of changes to get. Default is 5. Maximum is 501.
+            Number of changes to get. Default is 5. 'all' gets every change of the time period.
         -id: str
             Get changes for a specific entity by providing the entity ID.
         -st, --start: str
@@ -358,6 +1110,58 @@ def main():
             Omit printing the changes to the console.
         -d, --debug: bool
             Print API calls being used as curl requests.
+        --user-agent: str
+            User-Agent header sent with every request to the Wikidata services.
+        -w, --workers: int
+            Number of changes processed concurrently. The output keeps the order of the changes.
+        --async-limit: int
+            Download revisions with asyncio, keeping up to this many downloads in flight.
+        -p, --processes: int
+            Parse and diff revisions in this many worker processes.
+        --chunksize: int
+            Number of changes sent to a worker process at once.
+        --cache-dir: str
+            Directory to cache downloaded revisions in.
+        --cache-max-bytes: int
+            Maximum size of the revision cache in bytes. Default is 1 GiB.
+        --graph-cache-triples: int
+            Number of parsed triples kept in memory to reuse revisions between changes. 0 disables it.
+        --coalesce: bool
+            Merge consecutive edits of the same entity into one net change.
+        --coalesce-window: int
+            Number of seconds a merged burst of edits may span.
+        --keep-revisions: bool
+            List the merged revisions in the change description.
+        --follow: bool
+            Keep polling for new changes, resuming from the checkpoint file.
+        --checkpoint: str
+            File the last processed change is persisted in when following changes.
+        --poll-min-interval: float
+            Shortest number of seconds between two polls. Default is 1.
+        --poll-max-interval: float
+            Longest number of seconds between two polls. Default is 60.
+        --stream: str
+            Read changes from a recentchange event stream instead of polling the API.
+            Without a URL, the Wikimedia EventStreams service is used.
+        --last-event-id: str
+            Resume the event stream after this event.
+        --engine: str
+            Diff engine. 'ttl' diffs the TTL of the revisions, 'json' diffs their entity JSON
+            fetched in batches and maps only the changed parts to RDF, 'mapped' maps the whole
+            entity JSON to RDF locally and 'ntriples' diffs the lines of the N-Triples. Default is 'ttl'.
+        --rotate-size: int
+            Start a new numbered output file once the current one holds this many bytes of uncompressed output.
+        --rotate-changes: int
+            Start a new numbered output file once the current one holds this many changes.
+        --rotate-seconds: int
+            Start a new numbered output file once the current one is this many seconds old.
+        --format: str
+            Format of the output file. 'sparql' writes SPARQL Update, 'rdf-patch' an RDF Patch
+            transaction per revision, 'nquads' N-Quads with a graph per revision and 'binary' a
+            columnar changeset file with a dictionary of the terms, see binary_changes. Default is 'sparql'.
+        --group-triples: bool
+            Write the triples of the SPARQL updates grouped by subject and predicate, with the
+            ';' and ',' abbreviations of Turtle.
     Returns:
         None
     """
@@ -380,7 +1184,7 @@ def main():
     parser.add_argument(
         "-n",
         "--number",
-        help="number of changes to get, not setting will get 5 changes, Maximum number of changes is 501",
+        help="number of changes to get, not setting will get 5 changes, 'all' gets every change of the time period",
     )
     parser.add_argument(
         "-i",
@@ -412,6 +1216,113 @@ def main():
         help="disables all logging levels",
         action="store_true",
     )
+    parser.add_argument(
+        "--user-agent",
+        help="User-Agent header sent with every request to the Wikidata services",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="number of changes processed concurrently, not setting will process one change at a time",
+    )
+    parser.add_argument(
+        "--async-limit",
+        help="download revisions with asyncio, keeping up to this many downloads in flight",
+    )
+    parser.add_argument(
+        "-p",
+        "--processes",
+        help="parse and diff revisions in this many worker processes",
+    )
+    parser.add_argument(
+        "--chunksize",
+        help="number of changes sent to a worker process at once, default is 1",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="directory to cache downloaded revisions in, revisions never change so reruns reuse them",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        help="maximum size of the revision cache in bytes, least recently used revisions are evicted, default is 1 GiB",
+    )
+    parser.add_argument(
+        "--graph-cache-triples",
+        help="number of parsed triples kept in memory to reuse revisions between changes, 0 disables it, default is 500000",
+    )
+    parser.add_argument(
+        "--coalesce",
+        help="merge consecutive edits of the same entity into one net change",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--coalesce-window",
+        help="number of seconds a merged burst of edits may span, edits of other entities may come in between",
+    )
+    parser.add_argument(
+        "--keep-revisions",
+        help="list the merged revisions with their user and timestamp in the change description",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--follow",
+        help="keep polling for new changes and process them as they arrive, resuming from the checkpoint file",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="file the last processed change is persisted in, a restarted follow run continues after it",
+    )
+    parser.add_argument(
+        "--poll-min-interval",
+        help="shortest number of seconds between two polls when following changes, default is 1",
+    )
+    parser.add_argument(
+        "--poll-max-interval",
+        help="longest number of seconds between two polls when following changes, default is 60",
+    )
+    parser.add_argument(
+        "--stream",
+        nargs="?",
+        const=event_stream.STREAM_URL,
+        help="read changes from a recentchange event stream instead of polling the api, "
+        "not setting a url will use the Wikimedia EventStreams service",
+    )
+    parser.add_argument(
+        "--last-event-id",
+        help="resume the event stream after this event, the id of the last change is logged at exit",
+    )
+    parser.add_argument(
+        "--engine",
+        help="diff engine, ttl diffs the TTL of the revisions, json diffs their entity JSON "
+        "fetched in batches and maps only the changed parts to RDF, mapped maps the whole "
+        "entity JSON to RDF locally and diffs the triples like ttl, ntriples diffs the lines "
+        "of the N-Triples of the revisions without parsing them, default is ttl",
+    )
+    parser.add_argument(
+        "--rotate-size",
+        help="start a new numbered output file once the current one holds this many bytes of uncompressed output",
+    )
+    parser.add_argument(
+        "--rotate-changes",
+        help="start a new numbered output file once the current one holds this many changes",
+    )
+    parser.add_argument(
+        "--rotate-seconds",
+        help="start a new numbered output file once the current one is this many seconds old",
+    )
+    parser.add_argument(
+        "--format",
+        help="format of the output file, sparql writes SPARQL Update, rdf-patch an RDF Patch transaction "
+        "per revision, nquads N-Quads with a graph per revision, binary a columnar changeset file with "
+        "a dictionary of the terms, read it with binary_changes.py, default is sparql",
+    )
+    parser.add_argument(
+        "--group-triples",
+        help="write the triples of the SPARQL updates grouped by subject and predicate, "
+        "with the ; and , abbreviations of Turtle",
+        action="store_true",
+    )
 
     argcomplete.autocomplete(parser, always_complete_options="long")
 
@@ -428,38 +1339,133 @@ def main():
         logger.info("File Name: %s", FILE_NAME)
         logger.info("Debug: %s", DEBUG)
         logger.info("Print: %s", PRINT_OUTPUT)
+        logger.info("Workers: %s", WORKERS)
+        logger.info("Async limit: %s", ASYNC_LIMIT)
+        logger.info("Processes: %s", PROCESSES)
+        logger.info("Cache Dir: %s", CACHE_DIR)
+        logger.info("Coalesce: %s", COALESCE)
+        logger.info("Follow: %s", FOLLOW)
+        logger.info("Stream: %s", STREAM_URL)
+        logger.info("Engine: %s", ENGINE)
         print()
+        http_client.configure(
+            user_agent=USER_AGENT,
+            pool_maxsize=max(WORKERS, http_client.POOL_MAXSIZE),
+        )
+        revision_cache.configure(CACHE_DIR, CACHE_MAX_BYTES)
+        if GRAPH_CACHE_TRIPLES is not None:
+            graph_cache.configure(GRAPH_CACHE_TRIPLES)
+        # the mapped and ntriples engines diff like ttl, with other sources for the triples
+        ttl_compare.REVISION_SOURCE = {"mapped": "json", "ntriples": "ntriples"}.get(ENGINE, "ttl")
+        # the formats other than sparql are written from the changed triples
+        ttl_compare.DIFF_RESULT = "sparql" if OUTPUT_FORMAT == "sparql" else "changes"
+        ttl_compare.GROUP_TRIPLES = GROUP_TRIPLES
+        if FOLLOW:
+            try:
+                follow_changes(CHECKPOINT_FILE, FILE_NAME, WORKERS)
+            except KeyboardInterrupt:
+                logger.info("Stopped following changes.")
+            http_client.log_pool_stats()
+            revision_cache.log_stats()
+            graph_cache.log_stats()
+            return
         start_time = time.time()
-        changes = get_wikidata_updates(START_DATE, END_DATE)
+        # the events of the streamed changes in processing, in the order of their outputs,
+        # and the event of the last written change, to resume the stream after it
+        event_ids = deque()
+        last_event_id = None
+        if STREAM_URL:
+
+            def stream_changes():
+                for change in event_stream.iter_stream_changes(
+                    STREAM_URL,
+                    LAST_EVENT_ID,
+                    CHANGE_COUNT,
+                    tuple(CHANGES_TYPE.split("|")),
+                    TARGET_ENTITY_ID,
+                    since=START_DATE.strftime("%Y-%m-%dT%H:%M:%SZ") if START_DATE else None,
+                ):
+                    # only item changes are processed, each of them has exactly one output
+                    if is_item_change(change):
+                        event_ids.append(change["event_id"])
+                        yield change
+
+            changes = iter_listed_changes(stream_changes())
+        else:
+            changes = iter_listed_changes(
+                iter_wikidata_updates(START_DATE, END_DATE, CHANGE_COUNT)
+            )
+        if COALESCE:
+            changes = coalesce_changes(changes, COALESCE_WINDOW, KEEP_REVISIONS)
+        if ENGINE in ("json", "mapped"):
+            # the revisions of the next changes are fetched together
+            changes = revision_content.prefetch_changes(
+                change for change in changes if is_item_change(change)
+            )
         if PRINT_OUTPUT:
             print(PREFIXES)
         else:
             logger.info(
                 "Retrieving wikidata changes...\nChanges will not be printed to console."
             )
-        all_changes = []
-        for change in changes:
-            if change["title"].startswith("Q") and change["title"][1:].isdigit():
-                change_info = f'changes for entity: {change["title"]} between old_revid: {change["old_revid"]} and new_revid: {change["revid"]}'
-                logger.info(change_info)
-                all_changes.append(change_info)
-                all_changes.append(
-                    ttl_compare.main(
-                        change["title"],
-                        change["old_revid"],
-                        change["revid"],
-                        DEBUG,
-                        PRINT_OUTPUT,
-                    )
+        # every change is written as soon as it is diffed, the output is never held in memory
+        sink = writer = None
+        if FILE_NAME and OUTPUT_FORMAT == "binary":
+            writer = binary_changes.open_writer(FILE_NAME)
+        elif FILE_NAME:
+            sink = output_sink.open_sink(
+                FILE_NAME,
+                PREFIXES if OUTPUT_FORMAT == "sparql" else None,
+                ROTATE_SIZE,
+                ROTATE_SECONDS,
+                ROTATE_CHANGES,
+                OUTPUT_FORMAT,
+            )
+        # the changes are listed lazily, iter_listed_changes ends them on listing errors
+        try:
+            if ASYNC_LIMIT:
+                changes_output = process_changes_async(changes, ASYNC_LIMIT)
+            elif PROCESSES:
+                changes_output = process_changes_in_processes(
+                    changes, WORKERS, PROCESSES, CHUNKSIZE
                 )
-                all_changes.append(SEPERATOR)
+            else:
+                changes_output = process_changes(changes, WORKERS)
+            for change_output in changes_output:
+                event_id = event_ids.popleft() if event_ids else None
+                if not change_output:
+                    continue
+                change_info, change_diff, _ = change_output
+                logger.info(change_info)
+                if change_diff is None:
+                    # the json engine returns no diff when a revision could not be fetched
+                    logger.warning("Skipped change without a diff: %s", change_info)
+                    continue
+                if writer:
+                    binary_changes.write_changeset(writer, change_diff)
+                if sink:
+                    output_sink.write_change(sink, change_output)
                 if PRINT_OUTPUT:
+                    print(change_text(change_diff))
                     print(SEPERATOR)
+                last_event_id = event_id or last_event_id
+        except KeyboardInterrupt:
+            logger.info("Stopped processing changes.")
+        finally:
+            if sink:
+                output_sink.close_sink(sink)
+            if writer:
+                binary_changes.close_writer(writer)
+            ttl_compare.shutdown_process_pool()
+        if last_event_id:
+            logger.info("Resume the stream with --last-event-id '%s'", last_event_id)
 
-        if FILE_NAME:
-            write_to_file(all_changes, FILE_NAME, PREFIXES)
         end_time = time.time()
         logger.info(f"Execution time: {end_time - start_time} seconds")
+        http_client.log_pool_stats()
+        revision_cache.log_stats()
+        graph_cache.log_stats()
+        revision_content.log_stats()
 
 
 if __name__ == "__main__":
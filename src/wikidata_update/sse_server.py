@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+# default values
+TOPIC = "local.mediawiki.recentchange"
+HOST = "127.0.0.1"
+PORT = 8092
+
+
+def load_events(path):
+    """
+    Reads recorded events, one JSON event per line as written by event_stream.record_events.
+
+    Args:
+        path (str): The file of the recorded events.
+
+    Returns:
+        list: The events.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def event_id(offset):
+    """
+    Returns the id of the event at an offset, in the format of EventStreams.
+
+    Args:
+        offset (int): The offset of the event in the recording.
+
+    Returns:
+        str: The event id.
+    """
+    return json.dumps([{"topic": TOPIC, "partition": 0, "offset": offset}])
+
+
+def resume_offset(last_event_id):
+    """
+    Returns the offset of the first event to send to a client.
+
+    Args:
+        last_event_id (str): The Last-Event-ID header of the client, or None.
+
+    Returns:
+        int: The offset after the last event the client has seen, 0 for new clients.
+    """
+    if not last_event_id:
+        return 0
+    try:
+        return max(int(position["offset"]) for position in json.loads(last_event_id)) + 1
+    except (ValueError, TypeError, KeyError):
+        logger.warning(f"Ignoring invalid Last-Event-ID {last_event_id}")
+        return 0
+
+
+def format_event(offset, event):
+    """
+    Formats an event as a server-sent event.
+
+    Args:
+        offset (int): The offset of the event in the recording.
+        event (dict): The event.
+
+    Returns:
+        bytes: The event, ending with the blank line that dispatches it.
+    """
+    return (
+        f"event: message\nid: {event_id(offset)}\ndata: {json.dumps(event)}\n\n"
+    ).encode("utf-8")
+
+
+def make_handler(events, rate=None):
+    """
+    Creates a request handler that replays events to every client.
+
+    Args:
+        events (list): The recorded events.
+        rate (float): The number of events sent per second. Not setting it sends
+                      the events as fast as the client reads them.
+
+    Returns:
+        type: The request handler class.
+    """
+
+    class EventStreamHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def do_GET(self):
+            start = resume_offset(self.headers.get("Last-Event-ID"))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            try:
+                self.wfile.write(b":ok\n\n")
+                for offset in range(start, len(events)):
+                    self.wfile.write(format_event(offset, events[offset]))
+                    self.wfile.flush()
+                    if rate:
+                        time.sleep(1 / rate)
+            except (BrokenPipeError, ConnectionResetError):
+                # the client went away, it reconnects with its Last-Event-ID
+                pass
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    return EventStreamHandler
+
+
+def start_server(events, host=HOST, port=PORT, rate=None):
+    """
+    Starts a stand-in for EventStreams in a background thread.
+
+    Args:
+        events (list): The recorded events.
+        host (str): The host to listen on.
+        port (int): The port to listen on, 0 picks a free port.
+        rate (float): The number of events sent per second.
+
+    Returns:
+        ThreadingHTTPServer: The server, its URL is http://host:server.server_port/.
+                             Call shutdown() and server_close() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(events, rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """
+    Replays recorded recentchange events as a local server-sent events stream,
+    so the event stream consumer can be tested and benchmarked offline.
+
+    Command-line arguments:
+        events: str
+            File of recorded events, one JSON event per line.
+        --host: str
+            Host to listen on. Default is 127.0.0.1.
+        --port: int
+            Port to listen on. Default is 8092.
+        --rate: float
+            Number of events sent per second. Not setting it sends them as fast as possible.
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Replays recorded recentchange events as a server-sent events stream"
+    )
+    parser.add_argument("events", help="file of recorded events, one JSON event per line")
+    parser.add_argument("--host", default=HOST, help="host to listen on, default is 127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on, default is 8092")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="number of events sent per second, not setting it sends them as fast as possible",
+    )
+    args = parser.parse_args()
+
+    events = load_events(args.events)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(events, args.rate))
+    logger.info(
+        f"Replaying {len(events)} events on http://{args.host}:{server.server_port}/"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
-import requests
+import asyncio
+import functools
 import re
+import requests
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import rdflib
 from rdflib import Graph
-from rdflib.term import Literal
+from rdflib.term import BNode, Literal, URIRef
 import logging
+from wikidata_update import http_client
+from wikidata_update import revision_cache
+from wikidata_update import graph_cache
+from wikidata_update import revision_content
+from wikidata_update import wikibase_rdf
+from wikidata_update import ttl_tokenizer
+from wikidata_update import hash_diff
 
 # Configure logging
 logging.basicConfig(
@@ -13,6 +26,42 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)  # Create a logger
 
+# rdflib.NORMALIZE_LITERALS is global, parse_ttl turns it off for one parse at a time
+_NORMALIZE_LOCK = threading.Lock()
+
+# default values, main() overrides them
+DEBUG = False
+PRINT_OUTPUT = False
+# where the triples of a revision come from: ttl downloads and parses the Turtle,
+# json maps the entity JSON to RDF locally, see get_mapped_triples, and ntriples
+# downloads the N-Triples and diffs their lines, see diff_nt_lines
+REVISION_SOURCE = "ttl"
+
+# how diff_triples subtracts the revisions: set uses Python sets, numpy uses the
+# hash arrays of hash_diff, which are slower on the frozensets parse_ttl returns
+DIFF_BACKEND = "set"
+
+# what the diffs return: sparql for the SPARQL update text, changes for the list of
+# changed triples the other output formats are written from, see diff_result
+DIFF_RESULT = "sparql"
+
+# writes the triples of an update grouped by subject and predicate, with the ; and ,
+# abbreviations of Turtle, instead of one complete triple per line, see group_triples
+GROUP_TRIPLES = False
+
+# warm pool of diff worker processes, see get_process_pool
+PROCESS_POOL = None
+
+# the end of a subject block of Wikidata TTL, literals never span lines
+BLOCK_END = re.compile(r"(?<= \.)[ \t]*\n")
+
+# one term of an N-Triples line: an IRI, a blank node or a literal with its language or datatype
+NT_TERM = re.compile(
+    r'\s*(?:<([^>]*)>|_:(\S+)|"((?:[^"\\]|\\.)*)"(?:@([A-Za-z0-9-]+)|\^\^<([^>]*)>)?)'
+)
+NT_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+NT_ESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
 
 # Define prefixes for the SPARQL query
 WD = "PREFIX wd: <http://www.wikidata.org/entity/>"
@@ -128,10 +177,23 @@ PREFIXES = {
     "http://www.wikidata.org/value/": "v",
 }
 
+# all namespaces of PREFIXES in one pattern. The alternatives keep the order of PREFIXES,
+# which lists longer namespaces first, so each IRI is compacted by a single match the
+# same way as by replacing the namespaces one after the other
+PREFIX_PATTERN = re.compile("|".join(re.escape(uri) for uri in PREFIXES))
+PREFIX_NAMES = frozenset(prefix.split(":")[0] for prefix in PREFIXES.values())
+# the number of compacted terms remembered, predicates and common objects repeat a lot
+PREFIX_MEMO_SIZE = 4096
+
+# positions of a term in a triple, serialize_term formats each one differently
+SUBJECT, PREDICATE, OBJECT = "subject", "predicate", "object"
+TERM_MEMO_SIZE = 65536
+
 
 def get_entity_ttl(entity_id, revision_id):
     """
     Fetches the Turtle (TTL) representation of a Wikidata entity for a specific revision.
+    Revisions never change, so they are served from the revision cache when it is enabled.
 
     Args:
         entity_id (str): The ID of the Wikidata entity.
@@ -143,15 +205,65 @@ def get_entity_ttl(entity_id, revision_id):
     Raises:
         requests.exceptions.RequestException: If the request to the Wikidata API fails.
     """
-    api_url = f"https://www.wikidata.org/wiki/Special:EntityData/{entity_id}.ttl?revision={revision_id}&flavor=dump"
+    cached_ttl = revision_cache.get(entity_id, revision_id)
+    if cached_ttl is not None:
+        return cached_ttl
+
+    api_url = entity_ttl_url(entity_id, revision_id)
 
     curl_command = f"curl -X GET '{api_url}'"
     logger.debug(f"Curl command to reproduce the request:\n{curl_command}\n")
 
-    response = requests.get(api_url)
+    response = http_client.get(api_url)
+    if response.status_code == 200:
+        revision_cache.put(entity_id, revision_id, response.text)
     return response.text
 
 
+def parse_ttl(ttl):
+    """
+    Parses a Turtle (TTL) document into a set of triples. The Turtle of Wikidata is
+    read by ttl_tokenizer, other Turtle falls back to rdflib.
+    Args:
+        ttl (str): The content of the TTL file.
+    Returns:
+        frozenset: The (subject, predicate, object) triples of the document, with the
+                   compact terms of ttl_tokenizer.
+    Raises:
+        Exception: Any error raised by rdflib while parsing the document.
+    Notes:
+        - BCE dates are rewritten for rdflib by preprocess_bce_dates and restored after
+          parsing, so both parsers return the same xsd:dateTime terms.
+        - rdflib parses with literal normalization turned off, so typed literals keep their
+          lexical form ("+5", "01", "...Z") like in the tokenizer. Numbers written without
+          quotes are still converted by rdflib, Wikidata only writes them as plain integers.
+    """
+    try:
+        return frozenset(ttl_tokenizer.iter_ttl_triples(ttl))
+    except ttl_tokenizer.TurtleSyntaxError as e:
+        logger.debug(f"Parsing TTL data with rdflib: {e}")
+    graph = Graph()
+    ttl_fixed, bce_date_map = preprocess_bce_dates(ttl)
+    with _NORMALIZE_LOCK:
+        normalize = rdflib.NORMALIZE_LITERALS
+        rdflib.NORMALIZE_LITERALS = False
+        try:
+            graph.parse(data=ttl_fixed, format="ttl")
+        finally:
+            rdflib.NORMALIZE_LITERALS = normalize
+    # the rewritten dates are plain literals, "BCE_..." -> the compact term of the date
+    bce_dates = {
+        (custom_date.strip('"'), None, None): (original_date, None, ttl_tokenizer.XSD + "dateTime")
+        for custom_date, original_date in bce_date_map.items()
+    }
+    from_rdflib = ttl_tokenizer.from_rdflib
+    triples = []
+    for s, p, o in graph:
+        o = from_rdflib(o)
+        triples.append((from_rdflib(s), from_rdflib(p), bce_dates.get(o, o)))
+    return frozenset(triples)
+
+
 def diff_ttls(old_ttl, new_ttl, entity_id):
     """
     Calculate the differences between two Turtle (TTL) files and generate SPARQL update commands.
@@ -163,24 +275,346 @@ def diff_ttls(old_ttl, new_ttl, entity_id):
         entity_id (str): The ID of the entity being updated.
     Returns:
         str: A SPARQL update command string that includes both DELETE and INSERT commands.
+    Notes:
+        - Only the subject blocks that differ are parsed, see diff_ttl_blocks.
     """
-
-    g_old = Graph()
-    g_new = Graph()
-
-    old_ttl_fixed, old_bce_dates = preprocess_bce_dates(old_ttl)
-    new_ttl_fixed, old_bce_dates = preprocess_bce_dates(new_ttl)
+    try:
+        removed_triples, added_triples = diff_ttl_blocks(old_ttl, new_ttl)
+        return diff_triples(removed_triples, added_triples, entity_id)
+    except ttl_tokenizer.TurtleSyntaxError as e:
+        logger.debug(f"Parsing the whole TTL data: {e}")
 
     try:
-        g_old.parse(data=old_ttl_fixed, format="ttl")
-        g_new.parse(data=new_ttl_fixed, format="ttl")
+        old_triples = parse_ttl(old_ttl)
+        new_triples = parse_ttl(new_ttl)
     except:
         logger.error(f"Error parsing TTL data: {sys.exc_info()[0]}")
+        old_triples = new_triples = frozenset()
+
+    return diff_triples(old_triples, new_triples, entity_id)
+
+
+def split_blocks(ttl):
+    """
+    Splits Wikidata TTL into its prefix declarations and its subject blocks: the
+    entity, each statement, reference and value node, each ending with " .".
+    Args:
+        ttl (str): The content of the TTL file.
+    Returns:
+        tuple: The prefix declarations as one string and the set of blocks.
+    """
+    prefixes = []
+    blocks = set()
+    for block in BLOCK_END.split(ttl):
+        block = block.strip()
+        if not block:
+            continue
+        if block.startswith("@prefix") or block.startswith("PREFIX"):
+            prefixes.append(block)
+        else:
+            blocks.add(block)
+    return "\n".join(prefixes), blocks
+
+
+def block_subject(block, prefixes):
+    # the IRI of the subject a block starts with
+    subject = block.split(None, 1)[0]
+    if subject.startswith("<"):
+        return subject[1:-1]
+    prefix, _, local = subject.partition(":")
+    return prefixes.get(prefix, "") + local
+
+
+def term_forms(iri, prefixes):
+    # the ways an IRI can be written in a block, in full or with one of the prefixes
+    forms = {f"<{iri}>"}
+    if iri == ttl_tokenizer.RDF_TYPE:
+        forms.update((" a ", "\ta "))
+    for prefix, namespace in prefixes.items():
+        if iri.startswith(namespace):
+            forms.add(f"{prefix}:{iri[len(namespace):]}")
+    return forms
+
+
+def parse_blocks(blocks, prefixes):
+    # parses some blocks of a document with the prefixes of its header
+    triples = set()
+    for block in blocks:
+        triples.update(ttl_tokenizer.iter_ttl_triples(block, dict(prefixes)))
+    return triples
+
+
+def diff_ttl_blocks(old_ttl, new_ttl):
+    """
+    Diffs two revisions block by block. A typical edit changes one or two of the
+    hundreds of subject blocks of an entity, the identical blocks are discarded by
+    their hash and only the blocks that differ are parsed, so the time depends on
+    the size of the edit rather than the size of the entity.
+    Args:
+        old_ttl (str): The content of the old TTL file.
+        new_ttl (str): The content of the new TTL file.
+    Returns:
+        tuple: The removed and the added triples, with the compact terms of ttl_tokenizer.
+    Raises:
+        ttl_tokenizer.TurtleSyntaxError: If the blocks cannot be diffed on their own,
+                                         e.g. because the prefixes differ.
+    """
+    old_header, old_blocks = split_blocks(old_ttl)
+    new_header, new_blocks = split_blocks(new_ttl)
+    if old_header and new_header and old_header != new_header:
+        raise ttl_tokenizer.TurtleSyntaxError("The revisions declare different prefixes")
+    prefixes = {}
+    for _ in ttl_tokenizer.iter_ttl_triples(old_header or new_header, prefixes):
+        # a block that starts with a SPARQL style PREFIX runs into the next subject
+        raise ttl_tokenizer.TurtleSyntaxError("Triples in the prefix declarations")
+
+    unchanged = old_blocks & new_blocks
+    removed_triples = parse_blocks(old_blocks - unchanged, prefixes)
+    added_triples = parse_blocks(new_blocks - unchanged, prefixes)
+    removed_triples, added_triples = (
+        removed_triples - added_triples,
+        added_triples - removed_triples,
+    )
+
+    # the same triple can be written again in an unchanged block of its subject,
+    # e.g. the truthy triple of two best statements with the same value
+    candidates = removed_triples | added_triples
+    if candidates:
+        # the ways the predicates of each subject can be written
+        forms = {}
+        for s, p, _ in candidates:
+            forms.setdefault(s, set()).update(term_forms(p, prefixes))
+        related = [
+            block
+            for block in unchanged
+            if any(form in block for form in forms.get(block_subject(block, prefixes), ()))
+        ]
+        if related:
+            kept = parse_blocks(related, prefixes)
+            removed_triples -= kept
+            added_triples -= kept
+    return removed_triples, added_triples
+
+
+def diff_triples(old_triples, new_triples, entity_id):
+    """
+    Calculate the differences between the triples of two revisions and generate SPARQL update commands.
+    Args:
+        old_triples (frozenset): The triples of the old revision.
+        new_triples (frozenset): The triples of the new revision.
+        entity_id (str): The ID of the entity being updated.
+    Returns:
+        str: A SPARQL update command string that includes both DELETE and INSERT commands,
+             or the changed rows, see diff_result.
+    """
+    # Calculate differences: triples in the new revision but not in the old one are additions
+    # and triples in the old revision but not in the new one are deletions
+    if use_hash_diff():
+        removed, added = hash_diff.diff_hashed(old_triples, new_triples)
+    else:
+        removed, added = old_triples - new_triples, new_triples - old_triples
+    added_triples = [to_rdflib_triple(triple) for triple in added]
+    removed_triples = [to_rdflib_triple(triple) for triple in removed]
+    return diff_result(removed_triples, added_triples, entity_id)
+
+
+def use_hash_diff():
+    """
+    Decides whether diff_triples uses the hash arrays of hash_diff.
+    Returns:
+        bool: True for the numpy backend if numpy is installed, False for Python sets.
+    """
+    return DIFF_BACKEND == "numpy" and hash_diff.available()
+
+
+def to_rdflib_triple(triple):
+    # only the triples that changed are turned into rdflib terms
+    to_rdflib = ttl_tokenizer.to_rdflib
+    return to_rdflib(triple[0]), to_rdflib(triple[1]), to_rdflib(triple[2])
+
+
+def get_revision_triples(entity_id, revision_id):
+    """
+    Returns the parsed triples of an entity revision. Each revision is downloaded
+    and parsed at most once while it stays in the graph cache, so the new revision
+    of one change is reused as the old revision of the next change of the entity.
+    Args:
+        entity_id (str): The ID of the entity.
+        revision_id (int): The ID of the revision. If 0, there are no triples.
+    Returns:
+        frozenset: The triples of the revision.
+    Notes:
+        - With REVISION_SOURCE set to json, the triples are mapped from the entity JSON.
+        - With REVISION_SOURCE set to ntriples, the unparsed N-Triples lines are returned.
+    """
+    if revision_id == 0:
+        return frozenset()
+    triples = graph_cache.get(revision_id, REVISION_SOURCE)
+    if triples is None:
+        if REVISION_SOURCE == "json":
+            triples = get_mapped_triples(entity_id, revision_id)
+        elif REVISION_SOURCE == "ntriples":
+            triples = nt_lines(get_entity_nt(entity_id, revision_id))
+        else:
+            triples = parse_ttl(get_entity_ttl(entity_id, revision_id))
+        graph_cache.put(revision_id, triples, REVISION_SOURCE)
+    return triples
+
+
+def get_mapped_triples(entity_id, revision_id):
+    """
+    Returns the triples of an entity revision by mapping its JSON to RDF locally,
+    so no TTL has to be downloaded. The JSON is fetched through revision_content,
+    which batches the revisions of the next changes.
+    Args:
+        entity_id (str): The ID of the entity.
+        revision_id (int): The ID of the revision.
+    Returns:
+        frozenset: The triples of the revision, as in its flavor=dump TTL.
+    Raises:
+        ValueError: If the revision is not available.
+    """
+    entity = revision_content.fetch_revisions([revision_id]).get(int(revision_id))
+    if entity is None:
+        raise ValueError(f"Revision {revision_id} of {entity_id} is not available")
+    return wikibase_rdf.entity_triples(entity)
 
-    # Calculate differences: triples in g_new but not in g_old are additions
-    # and triples in g_old but not in g_new are deletions
-    added_triples = g_new - g_old
-    removed_triples = g_old - g_new
+
+def get_entity_nt(entity_id, revision_id):
+    """
+    Fetches the N-Triples representation of a Wikidata entity for a specific revision.
+    Like the TTL, it is served from the revision cache when it is enabled.
+    Args:
+        entity_id (str): The ID of the Wikidata entity.
+        revision_id (str): The revision ID of the entity.
+    Returns:
+        str: The N-Triples representation of the entity.
+    Raises:
+        requests.exceptions.RequestException: If the request to the Wikidata API fails.
+    """
+    cached_nt = revision_cache.get(entity_id, revision_id, fmt="nt")
+    if cached_nt is not None:
+        return cached_nt
+
+    api_url = entity_nt_url(entity_id, revision_id)
+    logger.debug(f"Curl command to reproduce the request:\ncurl -X GET '{api_url}'\n")
+
+    response = http_client.get(api_url)
+    if response.status_code == 200:
+        revision_cache.put(entity_id, revision_id, response.text, fmt="nt")
+    return response.text
+
+
+def nt_lines(nt):
+    """
+    Splits an N-Triples document into its triples, one line each, without parsing them.
+    Args:
+        nt (str): The content of the N-Triples file.
+    Returns:
+        frozenset: The lines of the triples, without comments and blank lines.
+    """
+    lines = (line.strip() for line in nt.splitlines())
+    return frozenset(line for line in lines if line and not line.startswith("#"))
+
+
+def nt_unescape(text):
+    # resolves the escape sequences of N-Triples strings and IRIs
+    if "\\" not in text:
+        return text
+
+    def unescape(match):
+        code = match.group(1) or match.group(2)
+        if code:
+            return chr(int(code, 16))
+        return NT_ESCAPES.get(match.group(3), match.group(3))
+
+    return NT_ESCAPE.sub(unescape, text)
+
+
+def parse_nt_line(line):
+    """
+    Parses one N-Triples line into rdflib terms, the same terms the Turtle parser
+    creates for the triple.
+    Args:
+        line (str): The line of the triple.
+    Returns:
+        tuple: The (subject, predicate, object) of the triple.
+    Raises:
+        ValueError: If the line is not a valid triple.
+    """
+    terms = []
+    position = 0
+    for _ in range(3):
+        match = NT_TERM.match(line, position)
+        if match is None:
+            raise ValueError(f"Invalid N-Triples line: {line}")
+        iri, bnode, lexical, language, datatype = match.groups()
+        if iri is not None:
+            terms.append(URIRef(nt_unescape(iri)))
+        elif bnode is not None:
+            terms.append(BNode(bnode))
+        else:
+            lexical = nt_unescape(lexical)
+            if datatype is not None:
+                terms.append(Literal(lexical, datatype=URIRef(nt_unescape(datatype))))
+            else:
+                terms.append(Literal(lexical, lang=language))
+        position = match.end()
+    if line[position:].strip() != ".":
+        raise ValueError(f"Invalid N-Triples line: {line}")
+    return tuple(terms)
+
+
+def diff_nt_lines(old_lines, new_lines, entity_id):
+    """
+    Calculate the differences between the N-Triples lines of two revisions and generate
+    SPARQL update commands. The lines are compared as strings and only the lines that
+    differ are parsed, so the output is the same as diff_triples without a graph.
+    Args:
+        old_lines (frozenset): The N-Triples lines of the old revision.
+        new_lines (frozenset): The N-Triples lines of the new revision.
+        entity_id (str): The ID of the entity being updated.
+    Returns:
+        str: A SPARQL update command string that includes both DELETE and INSERT commands,
+             or the changed rows, see diff_result.
+    """
+    added_triples = [parse_nt_line(line) for line in new_lines - old_lines]
+    removed_triples = [parse_nt_line(line) for line in old_lines - new_lines]
+    return diff_result(removed_triples, added_triples, entity_id)
+
+
+def diff_nts(old_nt, new_nt, entity_id):
+    """
+    Calculate the differences between two N-Triples files and generate SPARQL update commands.
+    Args:
+        old_nt (str): The content of the old N-Triples file.
+        new_nt (str): The content of the new N-Triples file.
+        entity_id (str): The ID of the entity being updated.
+    Returns:
+        str: A SPARQL update command string that includes both DELETE and INSERT commands.
+    """
+    try:
+        return diff_nt_lines(nt_lines(old_nt), nt_lines(new_nt), entity_id)
+    except ValueError as e:
+        logger.error(f"Error parsing N-Triples data: {e}")
+        return diff_nt_lines(frozenset(), frozenset(), entity_id)
+
+
+def diff_result(removed_triples, added_triples, entity_id):
+    """
+    Builds the result of a diff from the removed and added triples, see DIFF_RESULT.
+    Args:
+        removed_triples (iterable): The triples of the old revision only, as rdflib terms.
+        added_triples (iterable): The triples of the new revision only, as rdflib terms.
+        entity_id (str): The ID of the entity being updated.
+    Returns:
+        str or list: The SPARQL update with the DELETE and INSERT commands, or the
+                     ("D", s, p, o) and ("A", s, p, o) rows of the triples written to it.
+    """
+    if DIFF_RESULT == "changes":
+        return [
+            ("D",) + triple for triple, _ in output_triples(removed_triples, entity_id)
+        ] + [("A",) + triple for triple, _ in output_triples(added_triples, entity_id)]
 
     delete_commands = triples_to_sparql(removed_triples, "DELETE", entity_id)
     insert_commands = triples_to_sparql(added_triples, "INSERT", entity_id)
@@ -188,6 +622,50 @@ def diff_ttls(old_ttl, new_ttl, entity_id):
     return delete_commands + '\n' + insert_commands
 
 
+def changes_to_sparql(rows, entity_id):
+    """
+    Converts the rows returned by diff_result back into the SPARQL update of the diff.
+    Args:
+        rows (iterable): ("D", s, p, o) and ("A", s, p, o) tuples of rdflib terms.
+        entity_id (str): The ID of the entity being updated.
+    Returns:
+        str: The same SPARQL update diff_result returns with DIFF_RESULT set to sparql.
+    """
+    rows = list(rows)
+    removed_triples = [row[1:] for row in rows if row[0] == "D"]
+    added_triples = [row[1:] for row in rows if row[0] == "A"]
+    delete_commands = triples_to_sparql(removed_triples, "DELETE", entity_id)
+    insert_commands = triples_to_sparql(added_triples, "INSERT", entity_id)
+    return delete_commands + '\n' + insert_commands
+
+
+def output_triples(triples, entity_id):
+    """
+    Serializes the triples and skips the ones that are not written to the output.
+    Args:
+        triples (iterable): The triples, as rdflib terms.
+        entity_id (str): The entity ID to filter subjects by.
+    Yields:
+        tuple: The triple and its serialized subject, predicate and object.
+    Notes:
+        - Triples containing '/owl#' in the subject, predicate, or object are skipped.
+        - Subjects starting with 'wd:Q' that do not match the given entity_id are skipped.
+        - Subjects starting with 'wd:P' are skipped.
+    """
+    entity = f"wd:{entity_id}"
+    for triple in triples:
+        s_str = serialize_term(triple[0], SUBJECT)
+        p_str = serialize_term(triple[1], PREDICATE)
+        o_str = serialize_term(triple[2], OBJECT)
+        if s_str is None or p_str is None or o_str is None:
+            continue
+        if s_str.startswith("wd:Q") and s_str != entity:
+            continue
+        if s_str.startswith("wd:P"):
+            continue
+        yield tuple(triple), (s_str, p_str, o_str)
+
+
 def triples_to_sparql(triples, operation, entity_id):
     """
     Converts a list of RDF triples into SPARQL commands.
@@ -198,47 +676,88 @@ def triples_to_sparql(triples, operation, entity_id):
     Returns:
         str: A string containing the SPARQL commands.
     Notes:
-        - Triples containing '/owl#' in the subject, predicate, or object are skipped.
-        - Subjects starting with 'wd:Q' that do not match the given entity_id are skipped.
-        - Subjects starting with 'wd:P' are skipped.
+        - Triples are skipped as described in output_triples.
         - Blank nodes in subjects are preserved as-is.
         - Predicates are formatted to replace prefixes and 'rdf:type' is replaced with 'a'.
         - Objects are formatted to handle strings, URIs, and literals appropriately.
+        - Each distinct term is serialized once by serialize_term.
+        - With GROUP_TRIPLES set, the triples are sorted and grouped by group_triples.
     """
-    commands = []
-    parsed_triples = []
-    for s, p, o in triples:
-        if "/owl#" in p or "/owl#" in s or "/owl#" in o:
-            continue
-
-        # Format subject, predicate, and object to SPARQL-friendly strings
-        s_str = f"{s}" if not s.startswith("_:") else s  # Blank nodes as-is
-        p_str = f"{p}"
+    if GROUP_TRIPLES:
+        parsed_triples = group_triples(
+            serialized for _, serialized in output_triples(triples, entity_id)
+        )
+    else:
+        parsed_triples = "\n".join(
+            f" {s_str} {p_str} {o_str} ."
+            for _, (s_str, p_str, o_str) in output_triples(triples, entity_id)
+        )
 
-        s_str = replace_prefixes(s_str)
+    sparql = f"\n{operation} {{\n" + parsed_triples + "\n}"
+    if PRINT_OUTPUT:
+        print(sparql)
+    return sparql
 
-        p_str = replace_prefixes(p_str)
-        if p_str == "rdf:type":
-            p_str = "a"
-        o_str = replace_prefixes(o)
 
-        if s_str.startswith("wd:Q") and s_str != f"wd:{entity_id}":
-            continue
-        if s_str.startswith("wd:P"):
+def group_triples(serialized_triples):
+    """
+    Groups serialized triples with the abbreviations of Turtle: the triples of a
+    subject are joined with ';' and the objects of a subject and predicate with ',',
+    so statement and value nodes are written once instead of on every line.
+    Args:
+        serialized_triples (iterable): The serialized subject, predicate and object of the triples.
+    Returns:
+        str: The grouped triples, sorted and grouped in one pass.
+    Notes:
+        - Every subject starts a line, each further predicate starts an indented line.
+        - The objects of the same subject and predicate are written on one line.
+    """
+    parts = []
+    objects = []
+    subject = predicate = None
+    for s_str, p_str, o_str in sorted(serialized_triples):
+        if s_str == subject and p_str == predicate:
+            objects.append(o_str)
             continue
+        if objects:
+            parts.append(", ".join(objects))
+            objects = []
+        if s_str == subject:
+            parts.append(f" ;\n  {p_str} ")
+        else:
+            if subject is not None:
+                parts.append(" .\n")
+            parts.append(f" {s_str} {p_str} ")
+            subject = s_str
+        predicate = p_str
+        objects.append(o_str)
+    if objects:
+        parts.append(", ".join(objects) + " .")
+    return "".join(parts)
 
-        # For objects: handle strings (quotes), URIs (angle brackets), and literals
-        o_str = format_object_for_sparql(o, o_str)
 
-        parsed_triples.append(f" {s_str} {p_str} {o_str} .")
+@functools.lru_cache(maxsize=TERM_MEMO_SIZE, typed=True)
+def serialize_term(term, position=OBJECT):
+    """
+    Serializes a term of a triple for a SPARQL update. Predicates and common objects
+    repeat thousands of times per batch, so the results are kept in a bounded cache.
 
-        # Construct the SPARQL command
-        commands.append(f"{operation} DATA {{ {s_str} {p_str} {o_str} . }};")
+    Args:
+        term (rdflib.term.Identifier or str): The subject, predicate or object.
+        position (str): SUBJECT, PREDICATE or OBJECT, where the term is in the triple.
+
+    Returns:
+        str: The serialized term, None if triples with this term are skipped.
+    """
+    if "/owl#" in term:
+        return None
+    term_str = replace_prefixes(term)
+    if position == SUBJECT:
+        return term_str
+    if position == PREDICATE:
+        return "a" if term_str == "rdf:type" else term_str
+    return format_object_for_sparql(term, term_str)
 
-    if PRINT_OUTPUT:
-        print(f"\n{operation} {{\n" + "\n".join(parsed_triples) + "\n}")
-    return (f"\n{operation} {{\n" + "\n".join(parsed_triples) + "\n}")
-    
 
 def format_object_for_sparql(o, o_str):
     """
@@ -294,9 +813,20 @@ def replace_prefixes(url):
     Returns:
         str: The URL with the prefixes replaced by their shorthand notation.
     """
-    for uri, prefix in PREFIXES.items():
-        url = url.replace(uri, f"{prefix}:")
-    return url
+    url = str(url)
+    if "http" not in url:
+        # every namespace starts with http, most literals need no lookup
+        return url
+    return _compact(url)
+
+
+def _prefix_of(match):
+    return f"{PREFIXES[match.group()]}:"
+
+
+@functools.lru_cache(maxsize=PREFIX_MEMO_SIZE)
+def _compact(url):
+    return PREFIX_PATTERN.sub(_prefix_of, url)
 
 
 def has_prefix(element):
@@ -309,11 +839,8 @@ def has_prefix(element):
     Returns:
         bool: True if the element starts with any prefix, False otherwise.
     """
-    all_prefixes = PREFIXES.values()
-    for prefix in all_prefixes:
-        if element.startswith(f"{prefix}:"):
-            return True
-    return False
+    prefix, colon, _ = element.partition(":")
+    return bool(colon) and prefix in PREFIX_NAMES
 
 
 def main(entity_id, old_revision_id, new_revision_id, debug, print_output=True):
@@ -321,11 +848,16 @@ def main(entity_id, old_revision_id, new_revision_id, debug, print_output=True):
     Compare the TTL (Terse Triple Language) representations of two revisions of an entity.
     Args:
         entity_id (str): The ID of the entity to compare.
-        old_revision_id (int): The ID of the old revision. If 0, the old TTL will be an empty string.
+        old_revision_id (int): The ID of the old revision. If 0, the old revision has no triples.
         new_revision_id (int): The ID of the new revision.
         debug (bool): Flag to enable or disable debug mode.
     Returns:
-        str: The differences between the TTL representations of the old and new revisions.
+        str: The differences between the TTL representations of the old and new revisions,
+             or None if a revision could not be fetched or parsed.
+    Notes:
+        - Parsed revisions are kept in the graph cache, see get_revision_triples. Without
+          the graph cache, only the subject blocks that differ are parsed, see diff_ttl_blocks.
+        - With REVISION_SOURCE set to ntriples, the N-Triples lines are diffed instead.
     """
     global DEBUG, PRINT_OUTPUT
     DEBUG = debug
@@ -333,15 +865,304 @@ def main(entity_id, old_revision_id, new_revision_id, debug, print_output=True):
         logger.setLevel(logging.DEBUG)
     PRINT_OUTPUT = print_output
 
-    old_ttl = get_entity_ttl(entity_id, old_revision_id)
+    if REVISION_SOURCE == "ttl" and graph_cache.MAX_TRIPLES <= 0:
+        # nothing is kept for the next change, parse only the blocks that differ
+        try:
+            old_ttl = get_entity_ttl(entity_id, old_revision_id) if int(old_revision_id) else ""
+            new_ttl = get_entity_ttl(entity_id, new_revision_id)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching TTL data of {entity_id}: {e}")
+            return None
+        return diff_ttls(old_ttl, new_ttl, entity_id)
+
+    try:
+        old_triples = get_revision_triples(entity_id, old_revision_id)
+        new_triples = get_revision_triples(entity_id, new_revision_id)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching revisions of {entity_id}: {e}")
+        return None
+    except (ValueError, SyntaxError) as e:
+        # rdflib raises BadSyntax, a SyntaxError, get_mapped_triples a ValueError
+        logger.error(f"Error parsing revisions of {entity_id}: {e}")
+        return None
+
+    if REVISION_SOURCE == "ntriples":
+        try:
+            return diff_nt_lines(old_triples, new_triples, entity_id)
+        except ValueError as e:
+            logger.error(f"Error parsing N-Triples data of {entity_id}: {e}")
+            return None
+    return diff_triples(old_triples, new_triples, entity_id)
+
+
+def entity_ttl_url(entity_id, revision_id):
+    """
+    Builds the Special:EntityData URL of the dump flavored Turtle of an entity revision.
+
+    Args:
+        entity_id (str): The ID of the Wikidata entity.
+        revision_id (str): The revision ID of the entity.
+
+    Returns:
+        str: The URL of the TTL representation of the revision.
+    """
+    return f"https://www.wikidata.org/wiki/Special:EntityData/{entity_id}.ttl?revision={revision_id}&flavor=dump"
+
+
+def entity_nt_url(entity_id, revision_id):
+    """
+    Builds the Special:EntityData URL of the dump flavored N-Triples of an entity revision.
+
+    Args:
+        entity_id (str): The ID of the Wikidata entity.
+        revision_id (str): The revision ID of the entity.
+
+    Returns:
+        str: The URL of the N-Triples representation of the revision.
+    """
+    return f"https://www.wikidata.org/wiki/Special:EntityData/{entity_id}.nt?revision={revision_id}&flavor=dump"
+
+
+async def get_entity_ttl_async(entity_id, revision_id, session=None, semaphore=None):
+    """
+    Fetches the Turtle (TTL) representation of a Wikidata entity revision without blocking the event loop.
+
+    Args:
+        entity_id (str): The ID of the Wikidata entity.
+        revision_id (str): The revision ID of the entity.
+        session (aiohttp.ClientSession): The session created by http_client.create_async_session.
+        semaphore (asyncio.Semaphore): Limits the number of downloads in flight.
+
+    Returns:
+        str: The TTL representation of the entity.
+    """
+    cached_ttl = revision_cache.get(entity_id, revision_id)
+    if cached_ttl is not None:
+        return cached_ttl
+
+    api_url = entity_ttl_url(entity_id, revision_id)
+    logger.debug(f"Curl command to reproduce the request:\ncurl -X GET '{api_url}'\n")
+    if semaphore is None:
+        ttl = await http_client.get_text_async(api_url, session=session)
+    else:
+        async with semaphore:
+            ttl = await http_client.get_text_async(api_url, session=session)
+    revision_cache.put(entity_id, revision_id, ttl)
+    return ttl
+
+
+async def get_revision_triples_async(entity_id, revision_id, session=None, semaphore=None):
+    """
+    Returns the parsed triples of an entity revision without blocking the event loop.
+    Args:
+        entity_id (str): The ID of the entity.
+        revision_id (int): The ID of the revision. If 0, there are no triples.
+        session (aiohttp.ClientSession): The session created by http_client.create_async_session.
+        semaphore (asyncio.Semaphore): Limits the number of downloads in flight.
+    Returns:
+        frozenset: The triples of the revision.
+    """
+    if revision_id == 0:
+        return frozenset()
+    # the TTL is fetched whatever the REVISION_SOURCE is
+    triples = graph_cache.get(revision_id, "ttl")
+    if triples is None:
+        ttl = await get_entity_ttl_async(entity_id, revision_id, session, semaphore)
+        # parsing is CPU bound, keep the event loop free for the other downloads
+        loop = asyncio.get_running_loop()
+        triples = await loop.run_in_executor(None, parse_ttl, ttl)
+        graph_cache.put(revision_id, triples, "ttl")
+    return triples
+
+
+async def _diff_revisions(entity_id, old_revision_id, new_revision_id, semaphore, session):
+    try:
+        old_triples, new_triples = await asyncio.gather(
+            get_revision_triples_async(entity_id, old_revision_id, session, semaphore),
+            get_revision_triples_async(entity_id, new_revision_id, session, semaphore),
+        )
+    except Exception as e:
+        # the errors of aiohttp, an optional dependency, and of the parsers
+        logger.error(f"Error fetching or parsing revisions of {entity_id}: {e}")
+        return None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, diff_triples, old_triples, new_triples, entity_id
+    )
+
+
+async def diff_revisions_async(entity_id, old_revision_id, new_revision_id, limit=2, session=None):
+    """
+    Compares two revisions of an entity, downloading both revisions concurrently.
+    Args:
+        entity_id (str): The ID of the entity to compare.
+        old_revision_id (int): The ID of the old revision. If 0, the old TTL will be an empty string.
+        new_revision_id (int): The ID of the new revision.
+        limit (int): The maximum number of downloads in flight.
+        session (aiohttp.ClientSession): The session created by http_client.create_async_session.
+    Returns:
+        str: The differences between the TTL representations of the old and new revisions,
+             or None if a revision could not be fetched or parsed.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    return await _diff_revisions(
+        entity_id, old_revision_id, new_revision_id, semaphore, session
+    )
+
+
+async def iter_diff_changes_async(changes, limit=50):
+    """
+    Compares the revisions of many changes, keeping up to `limit` downloads in flight.
+    The changes are consumed lazily and at most `limit` of them are diffed at once,
+    each diff is yielded as soon as the diffs of the changes before it are yielded.
+    Args:
+        changes (iterable): Changes from the recentchanges listing, with title, old_revid and revid.
+        limit (int): The maximum number of downloads in flight.
+    Yields:
+        str: The differences of each change, in the order of changes, or None if a
+             revision could not be fetched or parsed.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    session = http_client.create_async_session(limit)
+    pending = deque()
+    try:
+        for change in changes:
+            pending.append(
+                asyncio.ensure_future(
+                    _diff_revisions(
+                        change["title"],
+                        change["old_revid"],
+                        change["revid"],
+                        semaphore,
+                        session,
+                    )
+                )
+            )
+            if len(pending) >= limit:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # the consumer stopped early, the changes still in flight are dropped
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if session is not None:
+            await session.close()
+
+
+async def diff_changes_async(changes, limit=50):
+    """
+    Compares the revisions of many changes, keeping up to `limit` downloads in flight.
+    Args:
+        changes (iterable): Changes from the recentchanges listing, with title, old_revid and revid.
+        limit (int): The maximum number of downloads in flight.
+    Returns:
+        list: The differences of each change, in the order of changes.
+    """
+    return [change_diff async for change_diff in iter_diff_changes_async(changes, limit)]
+
+
+def diff_changes(changes, limit=50):
+    """
+    Runs iter_diff_changes_async in a new event loop and yields its diffs one by one,
+    so the output of the first changes is written while the next ones are downloaded.
+    Args:
+        changes (iterable): Changes from the recentchanges listing, with title, old_revid and revid.
+        limit (int): The maximum number of downloads in flight.
+    Yields:
+        str: The differences of each change, in the order of changes.
+    """
+    loop = asyncio.new_event_loop()
+    change_diffs = iter_diff_changes_async(changes, limit)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(change_diffs.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(change_diffs.aclose())
+        loop.close()
+
+
+def get_ttl_pair(entity_id, old_revision_id, new_revision_id):
+    """
+    Fetches the TTL of both revisions of a change.
+    Args:
+        entity_id (str): The ID of the entity.
+        old_revision_id (int): The ID of the old revision. If 0, the old TTL will be an empty string.
+        new_revision_id (int): The ID of the new revision.
+    Returns:
+        tuple: The old TTL, the new TTL and the entity ID, as accepted by diff_ttl_pairs.
+    """
+    old_ttl = ""
+    if old_revision_id != 0:
+        old_ttl = get_entity_ttl(entity_id, old_revision_id)
     new_ttl = get_entity_ttl(entity_id, new_revision_id)
+    return old_ttl, new_ttl, entity_id
+
 
-    if old_revision_id == 0:
-        old_ttl = ""
+def _init_diff_worker(diff_result="sparql", group_triples=False):
+    global PRINT_OUTPUT, DIFF_RESULT, GROUP_TRIPLES
+    # results are printed by the parent process
+    PRINT_OUTPUT = False
+    DIFF_RESULT = diff_result
+    GROUP_TRIPLES = group_triples
 
+
+def _diff_ttl_pair(ttl_pair):
+    old_ttl, new_ttl, entity_id = ttl_pair
     return diff_ttls(old_ttl, new_ttl, entity_id)
 
 
+def get_process_pool(processes=None):
+    """
+    Returns the pool of diff worker processes, starting it on first use.
+    The workers stay alive until shutdown_process_pool is called, so rdflib is
+    imported once per worker and not once per change.
+    Args:
+        processes (int): The number of worker processes, defaults to the number of cores.
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: The pool of diff worker processes.
+    """
+    global PROCESS_POOL
+    if PROCESS_POOL is None:
+        PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_diff_worker,
+            initargs=(DIFF_RESULT, GROUP_TRIPLES),
+        )
+    return PROCESS_POOL
+
+
+def shutdown_process_pool():
+    """
+    Stops the diff worker processes started by get_process_pool.
+    """
+    global PROCESS_POOL
+    if PROCESS_POOL is not None:
+        PROCESS_POOL.shutdown()
+        PROCESS_POOL = None
+
+
+def diff_ttl_pairs(ttl_pairs, processes=None, chunksize=1):
+    """
+    Calculates the SPARQL updates of many TTL pairs in the pool of diff worker processes.
+    Parsing and graph differencing are CPU bound, running them in processes lets
+    large batches scale with the number of cores.
+    Args:
+        ttl_pairs (iterable): Tuples of old TTL, new TTL and entity ID.
+        processes (int): The number of worker processes, only used when the pool is started.
+        chunksize (int): The number of TTL pairs sent to a worker at once.
+    Returns:
+        iterator: The SPARQL update of each TTL pair, in the order of ttl_pairs.
+    """
+    return get_process_pool(processes).map(
+        _diff_ttl_pair, ttl_pairs, chunksize=chunksize
+    )
+
+
 def preprocess_bce_dates(ttl_data):
     """
     Converts BCE dates in Turtle data into a custom string format (BCE_YYYY-MM-DDTHH:MM:SSZ).
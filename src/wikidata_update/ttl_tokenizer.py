@@ -0,0 +1,244 @@
+import re
+from rdflib.term import BNode, Identifier, Literal, URIRef
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+# the tokens of the Turtle written by Wikibase; long strings, collections, blank node
+# property lists and escaped local names are not part of it and end up as errors
+TTL_TOKEN = re.compile(
+    r"""
+    (?P<space>\s+|\#[^\n]*)
+    | <(?P<iri>[^<>"\s]*)>
+    | (?P<literal>"(?P<string>(?:[^"\\\n\r]|\\.)*)"
+        (?:@(?P<lang>[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+        | \^\^(?:<(?P<datatype>[^<>"\s]*)>
+            | (?P<datatype_prefix>[A-Za-z][\w-]*)?:(?P<datatype_local>(?:[\w:%-]|\.(?=[\w:%-]))*)))?)
+    | _:(?P<bnode>[\w-]+(?:\.[\w-]+)*)
+    | (?P<pname>(?P<prefix>[A-Za-z][\w-]*)?:(?P<local>(?:[\w:%-]|\.(?=[\w:%-]))*))
+    | (?P<number>[+-]?(?:\d+\.\d+|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>@?[A-Za-z]+)
+    | (?P<punct>[.;,])
+    | (?P<error>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+ESCAPE = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))", re.DOTALL)
+ESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+# parser states
+SUBJECT, PREDICATE, OBJECT, AFTER_OBJECT, AFTER_SEMICOLON = range(5)
+PREFIX_NAME, PREFIX_IRI, PREFIX_END = range(5, 8)
+
+
+class TurtleSyntaxError(ValueError):
+    """
+    Raised for Turtle the tokenizer does not handle, rdflib can still parse it.
+    """
+
+
+def unescape(text):
+    # resolves the escape sequences of strings and IRIs
+    if "\\" not in text:
+        return text
+
+    def replace(match):
+        code = match.group(1) or match.group(2)
+        if code:
+            return chr(int(code, 16))
+        return ESCAPES.get(match.group(3), match.group(3))
+
+    return ESCAPE.sub(replace, text)
+
+
+def number_datatype(number):
+    # the datatype of a number written without quotes
+    if "e" in number or "E" in number:
+        return XSD + "double"
+    if "." in number:
+        return XSD + "decimal"
+    return XSD + "integer"
+
+
+def iter_ttl_triples(ttl, prefixes=None):
+    """
+    Tokenizes the Turtle that Wikidata writes and yields its triples while scanning,
+    without building a graph. The terms are compact: IRIs are strings, blank nodes
+    are strings starting with _: and literals are (lexical form, language, datatype)
+    tuples. The lexical form is kept as written, so negative years stay valid
+    xsd:dateTime values.
+
+    Args:
+        ttl (str or bytes): The Turtle document, e.g. the content of the response.
+        prefixes (dict): The prefixes declared before the document, e.g. in the header
+                         of a split document. The declarations of the document are added.
+
+    Yields:
+        tuple: The (subject, predicate, object) of each triple.
+
+    Raises:
+        TurtleSyntaxError: If the document uses Turtle the tokenizer does not handle.
+    """
+    if isinstance(ttl, bytes):
+        ttl = ttl.decode("utf-8")
+    if prefixes is None:
+        prefixes = {}
+    state = SUBJECT
+    subject = predicate = prefix_name = None
+    sparql_prefix = False
+
+    for match in TTL_TOKEN.finditer(ttl):
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+
+        term = None
+        if kind == "iri":
+            term = unescape(match.group("iri"))
+        elif kind == "pname":
+            prefix = match.group("prefix") or ""
+            if state == PREFIX_NAME:
+                if match.group("local"):
+                    raise TurtleSyntaxError(f"Invalid prefix {match.group()}")
+                prefix_name = prefix
+                state = PREFIX_IRI
+                continue
+            try:
+                term = prefixes[prefix] + match.group("local")
+            except KeyError:
+                raise TurtleSyntaxError(f"Unknown prefix {prefix}") from None
+        elif kind == "literal":
+            datatype = match.group("datatype")
+            if datatype is not None:
+                datatype = unescape(datatype)
+            elif match.group("datatype_local") is not None:
+                prefix = match.group("datatype_prefix") or ""
+                if prefix not in prefixes:
+                    raise TurtleSyntaxError(f"Unknown prefix {prefix}")
+                datatype = prefixes[prefix] + match.group("datatype_local")
+            term = (unescape(match.group("string")), match.group("lang"), datatype)
+        elif kind == "bnode":
+            term = "_:" + match.group("bnode")
+        elif kind == "number":
+            term = (match.group(), None, number_datatype(match.group()))
+        elif kind == "word":
+            word = match.group()
+            if word == "a" and state in (PREDICATE, AFTER_SEMICOLON):
+                predicate = RDF_TYPE
+                state = OBJECT
+                continue
+            if word in ("true", "false") and state == OBJECT:
+                term = (word, None, XSD + "boolean")
+            elif word in ("@prefix", "PREFIX") and state == SUBJECT:
+                sparql_prefix = word == "PREFIX"
+                state = PREFIX_NAME
+                continue
+            else:
+                raise TurtleSyntaxError(f"Unexpected {word}")
+        elif kind == "punct":
+            punct = match.group()
+            if state == AFTER_OBJECT and punct == ",":
+                state = OBJECT
+            elif state in (AFTER_OBJECT, AFTER_SEMICOLON) and punct == ";":
+                state = AFTER_SEMICOLON
+            elif state in (AFTER_OBJECT, AFTER_SEMICOLON, PREFIX_END) and punct == ".":
+                state = SUBJECT
+            else:
+                raise TurtleSyntaxError(f"Unexpected {punct} at {match.start()}")
+            continue
+        else:
+            raise TurtleSyntaxError(f"Unexpected {match.group()!r} at {match.start()}")
+
+        if state == SUBJECT and not isinstance(term, tuple):
+            subject = term
+            state = PREDICATE
+        elif state in (PREDICATE, AFTER_SEMICOLON) and kind in ("iri", "pname"):
+            predicate = term
+            state = OBJECT
+        elif state == OBJECT:
+            yield subject, predicate, term
+            state = AFTER_OBJECT
+        elif state == PREFIX_IRI and kind == "iri":
+            prefixes[prefix_name] = term
+            state = SUBJECT if sparql_prefix else PREFIX_END
+        else:
+            raise TurtleSyntaxError(f"Unexpected {match.group()} at {match.start()}")
+
+    if state != SUBJECT:
+        raise TurtleSyntaxError("Unexpected end of document")
+
+
+def to_rdflib(term):
+    """
+    Converts a compact term to the rdflib term the Turtle parser creates for it.
+
+    Args:
+        term (str or tuple): The compact term, rdflib terms are returned unchanged.
+
+    Returns:
+        rdflib.term.Identifier: The URIRef, BNode or Literal.
+    """
+    if isinstance(term, Identifier):
+        return term
+    if isinstance(term, tuple):
+        lexical, language, datatype = term
+        if datatype == XSD + "dateTime" and lexical.startswith("-"):
+            return bce_date_literal(lexical)
+        # normalized like the Turtle parser by default, also while ttl_compare.parse_ttl
+        # turns the normalization off for its rdflib fallback
+        return Literal(
+            lexical, lang=language, datatype=URIRef(datatype) if datatype else None, normalize=True
+        )
+    if term.startswith("_:"):
+        return BNode(term[2:])
+    return URIRef(term)
+
+
+def bce_date_literal(lexical):
+    """
+    Creates the Literal of a BCE xsd:dateTime without casting its lexical form to a
+    Python value. datetime has no years before 1, so the cast of rdflib fails and
+    logs a warning with a traceback for every BCE date.
+
+    Args:
+        lexical (str): The lexical form of the date, e.g. "-0500-01-01T00:00:00Z".
+
+    Returns:
+        rdflib.term.Literal: The literal rdflib creates for the date, without the warning.
+    """
+    literal = str.__new__(Literal, lexical)
+    literal._language = None
+    literal._datatype = URIRef(XSD + "dateTime")
+    # like a failed cast of rdflib
+    literal._value = None
+    literal._ill_typed = True
+    return literal
+
+
+def from_rdflib(term):
+    """
+    Converts an rdflib term to a compact term, so triples parsed by rdflib can be
+    compared with the triples of the tokenizer.
+
+    Args:
+        term (rdflib.term.Identifier): The URIRef, BNode or Literal.
+
+    Returns:
+        str or tuple: The compact term.
+    """
+    if isinstance(term, Literal):
+        datatype = str(term.datatype) if term.datatype else None
+        return (str(term), term.language, datatype)
+    if isinstance(term, BNode):
+        return "_:" + str(term)
+    return str(term)
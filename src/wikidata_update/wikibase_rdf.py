@@ -0,0 +1,666 @@
+import hashlib
+import json
+from urllib.parse import quote
+from rdflib import Literal, Namespace, URIRef
+from rdflib.namespace import RDF, RDFS, SKOS, XSD
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",  # Define format
+)
+
+logger = logging.getLogger(__name__)  # Create a logger
+
+
+WD = Namespace("http://www.wikidata.org/entity/")
+WDT = Namespace("http://www.wikidata.org/prop/direct/")
+WDNO = Namespace("http://www.wikidata.org/prop/novalue/")
+P = Namespace("http://www.wikidata.org/prop/")
+PS = Namespace("http://www.wikidata.org/prop/statement/")
+PSV = Namespace("http://www.wikidata.org/prop/statement/value/")
+PQ = Namespace("http://www.wikidata.org/prop/qualifier/")
+PQV = Namespace("http://www.wikidata.org/prop/qualifier/value/")
+PR = Namespace("http://www.wikidata.org/prop/reference/")
+PRV = Namespace("http://www.wikidata.org/prop/reference/value/")
+S = Namespace("http://www.wikidata.org/entity/statement/")
+REF = Namespace("http://www.wikidata.org/reference/")
+V = Namespace("http://www.wikidata.org/value/")
+DATA = Namespace("https://www.wikidata.org/wiki/Special:EntityData/")
+WIKIBASE = Namespace("http://wikiba.se/ontology#")
+SCHEMA = Namespace("http://schema.org/")
+PROV = Namespace("http://www.w3.org/ns/prov#")
+CC = Namespace("http://creativecommons.org/ns#")
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+
+LICENSE = URIRef("http://creativecommons.org/publicdomain/zero/1.0/")
+SOFTWARE_VERSION = "1.0.0"
+EARTH = "http://www.wikidata.org/entity/Q2"
+JULIAN = "http://www.wikidata.org/entity/Q1985786"
+COMMONS_FILE_PATH = "http://commons.wikimedia.org/wiki/Special:FilePath/"
+COMMONS_DATA = "http://commons.wikimedia.org/data/main/"
+MATHML = URIRef("http://www.w3.org/1998/Math/MathML")
+
+RANKS = {
+    "preferred": WIKIBASE.PreferredRank,
+    "normal": WIKIBASE.NormalRank,
+    "deprecated": WIKIBASE.DeprecatedRank,
+}
+ENTITY_TYPES = {
+    "item": WIKIBASE.Item,
+    "property": WIKIBASE.Property,
+}
+
+# wiki language codes that differ from their BCP 47 code in RDF
+LANGUAGE_CODES = {
+    "als": "gsw",
+    "bat-smg": "sgs",
+    "be-x-old": "be-tarask",
+    "fiu-vro": "vro",
+    "roa-rup": "rup",
+    "simple": "en-x-simple",
+    "zh-classical": "lzh",
+    "zh-min-nan": "nan",
+    "zh-yue": "yue",
+    "de-formal": "de-x-formal",
+    "nl-informal": "nl-x-informal",
+    "es-formal": "es-x-formal",
+    "hu-formal": "hu-x-formal",
+}
+# project suffix of the site id -> wiki group, the domain is <language>.<group>.org
+SITE_GROUPS = {
+    "wiki": "wikipedia",
+    "wikibooks": "wikibooks",
+    "wikinews": "wikinews",
+    "wikiquote": "wikiquote",
+    "wikisource": "wikisource",
+    "wikiversity": "wikiversity",
+    "wikivoyage": "wikivoyage",
+    "wiktionary": "wiktionary",
+}
+# site id -> base URL, wiki group and language of the sites outside the language projects
+SPECIAL_SITES = {
+    "commonswiki": ("https://commons.wikimedia.org/", "commons", "en"),
+    "metawiki": ("https://meta.wikimedia.org/", "meta", "en"),
+    "mediawikiwiki": ("https://www.mediawiki.org/", "mediawiki", "en"),
+    "specieswiki": ("https://species.wikimedia.org/", "species", "en"),
+    "wikidatawiki": ("https://www.wikidata.org/", "wikidata", "en"),
+    "sourceswiki": ("https://wikisource.org/", "sources", "en"),
+    "outreachwiki": ("https://outreach.wikimedia.org/", "outreach", "en"),
+    "wikimaniawiki": ("https://wikimania.wikimedia.org/", "wikimania", "en"),
+    "wikifunctionswiki": ("https://www.wikifunctions.org/", "wikifunctions", "en"),
+}
+
+
+def language_code(code):
+    """
+    Returns the language tag Wikibase uses in RDF for a wiki language code.
+
+    Args:
+        code (str): The language code of a term or site.
+
+    Returns:
+        str: The BCP 47 language tag.
+    """
+    return LANGUAGE_CODES.get(code, code)
+
+
+def statement_node(statement_id):
+    """
+    Returns the statement node of a statement GUID, e.g. Q42$F078E5B3-... becomes
+    s:Q42-F078E5B3-...
+
+    Args:
+        statement_id (str): The GUID of the statement.
+
+    Returns:
+        URIRef: The statement node.
+    """
+    return S[statement_id.replace("$", "-", 1)]
+
+
+def entity_iri(value):
+    # entity ids of wikibase-entityid values, older revisions only have the numeric id
+    if "id" in value:
+        return WD[value["id"]]
+    prefix = {"item": "Q", "property": "P"}[value["entity-type"]]
+    return WD[f"{prefix}{value['numeric-id']}"]
+
+
+def php_float(number):
+    """
+    Formats a number like PHP's json_encode, which value hashes are based on.
+
+    Args:
+        number (int or float): The number.
+
+    Returns:
+        str: The number as json_encode writes it.
+    """
+    if isinstance(number, bool) or not isinstance(number, float):
+        return json.dumps(number)
+    text = repr(number)
+    if "e" in text:
+        mantissa, exponent = text.split("e")
+        if "." not in mantissa:
+            mantissa += ".0"
+        return f"{mantissa}e{int(exponent)}"
+    return text
+
+
+def php_json(values):
+    # json_encode of a list, with escaped slashes like PHP
+    return (
+        "[" + ",".join(
+            php_float(value) if isinstance(value, (int, float)) and not isinstance(value, bool)
+            else json.dumps(value)
+            for value in values
+        ) + "]"
+    ).replace("/", "\\/")
+
+
+def php_string(value):
+    return f's:{len(value.encode("utf-8"))}:"{value}";'
+
+
+def php_object(class_name, data):
+    # the serialization of Serializable objects, which Wikibase keeps for stable hashes
+    return f'C:{len(class_name)}:"{class_name}":{len(data.encode("utf-8"))}:{{{data}}}'
+
+
+def value_hash(datavalue):
+    """
+    Returns the hash Wikibase names the value node of a complex value by: the MD5
+    of the legacy PHP serialization of the DataValue.
+
+    Args:
+        datavalue (dict): The datavalue of a snak.
+
+    Returns:
+        str: The hash, or None if the value has no value node.
+    """
+    value = datavalue["value"]
+    if datavalue["type"] == "time":
+        serialized = php_object(
+            "DataValues\\TimeValue",
+            php_json(
+                [
+                    value["time"],
+                    value.get("timezone", 0),
+                    value.get("before", 0),
+                    value.get("after", 0),
+                    value["precision"],
+                    value["calendarmodel"],
+                ]
+            ),
+        )
+    elif datavalue["type"] == "quantity":
+        decimals = [value["amount"]]
+        class_name = "DataValues\\UnboundedQuantityValue"
+        if "upperBound" in value and "lowerBound" in value:
+            class_name = "DataValues\\QuantityValue"
+            decimals += [value["upperBound"], value["lowerBound"]]
+        parts = [
+            php_object("DataValues\\DecimalValue", php_string(decimal))
+            for decimal in decimals
+        ]
+        parts.insert(1, php_string(value["unit"]))
+        data = f"a:{len(parts)}:{{" + "".join(
+            f"i:{index};{part}" for index, part in enumerate(parts)
+        ) + "}"
+        serialized = php_object(class_name, data)
+    elif datavalue["type"] == "globecoordinate":
+        serialized = php_object(
+            "DataValues\\Geo\\Values\\GlobeCoordinateValue",
+            php_json(
+                [
+                    value["latitude"],
+                    value["longitude"],
+                    value.get("altitude"),
+                    value.get("precision"),
+                    value.get("globe", EARTH),
+                ]
+            ),
+        )
+    else:
+        return None
+    return hashlib.md5(serialized.encode("utf-8")).hexdigest()
+
+
+def julian_to_gregorian(year, month, day):
+    """
+    Converts a date of the Julian calendar to the Gregorian calendar.
+
+    Args:
+        year (int): The astronomical year, where year 0 is 1 BCE.
+        month (int): The month.
+        day (int): The day.
+
+    Returns:
+        tuple: The year, month and day in the Gregorian calendar.
+    """
+    # through the Julian day number
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    jdn = day + (153 * m + 2) // 5 + 365 * y + y // 4 - 32083
+    a = jdn + 32044
+    b = (4 * a + 3) // 146097
+    c = a - 146097 * b // 4
+    d = (4 * c + 3) // 1461
+    e = c - 1461 * d // 4
+    m = (5 * e + 2) // 153
+    day = e - (153 * m + 2) // 5 + 1
+    month = m + 3 - 12 * (m // 10)
+    year = 100 * b + d - 4800 + m // 10
+    return year, month, day
+
+
+def clean_time(value):
+    """
+    Converts the time of a time value to the xsd:dateTime literal Wikibase writes:
+    parts below the precision are set to their first value, BCE years use the
+    XSD 1.1 numbering, where year 0 is 1 BCE, and Julian dates with a precision
+    of a day or better are converted to the Gregorian calendar.
+
+    Args:
+        value (dict): The time value.
+
+    Returns:
+        str: The lexical form of the xsd:dateTime.
+    """
+    time = value["time"]
+    negative = time.startswith("-")
+    date, _, clock = time.lstrip("+-").partition("T")
+    year, month, day = (int(part) for part in date.split("-"))
+    precision = value["precision"]
+    if precision <= 9 or not month:
+        month = 1
+    if precision <= 10 or not day:
+        day = 1
+    if negative and year:
+        year = 1 - year
+    if precision >= 11 and value.get("calendarmodel") == JULIAN:
+        year, month, day = julian_to_gregorian(year, month, day)
+    sign = "-" if year < 0 else ""
+    return f"{sign}{abs(year):04d}-{month:02d}-{day:02d}T{clock}"
+
+
+def format_amount(amount):
+    # decimal amounts are written without the leading plus sign
+    return amount[1:] if amount.startswith("+") else amount
+
+
+def simple_value(snak):
+    """
+    Returns the value of a snak as used with wdt:, ps:, pq: and pr:.
+
+    Args:
+        snak (dict): The snak, with a datavalue.
+
+    Returns:
+        Identifier: The RDF term of the value.
+    """
+    datavalue = snak["datavalue"]
+    value = datavalue["value"]
+    value_type = datavalue["type"]
+    datatype = snak.get("datatype")
+    if value_type == "wikibase-entityid":
+        return entity_iri(value)
+    if value_type == "monolingualtext":
+        return Literal(value["text"], lang=language_code(value["language"]))
+    if value_type == "time":
+        return Literal(clean_time(value), datatype=XSD.dateTime)
+    if value_type == "quantity":
+        return Literal(format_amount(value["amount"]), datatype=XSD.decimal)
+    if value_type == "globecoordinate":
+        point = f"Point({php_float(value['longitude'])} {php_float(value['latitude'])})"
+        globe = value.get("globe", EARTH)
+        if globe != EARTH:
+            point = f"<{globe}> {point}"
+        return Literal(point, datatype=GEO.wktLiteral)
+    if datatype == "url":
+        return URIRef(value)
+    if datatype == "commonsMedia":
+        return URIRef(COMMONS_FILE_PATH + url_encode(value.replace(" ", "_")))
+    if datatype in ("geo-shape", "tabular-data"):
+        return URIRef(COMMONS_DATA + url_encode(value.replace(" ", "_")))
+    if datatype == "math":
+        return Literal(value, datatype=MATHML)
+    return Literal(value)
+
+
+def value_node_triples(datavalue):
+    """
+    Returns the triples of the value node of a complex value.
+
+    Args:
+        datavalue (dict): The datavalue of a snak.
+
+    Returns:
+        tuple: The value node and its triples, or (None, []) for simple values.
+    """
+    value_id = value_hash(datavalue)
+    if value_id is None:
+        return None, []
+    node = V[value_id]
+    value = datavalue["value"]
+    if datavalue["type"] == "time":
+        triples = [
+            (node, RDF.type, WIKIBASE.TimeValue),
+            (node, WIKIBASE.timeValue, Literal(clean_time(value), datatype=XSD.dateTime)),
+            (node, WIKIBASE.timePrecision, Literal(str(value["precision"]), datatype=XSD.integer)),
+            (node, WIKIBASE.timeTimezone, Literal(str(value.get("timezone", 0)), datatype=XSD.integer)),
+            (node, WIKIBASE.timeCalendarModel, URIRef(value["calendarmodel"])),
+        ]
+    elif datavalue["type"] == "quantity":
+        unit = value["unit"]
+        triples = [
+            (node, RDF.type, WIKIBASE.QuantityValue),
+            (node, WIKIBASE.quantityAmount, Literal(format_amount(value["amount"]), datatype=XSD.decimal)),
+            (node, WIKIBASE.quantityUnit, WD.Q199 if unit == "1" else URIRef(unit)),
+        ]
+        if "upperBound" in value:
+            triples.append(
+                (node, WIKIBASE.quantityUpperBound, Literal(format_amount(value["upperBound"]), datatype=XSD.decimal))
+            )
+        if "lowerBound" in value:
+            triples.append(
+                (node, WIKIBASE.quantityLowerBound, Literal(format_amount(value["lowerBound"]), datatype=XSD.decimal))
+            )
+    else:
+        triples = [
+            (node, RDF.type, WIKIBASE.GlobecoordinateValue),
+            (node, WIKIBASE.geoLatitude, Literal(php_float(value["latitude"]), datatype=XSD.double)),
+            (node, WIKIBASE.geoLongitude, Literal(php_float(value["longitude"]), datatype=XSD.double)),
+            (node, WIKIBASE.geoGlobe, URIRef(value.get("globe", EARTH))),
+        ]
+        if value.get("precision") is not None:
+            triples.append(
+                (node, WIKIBASE.geoPrecision, Literal(php_float(value["precision"]), datatype=XSD.double))
+            )
+    return node, triples
+
+
+def snak_triples(subject, snak, predicates, nodes):
+    """
+    Returns the triples of a snak.
+
+    Args:
+        subject (URIRef): The statement or reference node the snak belongs to.
+        snak (dict): The snak.
+        predicates (tuple): The simple and the value namespace, e.g. (PQ, PQV).
+        nodes (dict): Collects the triples of the value nodes, by node.
+
+    Returns:
+        list: The triples of the snak, without the value node triples.
+    """
+    simple, value_namespace = predicates
+    prop = snak["property"]
+    if snak["snaktype"] == "novalue":
+        return [(subject, RDF.type, WDNO[prop])]
+    if snak["snaktype"] == "somevalue":
+        # Wikibase writes a skolem IRI for the unknown value that is not derived here,
+        # so the triples of somevalue snaks are left out instead of inventing one
+        return []
+    triples = [(subject, simple[prop], simple_value(snak))]
+    node, value_triples = value_node_triples(snak["datavalue"])
+    if node is not None:
+        triples.append((subject, value_namespace[prop], node))
+        nodes[node] = value_triples
+    return triples
+
+
+def reference_triples(reference, nodes):
+    """
+    Returns the triples of a reference node, which is shared by every statement
+    with the same reference.
+
+    Args:
+        reference (dict): The reference.
+        nodes (dict): Collects the triples of the value nodes, by node.
+
+    Returns:
+        tuple: The reference node and its triples.
+    """
+    node = REF[reference["hash"]]
+    triples = [(node, RDF.type, WIKIBASE.Reference)]
+    for prop in reference.get("snaks-order", reference["snaks"]):
+        for snak in reference["snaks"].get(prop, []):
+            triples += snak_triples(node, snak, (PR, PRV), nodes)
+    return node, triples
+
+
+def statement_triples(entity_id, statement, nodes):
+    """
+    Returns the triples of a statement: its link from the entity, rank, main value,
+    qualifiers and links to its references. Whether the statement has the best rank
+    depends on the other statements of the property, see truthy_triples.
+
+    Args:
+        entity_id (str): The ID of the entity.
+        statement (dict): The statement.
+        nodes (dict): Collects the triples of the value and reference nodes, by node.
+
+    Returns:
+        list: The triples of the statement.
+    """
+    node = statement_node(statement["id"])
+    mainsnak = statement["mainsnak"]
+    triples = [
+        (WD[entity_id], P[mainsnak["property"]], node),
+        (node, RDF.type, WIKIBASE.Statement),
+        (node, WIKIBASE.rank, RANKS[statement.get("rank", "normal")]),
+    ]
+    triples += snak_triples(node, mainsnak, (PS, PSV), nodes)
+    for prop in statement.get("qualifiers-order", statement.get("qualifiers", {})):
+        for snak in statement.get("qualifiers", {}).get(prop, []):
+            triples += snak_triples(node, snak, (PQ, PQV), nodes)
+    for reference in statement.get("references", []):
+        reference_node, triples_of_reference = reference_triples(reference, nodes)
+        triples.append((node, PROV.wasDerivedFrom, reference_node))
+        nodes[reference_node] = triples_of_reference
+    return triples
+
+
+def best_statements(statements):
+    """
+    Returns the statements of a property with the best rank: the preferred ones,
+    or the normal ones if none is preferred. Deprecated statements are never best.
+
+    Args:
+        statements (list): The statements of one property.
+
+    Returns:
+        list: The best ranked statements.
+    """
+    preferred = [s for s in statements if s.get("rank") == "preferred"]
+    if preferred:
+        return preferred
+    return [s for s in statements if s.get("rank", "normal") == "normal"]
+
+
+def truthy_triples(entity_id, statements):
+    """
+    Returns the triples that depend on the ranks of all statements of a property:
+    the wikibase:BestRank types and the wdt: truthy triples of the entity.
+
+    Args:
+        entity_id (str): The ID of the entity.
+        statements (list): The statements of one property.
+
+    Returns:
+        list: The triples.
+    """
+    triples = []
+    subject = WD[entity_id]
+    for statement in best_statements(statements):
+        triples.append((statement_node(statement["id"]), RDF.type, WIKIBASE.BestRank))
+        mainsnak = statement["mainsnak"]
+        prop = mainsnak["property"]
+        if mainsnak["snaktype"] == "novalue":
+            triples.append((subject, RDF.type, WDNO[prop]))
+        elif mainsnak["snaktype"] == "somevalue":
+            # left out like in snak_triples
+            continue
+        else:
+            triples.append((subject, WDT[prop], simple_value(mainsnak)))
+    return triples
+
+
+def term_triples(entity_id, kind, language, value):
+    """
+    Returns the triples of the label, description or aliases of one language.
+
+    Args:
+        entity_id (str): The ID of the entity.
+        kind (str): labels, descriptions or aliases.
+        language (str): The language code.
+        value (dict or list): The term, or the list of aliases.
+
+    Returns:
+        list: The triples.
+    """
+    subject = WD[entity_id]
+    if kind == "labels":
+        literal = Literal(value["value"], lang=language_code(language))
+        return [
+            (subject, RDFS.label, literal),
+            (subject, SKOS.prefLabel, literal),
+            (subject, SCHEMA.name, literal),
+        ]
+    if kind == "descriptions":
+        return [(subject, SCHEMA.description, Literal(value["value"], lang=language_code(language)))]
+    return [
+        (subject, SKOS.altLabel, Literal(alias["value"], lang=language_code(language)))
+        for alias in value
+    ]
+
+
+def url_encode(title):
+    # the characters MediaWiki keeps unescaped in page URLs
+    return quote(title, safe=";@$!*(),/~:")
+
+
+def site_info(site):
+    """
+    Returns the base URL, wiki group and language of a site.
+
+    Args:
+        site (str): The site id, e.g. enwiki.
+
+    Returns:
+        tuple: The base URL, the wiki group and the language code.
+    """
+    if site in SPECIAL_SITES:
+        return SPECIAL_SITES[site]
+    for suffix in sorted(SITE_GROUPS, key=len, reverse=True):
+        if site.endswith(suffix):
+            language = site[: -len(suffix)].replace("_", "-")
+            group = SITE_GROUPS[suffix]
+            return f"https://{language}.{group}.org/", group, language
+    logger.warning(f"Unknown site {site}")
+    return f"https://{site}.invalid/", site, "und"
+
+
+def sitelink_triples(entity_id, site, sitelink):
+    """
+    Returns the triples of a sitelink.
+
+    Args:
+        entity_id (str): The ID of the entity.
+        site (str): The site id, e.g. enwiki.
+        sitelink (dict): The sitelink, with its title and badges.
+
+    Returns:
+        list: The triples.
+    """
+    base, group, language = site_info(site)
+    title = sitelink["title"]
+    article = URIRef(base + "wiki/" + url_encode(title.replace(" ", "_")))
+    triples = [
+        (article, RDF.type, SCHEMA.Article),
+        (article, SCHEMA.about, WD[entity_id]),
+        (article, SCHEMA.inLanguage, Literal(language_code(language))),
+        (article, SCHEMA.isPartOf, URIRef(base)),
+        (article, SCHEMA.name, Literal(title, lang=language_code(language))),
+        (URIRef(base), WIKIBASE.wikiGroup, Literal(group)),
+    ]
+    for badge in sitelink.get("badges", []):
+        triples.append((article, WIKIBASE.badge, WD[badge]))
+    return triples
+
+
+def metadata_triples(entity):
+    """
+    Returns the triples about the entity document: its revision, modification time
+    and the number of statements, sitelinks and identifiers.
+
+    Args:
+        entity (dict): The entity, with lastrevid and modified.
+
+    Returns:
+        list: The triples.
+    """
+    entity_id = entity["id"]
+    document = DATA[entity_id]
+    statements = [
+        statement
+        for property_statements in entity.get("claims", {}).values()
+        for statement in property_statements
+    ]
+    identifiers = sum(
+        1 for statement in statements if statement["mainsnak"].get("datatype") == "external-id"
+    )
+    triples = [
+        (document, RDF.type, SCHEMA.Dataset),
+        (document, SCHEMA.about, WD[entity_id]),
+        (document, CC.license, LICENSE),
+        (document, SCHEMA.softwareVersion, Literal(SOFTWARE_VERSION)),
+        (document, WIKIBASE.statements, Literal(str(len(statements)), datatype=XSD.integer)),
+        (document, WIKIBASE.sitelinks, Literal(str(len(entity.get("sitelinks", {}))), datatype=XSD.integer)),
+        (document, WIKIBASE.identifiers, Literal(str(identifiers), datatype=XSD.integer)),
+    ]
+    if "lastrevid" in entity:
+        triples.append((document, SCHEMA.version, Literal(str(entity["lastrevid"]), datatype=XSD.integer)))
+    if "modified" in entity:
+        triples.append((document, SCHEMA.dateModified, Literal(entity["modified"], datatype=XSD.dateTime)))
+    entity_type = ENTITY_TYPES.get(entity.get("type", "item"))
+    if entity_type is not None:
+        triples.append((WD[entity_id], RDF.type, entity_type))
+    return triples
+
+
+def entity_triples(entity):
+    """
+    Maps an entity to the triples of its flavor=dump TTL: the document metadata,
+    terms, sitelinks, statements with their qualifiers and references, the truthy
+    triples, and the value and reference nodes.
+
+    Args:
+        entity (dict): The entity JSON, with lastrevid and modified.
+
+    Returns:
+        frozenset: The triples, as rdflib terms.
+
+    Notes:
+        - Normalized values (psn:, wdtn:, pqn:, prn: and wikibase:quantityNormalized)
+          are not produced, they depend on unit conversions and on the URI formatters
+          of the properties, which are not part of the entity JSON.
+    """
+    entity_id = entity["id"]
+    triples = set(metadata_triples(entity))
+    for kind in ("labels", "descriptions", "aliases"):
+        for language, value in (entity.get(kind) or {}).items():
+            triples.update(term_triples(entity_id, kind, language, value))
+    for site, sitelink in (entity.get("sitelinks") or {}).items():
+        triples.update(sitelink_triples(entity_id, site, sitelink))
+    nodes = {}
+    for statements in (entity.get("claims") or {}).values():
+        for statement in statements:
+            triples.update(statement_triples(entity_id, statement, nodes))
+        triples.update(truthy_triples(entity_id, statements))
+    for node_triples in nodes.values():
+        triples.update(node_triples)
+    return frozenset(triples)
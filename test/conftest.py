@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the tests import the package from src; test/wikidata_update has the same name, so
+# the package is imported before pytest imports the test modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+import wikidata_update  # noqa: E402,F401
@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.binary_changes import open_writer
+from wikidata_update.binary_changes import write_changeset
+from wikidata_update.binary_changes import close_writer
+from wikidata_update.binary_changes import iter_chunks
+from wikidata_update.binary_changes import iter_changes
+from wikidata_update.binary_changes import iter_changesets
+from wikidata_update.binary_changes import to_sparql
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import XSD
+from wikidata_update import ttl_compare
+
+WD = "http://www.wikidata.org/entity/"
+WDT = "http://www.wikidata.org/prop/direct/"
+RDFS_LABEL = URIRef("http://www.w3.org/2000/01/rdf-schema#label")
+
+
+class TestBinaryChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "changes.wdcs")
+        self.changesets = [
+            {
+                "entity": "Q42",
+                "revid": 2267876853,
+                "timestamp": "2024-12-19T15:08:49Z",
+                "changes": [
+                    ("D", URIRef(WD + "Q42"), URIRef(WDT + "P31"), URIRef(WD + "Q6")),
+                    ("A", URIRef(WD + "Q42"), URIRef(WDT + "P31"), URIRef(WD + "Q5")),
+                    ("A", URIRef(WD + "Q42"), RDFS_LABEL, Literal('Дуглас "Адамс"\n', lang="ru")),
+                ],
+            },
+            {
+                "entity": "Q64",
+                "revid": 2267876900,
+                "timestamp": "2024-12-19T15:09:01Z",
+                "changes": [
+                    ("A", URIRef(WD + "Q64"), URIRef(WDT + "P1082"), Literal("3755251", datatype=XSD.decimal)),
+                    ("A", URIRef(WD + "Q64"), URIRef(WDT + "P31"), URIRef(WD + "Q5")),
+                    ("D", URIRef(WD + "Q64"), URIRef(WDT + "P190"), BNode("b0")),
+                ],
+            },
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self):
+        writer = open_writer(self.file_name)
+        for changeset in self.changesets:
+            write_changeset(writer, changeset)
+        close_writer(writer)
+        return writer
+
+    def test_round_trip(self):
+        self.write()
+        self.assertEqual(list(iter_changesets(self.file_name)), self.changesets)
+
+    def test_changes_without_triples_are_skipped(self):
+        writer = open_writer(self.file_name)
+        write_changeset(writer, None)
+        write_changeset(writer, dict(self.changesets[0], changes=[]))
+        write_changeset(writer, self.changesets[1])
+        close_writer(writer)
+        self.assertEqual(writer["changes"], 1)
+        self.assertEqual(list(iter_changesets(self.file_name)), self.changesets[1:])
+
+    def test_iter_changes(self):
+        self.write()
+        changes = list(iter_changes(self.file_name))
+        self.assertEqual(len(changes), 6)
+        self.assertEqual(
+            changes[0],
+            ("D", f"<{WD}Q42>", f"<{WDT}P31>", f"<{WD}Q6>", "Q42", 2267876853, "2024-12-19T15:08:49Z"),
+        )
+
+    def test_terms_are_interned(self):
+        writer = self.write()
+        # Q42 and Q64, the 2 subjects, the 4 predicates and the 5 distinct objects
+        self.assertEqual(len(writer["terms"]), 2 + 2 + 4 + 5)
+        (terms, columns), = iter_chunks(self.file_name)
+        self.assertEqual(len(terms), len(writer["terms"]))
+        self.assertEqual(list(columns["object"]).count(terms.index(f"<{WD}Q5>")), 2)
+
+    @patch("wikidata_update.binary_changes.CHUNK_ROWS", 2)
+    def test_chunks_extend_the_dictionary(self):
+        self.write()
+        chunks = [(len(terms), len(columns["op"])) for terms, columns in iter_chunks(self.file_name)]
+        self.assertEqual([rows for _, rows in chunks], [2, 2, 2])
+        self.assertEqual([term_count for term_count, _ in chunks], [5, 11, 13])
+        self.assertEqual(list(iter_changesets(self.file_name)), self.changesets)
+
+    def test_to_sparql(self):
+        self.write()
+        sparql = list(to_sparql(self.file_name))
+        self.assertEqual(
+            sparql[0],
+            "# Q42 revid 2267876853 at 2024-12-19T15:08:49Z\n"
+            + ttl_compare.changes_to_sparql(self.changesets[0]["changes"], "Q42"),
+        )
+        self.assertIn(" wd:Q64 wdt:P31 wd:Q5 .", sparql[1])
+
+    def test_not_a_changeset_file(self):
+        with open(self.file_name, "w") as file:
+            file.write("PREFIX wd: <http://www.wikidata.org/entity/>\n")
+        with self.assertRaises(ValueError):
+            list(iter_changes(self.file_name))
+
+    def test_truncated_file(self):
+        self.write()
+        with open(self.file_name, "rb+") as file:
+            file.truncate(os.path.getsize(self.file_name) - 1)
+        with self.assertRaises(ValueError):
+            list(iter_changes(self.file_name))
+
+
+if __name__ == "__main__":
+    unittest.main()
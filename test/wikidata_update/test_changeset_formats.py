@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.changeset_formats import nt_term
+from wikidata_update.changeset_formats import rdf_patch
+from wikidata_update.changeset_formats import nquads
+from wikidata_update.changeset_formats import serialize
+from wikidata_update.changeset_formats import iter_serialized
+from rdflib import BNode, Dataset, Literal, URIRef
+from rdflib.namespace import XSD
+
+WD = "http://www.wikidata.org/entity/"
+WDT = "http://www.wikidata.org/prop/direct/"
+RDFS_LABEL = URIRef("http://www.w3.org/2000/01/rdf-schema#label")
+GRAPH = "https://www.wikidata.org/wiki/Special:EntityData/Q42?revision=2267876853"
+
+
+class TestChangesetFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.changeset = {
+            "entity": "Q42",
+            "revid": 2267876853,
+            "timestamp": "2024-12-19T15:08:49Z",
+            "changes": [
+                ("D", URIRef(WD + "Q42"), URIRef(WDT + "P31"), URIRef(WD + "Q6")),
+                ("A", URIRef(WD + "Q42"), URIRef(WDT + "P31"), URIRef(WD + "Q5")),
+                ("A", URIRef(WD + "Q42"), RDFS_LABEL, Literal('Douglas "Noël"\nAdams', lang="fr")),
+                ("A", URIRef(WD + "Q42"), URIRef(WDT + "P1082"), Literal("42", datatype=XSD.integer)),
+                ("A", BNode("b0"), RDFS_LABEL, Literal("plain")),
+            ],
+        }
+
+    def test_nt_term(self):
+        self.assertEqual(nt_term(URIRef(WD + "Q42")), f"<{WD}Q42>")
+        self.assertEqual(nt_term(BNode("b0")), "_:b0")
+        self.assertEqual(nt_term(Literal('a\\b "c"\r\nd', lang="en")), '"a\\\\b \\"c\\"\\r\\nd"@en')
+        self.assertEqual(
+            nt_term(Literal("42", datatype=XSD.integer)),
+            '"42"^^<http://www.w3.org/2001/XMLSchema#integer>',
+        )
+        # a literal with the text of an IRI is not mistaken for it
+        self.assertEqual(nt_term(Literal(WD + "Q42")), f'"{WD}Q42"')
+
+    def test_rdf_patch(self):
+        patch = rdf_patch(self.changeset).split("\n")
+        self.assertEqual(patch[0], "TX .")
+        self.assertEqual(patch[1], f"D <{WD}Q42> <{WDT}P31> <{WD}Q6> .")
+        self.assertEqual(patch[2], f"A <{WD}Q42> <{WDT}P31> <{WD}Q5> .")
+        self.assertEqual(patch[-1], "TC .")
+        self.assertEqual(len(patch), 7)
+
+    def test_nquads_parse(self):
+        dataset = Dataset()
+        dataset.parse(data=nquads(self.changeset), format="nquads")
+        added = set(dataset.graph(URIRef(GRAPH)))
+        removed = set(dataset.graph(URIRef(GRAPH + "#removed")))
+        self.assertEqual(removed, {self.changeset["changes"][0][1:]})
+        self.assertEqual(len(added), 4)
+        self.assertIn(self.changeset["changes"][2][1:], added)
+
+    def test_serialize(self):
+        self.assertEqual(serialize(self.changeset, "nquads"), nquads(self.changeset))
+        with self.assertRaises(ValueError):
+            serialize(self.changeset, "trig")
+
+    def test_iter_serialized_skips_empty_changes(self):
+        empty = dict(self.changeset, changes=[])
+        self.assertEqual(
+            list(iter_serialized([empty, self.changeset, None], "rdf-patch")),
+            [rdf_patch(self.changeset)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
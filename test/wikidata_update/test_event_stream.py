@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.event_stream import parse_events
+from wikidata_update.event_stream import to_change
+from wikidata_update.event_stream import iter_stream_changes
+from wikidata_update.sse_server import start_server
+from wikidata_update.sse_server import resume_offset
+from wikidata_update.sse_server import event_id
+
+
+def make_event(rcid, title="Q42", wiki="wikidatawiki", change_type="edit"):
+    return {
+        "id": rcid,
+        "type": change_type,
+        "namespace": 0,
+        "title": title,
+        "user": "test_user",
+        "timestamp": 1696161600,
+        "wiki": wiki,
+        "revision": {"old": rcid * 10 - 1, "new": rcid * 10},
+    }
+
+
+class TestParseEvents(unittest.TestCase):
+
+    def test_parse_events(self):
+        lines = [
+            ":ok",
+            "",
+            "event: message",
+            'id: [{"offset": 1}]',
+            "data: {\"a\":",
+            "data: 1}",
+            "",
+            "retry: 2000",
+            "data: x",
+            "",
+        ]
+        events = list(parse_events(lines))
+        self.assertEqual(
+            events,
+            [
+                ('[{"offset": 1}]', "message", '{"a":\n1}', None),
+                (None, "message", "x", 2000),
+            ],
+        )
+
+
+class TestToChange(unittest.TestCase):
+
+    def test_to_change(self):
+        change = to_change(make_event(5))
+        self.assertEqual(change["title"], "Q42")
+        self.assertEqual(change["rcid"], 5)
+        self.assertEqual(change["revid"], 50)
+        self.assertEqual(change["old_revid"], 49)
+        self.assertEqual(change["timestamp"], "2023-10-01T12:00:00Z")
+
+    def test_new_entity_has_no_old_revision(self):
+        event = make_event(5, change_type="new")
+        event["revision"] = {"new": 50}
+        self.assertEqual(to_change(event)["old_revid"], 0)
+
+    def test_other_wiki_and_type_are_skipped(self):
+        self.assertIsNone(to_change(make_event(5, wiki="enwiki")))
+        self.assertIsNone(to_change(make_event(5, change_type="log")))
+        self.assertIsNone(to_change(make_event(5), change_types=("new",)))
+
+
+class TestStreamServer(unittest.TestCase):
+
+    def setUp(self):
+        events = [
+            make_event(1),
+            make_event(2, wiki="enwiki"),
+            make_event(3, title="Q1"),
+            make_event(4),
+        ]
+        self.server = start_server(events, port=0)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_resume_offset(self):
+        self.assertEqual(resume_offset(None), 0)
+        self.assertEqual(resume_offset(event_id(3)), 4)
+        self.assertEqual(resume_offset("invalid"), 0)
+
+    def test_replays_wikidata_changes(self):
+        changes = list(iter_stream_changes(self.url, reconnect=False))
+        self.assertEqual([change["rcid"] for change in changes], [1, 3, 4])
+
+    def test_resumes_after_last_event_id(self):
+        first = list(iter_stream_changes(self.url, max_changes=1, reconnect=False))
+        rest = list(
+            iter_stream_changes(self.url, first[-1]["event_id"], reconnect=False)
+        )
+        self.assertEqual([change["rcid"] for change in first + rest], [1, 3, 4])
+
+    def test_filters_entity(self):
+        changes = list(iter_stream_changes(self.url, entity_id="Q1", reconnect=False))
+        self.assertEqual([change["rcid"] for change in changes], [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update import follow
+from wikidata_update.follow import load_checkpoint
+from wikidata_update.follow import save_checkpoint
+from wikidata_update.follow import new_changes
+from wikidata_update.follow import next_interval
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_missing_checkpoint(self):
+        self.assertIsNone(load_checkpoint(self.path))
+
+    def test_save_and_load_checkpoint(self):
+        checkpoint = {"rcid": 42, "timestamp": "2023-10-01T12:00:00Z", "offset": 100}
+        save_checkpoint(self.path, checkpoint)
+        self.assertEqual(load_checkpoint(self.path), checkpoint)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["checkpoint.json"])
+
+
+class TestNewChanges(unittest.TestCase):
+
+    def test_skips_processed_changes(self):
+        changes = [{"rcid": 41}, {"rcid": 42}, {"rcid": 43}, {"rcid": 44}]
+        checkpoint = {"rcid": 42, "timestamp": "2023-10-01T12:00:00Z"}
+        self.assertEqual(
+            [change["rcid"] for change in new_changes(changes, checkpoint)], [43, 44]
+        )
+
+
+class TestNextInterval(unittest.TestCase):
+
+    def test_idle_poll_slows_down(self):
+        self.assertEqual(next_interval(4, 0, 1, 60), 8)
+        self.assertEqual(next_interval(40, 0, 1, 60), 60)
+
+    def test_active_poll_speeds_up(self):
+        self.assertEqual(next_interval(8, 3, 1, 60), 4)
+        self.assertEqual(next_interval(1, 3, 1, 60), 1)
+
+    def test_busy_poll_uses_shortest_interval(self):
+        self.assertEqual(next_interval(60, follow.BUSY_CHANGES, 1, 60), 1)
+
+    def test_default_bounds(self):
+        self.assertEqual(next_interval(follow.MAX_INTERVAL, 0), follow.MAX_INTERVAL)
+
+
+if __name__ == "__main__":
+    unittest.main()
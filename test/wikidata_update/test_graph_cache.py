@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update import graph_cache
+from wikidata_update.graph_cache import configure
+from wikidata_update.graph_cache import clear
+from wikidata_update.graph_cache import get
+from wikidata_update.graph_cache import put
+
+
+class TestGraphCache(unittest.TestCase):
+
+    def setUp(self):
+        configure(10)
+        clear()
+
+    def tearDown(self):
+        configure(500000)
+        clear()
+
+    def test_put_and_get(self):
+        triples = frozenset([("s", "p", "o")])
+        put(1, triples)
+        self.assertIs(get(1), triples)
+        self.assertEqual(graph_cache.HITS, 1)
+
+    def test_get_missing_revision(self):
+        self.assertIsNone(get(1))
+        self.assertEqual(graph_cache.MISSES, 1)
+
+    def test_sources_are_kept_apart(self):
+        triples = frozenset([("s", "p", "o")])
+        lines = frozenset(["<s> <p> <o> ."])
+        put(1, triples, "ttl")
+        self.assertIsNone(get(1, "ntriples"))
+        put(1, lines, "ntriples")
+        self.assertIs(get(1, "ttl"), triples)
+        self.assertIs(get(1, "ntriples"), lines)
+
+    def test_revision_ids_are_normalized(self):
+        put("1", frozenset([("s", "p", "o")]))
+        self.assertIsNotNone(get(1))
+
+    def test_evicts_least_recently_used(self):
+        put(1, frozenset(("s", "p", str(i)) for i in range(4)))
+        put(2, frozenset(("s", "p", str(i)) for i in range(4)))
+        get(2)
+        get(1)
+
+        put(3, frozenset(("s", "p", str(i)) for i in range(4)))
+
+        self.assertIsNotNone(get(1))
+        self.assertIsNone(get(2))
+        self.assertIsNotNone(get(3))
+
+    def test_long_running_workload_keeps_recent_revisions(self):
+        # a revision used a lot at the start of the run
+        put(1, frozenset(("s", "p", str(i)) for i in range(4)))
+        for _ in range(100):
+            get(1)
+        # the following changes each diff their old revision against a new one
+        for revision_id in range(2, 50):
+            get(revision_id - 1)
+            put(revision_id, frozenset(("s", "p", str(i)) for i in range(4)))
+
+        self.assertIsNone(get(1))
+        self.assertIsNotNone(get(48))
+        self.assertIsNotNone(get(49))
+
+    def test_ties_evict_oldest(self):
+        put(1, frozenset(("s", "p", str(i)) for i in range(5)))
+        put(2, frozenset(("s", "p", str(i)) for i in range(5)))
+
+        put(3, frozenset([("s", "p", "o")]))
+
+        self.assertIsNone(get(1))
+        self.assertIsNotNone(get(2))
+
+    def test_revision_larger_than_cache_is_skipped(self):
+        put(1, frozenset(("s", "p", str(i)) for i in range(11)))
+        self.assertIsNone(get(1))
+
+    def test_disabled_cache(self):
+        configure(0)
+        put(1, frozenset([("s", "p", "o")]))
+        self.assertIsNone(get(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update import hash_diff
+from wikidata_update.hash_diff import diff_hashed
+
+
+def make_triples(count, start=0):
+    return frozenset(
+        (
+            "http://www.wikidata.org/entity/Q1",
+            "http://www.wikidata.org/prop/direct/P50",
+            (f"author {i}", "en", None),
+        )
+        for i in range(start, start + count)
+    )
+
+
+@unittest.skipUnless(hash_diff.available(), "numpy is not installed")
+class TestDiffHashed(unittest.TestCase):
+
+    def test_same_result_as_sets(self):
+        random.seed(1)
+        old_triples = make_triples(2000)
+        new_triples = frozenset(
+            random.sample(sorted(old_triples), 1900)
+        ) | make_triples(50, start=5000)
+
+        removed, added = diff_hashed(old_triples, new_triples)
+
+        self.assertEqual(set(removed), old_triples - new_triples)
+        self.assertEqual(set(added), new_triples - old_triples)
+        self.assertEqual(len(removed), len(set(removed)))
+
+    def test_empty_revisions(self):
+        new_triples = make_triples(3)
+        self.assertEqual(diff_hashed(frozenset(), new_triples), ([], list(new_triples)))
+        self.assertEqual(diff_hashed(new_triples, frozenset()), (list(new_triples), []))
+
+    def test_collisions_are_verified(self):
+        old_triples = make_triples(10)
+        new_triples = make_triples(10, start=5)
+        real_hashes = hash_diff.triple_hashes
+
+        def colliding_hashes(triples, salt=None):
+            # every triple gets the same first hash, only the second one is real
+            if salt is None:
+                return real_hashes(triples) * 0
+            return real_hashes(triples, salt)
+
+        with patch("wikidata_update.hash_diff.triple_hashes", side_effect=colliding_hashes):
+            removed, added = diff_hashed(old_triples, new_triples)
+
+        self.assertEqual(set(removed), old_triples - new_triples)
+        self.assertEqual(set(added), new_triples - old_triples)
+
+    def test_colliding_builtin_hashes(self):
+        # hash(-1) == hash(-2), the second hash must not be derived from the first
+        self.assertEqual(hash(-1), hash(-2))
+        self.assertEqual(
+            diff_hashed(frozenset([("s", "p", -1)]), frozenset([("s", "p", -2)])),
+            ([("s", "p", -1)], [("s", "p", -2)]),
+        )
+
+    def test_lists_are_accepted(self):
+        old_triples = make_triples(10)
+        new_triples = make_triples(10, start=2)
+        removed, added = diff_hashed(list(old_triples), list(new_triples))
+        self.assertEqual(set(removed), old_triples - new_triples)
+        self.assertEqual(set(added), new_triples - old_triples)
+
+
+if __name__ == "__main__":
+    unittest.main()
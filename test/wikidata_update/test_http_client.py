@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update import http_client
+from wikidata_update.http_client import create_session
+from wikidata_update.http_client import configure
+from wikidata_update.http_client import get_session
+from wikidata_update.http_client import get
+from wikidata_update.http_client import pool_stats
+
+
+class TestCreateSession(unittest.TestCase):
+
+    def test_create_session_sets_user_agent(self):
+        session = create_session(user_agent="test-agent/1.0")
+        self.assertEqual(session.headers["User-Agent"], "test-agent/1.0")
+
+    def test_create_session_default_user_agent(self):
+        session = create_session()
+        self.assertTrue(session.headers["User-Agent"].startswith("wikidata-update/"))
+
+    def test_create_session_negotiates_compression(self):
+        session = create_session()
+        self.assertIn("gzip", session.headers["Accept-Encoding"])
+
+    def test_create_session_pool_size(self):
+        session = create_session(pool_connections=2, pool_maxsize=7)
+        adapter = session.get_adapter("https://www.wikidata.org")
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+
+class TestSharedSession(unittest.TestCase):
+
+    def test_get_session_is_shared(self):
+        self.assertIs(get_session(), get_session())
+
+    def test_configure_replaces_session(self):
+        old_session = get_session()
+        new_session = configure(user_agent="test-agent/2.0")
+        self.assertIsNot(old_session, new_session)
+        self.assertIs(get_session(), new_session)
+        self.assertEqual(get_session().headers["User-Agent"], "test-agent/2.0")
+        configure()
+
+    @patch("wikidata_update.http_client.get_session")
+    def test_get_uses_default_timeout(self, mock_get_session):
+        mock_session = MagicMock()
+        mock_get_session.return_value = mock_session
+
+        get("https://www.wikidata.org/w/api.php", params={"action": "query"})
+
+        mock_session.get.assert_called_once_with(
+            "https://www.wikidata.org/w/api.php",
+            params={"action": "query"},
+            timeout=http_client.TIMEOUT,
+        )
+
+    def test_pool_stats_without_requests(self):
+        configure()
+        self.assertEqual(pool_stats(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
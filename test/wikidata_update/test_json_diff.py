@@ -0,0 +1,264 @@
+import unittest
+from unittest.mock import patch
+import copy
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.json_diff import diff_entities
+from wikidata_update.json_diff import main
+from wikidata_update.wikibase_rdf import WD, WDT, P, PS, PSV, REF, S, V, WIKIBASE, SCHEMA, DATA, PROV
+from rdflib import Graph, Literal
+from rdflib.namespace import RDF, RDFS, XSD
+
+TTL_PREFIXES = """
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+@prefix schema: <http://schema.org/> .
+@prefix cc: <http://creativecommons.org/ns#> .
+@prefix prov: <http://www.w3.org/ns/prov#> .
+@prefix wikibase: <http://wikiba.se/ontology#> .
+@prefix wd: <http://www.wikidata.org/entity/> .
+@prefix data: <https://www.wikidata.org/wiki/Special:EntityData/> .
+@prefix s: <http://www.wikidata.org/entity/statement/> .
+@prefix ref: <http://www.wikidata.org/reference/> .
+@prefix v: <http://www.wikidata.org/value/> .
+@prefix wdt: <http://www.wikidata.org/prop/direct/> .
+@prefix p: <http://www.wikidata.org/prop/> .
+@prefix ps: <http://www.wikidata.org/prop/statement/> .
+@prefix psv: <http://www.wikidata.org/prop/statement/value/> .
+@prefix pr: <http://www.wikidata.org/prop/reference/> .
+"""
+
+
+def item_statement(guid, prop, value, rank="normal", references=None):
+    return {
+        "id": guid,
+        "type": "statement",
+        "rank": rank,
+        "mainsnak": {
+            "snaktype": "value",
+            "property": prop,
+            "datatype": "wikibase-item",
+            "datavalue": {"type": "wikibase-entityid", "value": {"id": value}},
+        },
+        "references": references or [],
+    }
+
+
+def time_statement(guid, prop, time, precision):
+    return {
+        "id": guid,
+        "type": "statement",
+        "rank": "normal",
+        "mainsnak": {
+            "snaktype": "value",
+            "property": prop,
+            "datatype": "time",
+            "datavalue": {
+                "type": "time",
+                "value": {
+                    "time": time,
+                    "timezone": 0,
+                    "before": 0,
+                    "after": 0,
+                    "precision": precision,
+                    "calendarmodel": "http://www.wikidata.org/entity/Q1985727",
+                },
+            },
+        },
+    }
+
+
+REFERENCE = {
+    "hash": "b0096c6f5c89475ca1751b4df6cbd2fd0d30ef97",
+    "snaks": {
+        "P248": [
+            {
+                "snaktype": "value",
+                "property": "P248",
+                "datatype": "wikibase-item",
+                "datavalue": {"type": "wikibase-entityid", "value": {"id": "Q36578"}},
+            }
+        ]
+    },
+    "snaks-order": ["P248"],
+}
+
+
+def make_entity():
+    return {
+        "type": "item",
+        "id": "Q1",
+        "lastrevid": 100,
+        "modified": "2024-12-19T15:08:49Z",
+        "labels": {"en": {"language": "en", "value": "Example"}},
+        "descriptions": {},
+        "aliases": {},
+        "sitelinks": {},
+        "claims": {
+            "P31": [item_statement("Q1$A", "P31", "Q5", references=[REFERENCE])],
+            "P106": [item_statement("Q1$B", "P106", "Q36180", references=[REFERENCE])],
+        },
+    }
+
+
+def new_revision(entity):
+    new_entity = copy.deepcopy(entity)
+    new_entity["lastrevid"] = 101
+    new_entity["modified"] = "2024-12-19T15:25:49Z"
+    return new_entity
+
+
+class TestDiffEntities(unittest.TestCase):
+
+    def test_label_change(self):
+        old_entity = make_entity()
+        new_entity = new_revision(old_entity)
+        new_entity["labels"]["en"]["value"] = "Changed"
+
+        removed, added = diff_entities(old_entity, new_entity)
+
+        self.assertIn((WD.Q1, RDFS.label, Literal("Example", lang="en")), removed)
+        self.assertIn((WD.Q1, RDFS.label, Literal("Changed", lang="en")), added)
+        self.assertIn((DATA.Q1, SCHEMA.version, Literal("100", datatype=XSD.integer)), removed)
+        self.assertIn((DATA.Q1, SCHEMA.version, Literal("101", datatype=XSD.integer)), added)
+        # statements did not change
+        self.assertFalse(any(triple[0] == S["Q1-A"] for triple in removed | added))
+
+    def test_added_statement(self):
+        old_entity = make_entity()
+        new_entity = new_revision(old_entity)
+        new_entity["claims"]["P570"] = [
+            time_statement("Q1$C", "P570", "+2021-00-00T00:00:00Z", 9)
+        ]
+
+        removed, added = diff_entities(old_entity, new_entity)
+
+        value_node = V["068defc300d06ed22eb72f44c2fe8914"]
+        date = Literal("2021-01-01T00:00:00Z", datatype=XSD.dateTime)
+        self.assertIn((WD.Q1, P.P570, S["Q1-C"]), added)
+        self.assertIn((S["Q1-C"], RDF.type, WIKIBASE.BestRank), added)
+        self.assertIn((S["Q1-C"], PS.P570, date), added)
+        self.assertIn((S["Q1-C"], PSV.P570, value_node), added)
+        self.assertIn((value_node, WIKIBASE.timePrecision, Literal("9", datatype=XSD.integer)), added)
+        self.assertIn((WD.Q1, WDT.P570, date), added)
+        self.assertIn((DATA.Q1, WIKIBASE.statements, Literal("2", datatype=XSD.integer)), removed)
+        self.assertIn((DATA.Q1, WIKIBASE.statements, Literal("3", datatype=XSD.integer)), added)
+
+    def test_shared_reference_is_kept(self):
+        old_entity = make_entity()
+        new_entity = new_revision(old_entity)
+        del new_entity["claims"]["P106"]
+
+        removed, added = diff_entities(old_entity, new_entity)
+
+        self.assertIn((S["Q1-B"], RDF.type, WIKIBASE.Statement), removed)
+        self.assertIn((WD.Q1, WDT.P106, WD.Q36180), removed)
+        reference = REF["b0096c6f5c89475ca1751b4df6cbd2fd0d30ef97"]
+        self.assertIn((S["Q1-B"], PROV.wasDerivedFrom, reference), removed)
+        self.assertFalse(any(triple[0] == reference for triple in removed))
+
+    def test_removed_reference_is_deleted(self):
+        old_entity = make_entity()
+        new_entity = new_revision(old_entity)
+        for statements in new_entity["claims"].values():
+            statements[0]["references"] = []
+
+        removed, added = diff_entities(old_entity, new_entity)
+
+        reference = REF["b0096c6f5c89475ca1751b4df6cbd2fd0d30ef97"]
+        self.assertIn((reference, RDF.type, WIKIBASE.Reference), removed)
+
+    def test_rank_change_moves_best_rank(self):
+        old_entity = make_entity()
+        old_entity["claims"]["P31"].append(item_statement("Q1$D", "P31", "Q6"))
+        new_entity = new_revision(old_entity)
+        new_entity["claims"]["P31"][1]["rank"] = "preferred"
+
+        removed, added = diff_entities(old_entity, new_entity)
+
+        self.assertIn((S["Q1-A"], RDF.type, WIKIBASE.BestRank), removed)
+        self.assertIn((WD.Q1, WDT.P31, WD.Q5), removed)
+        self.assertIn((S["Q1-D"], WIKIBASE.rank, WIKIBASE.PreferredRank), added)
+        self.assertNotIn((S["Q1-D"], RDF.type, WIKIBASE.BestRank), added)
+        self.assertNotIn((WD.Q1, WDT.P31, WD.Q6), added)
+
+    def test_new_entity(self):
+        removed, added = diff_entities(None, make_entity())
+        self.assertEqual(removed, set())
+        self.assertIn((WD.Q1, RDF.type, WIKIBASE.Item), added)
+        self.assertIn((WD.Q1, WDT.P31, WD.Q5), added)
+
+    def test_same_triples_as_ttl_diff(self):
+        old_ttl = TTL_PREFIXES + """
+        data:Q1 a schema:Dataset ; schema:about wd:Q1 ;
+            cc:license <http://creativecommons.org/publicdomain/zero/1.0/> ;
+            schema:softwareVersion "1.0.0" ; schema:version "100"^^xsd:integer ;
+            schema:dateModified "2024-12-19T15:08:49Z"^^xsd:dateTime ;
+            wikibase:statements "0"^^xsd:integer ; wikibase:sitelinks "0"^^xsd:integer ;
+            wikibase:identifiers "0"^^xsd:integer .
+        wd:Q1 a wikibase:Item ; rdfs:label "Example"@en ; skos:prefLabel "Example"@en ;
+            schema:name "Example"@en .
+        """
+        new_ttl = TTL_PREFIXES + """
+        data:Q1 a schema:Dataset ; schema:about wd:Q1 ;
+            cc:license <http://creativecommons.org/publicdomain/zero/1.0/> ;
+            schema:softwareVersion "1.0.0" ; schema:version "101"^^xsd:integer ;
+            schema:dateModified "2024-12-19T15:25:49Z"^^xsd:dateTime ;
+            wikibase:statements "1"^^xsd:integer ; wikibase:sitelinks "0"^^xsd:integer ;
+            wikibase:identifiers "0"^^xsd:integer .
+        wd:Q1 a wikibase:Item ; rdfs:label "Example"@en ; skos:prefLabel "Example"@en ;
+            schema:name "Example"@en ;
+            wdt:P570 "2021-01-01T00:00:00Z"^^xsd:dateTime ;
+            p:P570 s:Q1-C .
+        s:Q1-C a wikibase:Statement, wikibase:BestRank ;
+            wikibase:rank wikibase:NormalRank ;
+            ps:P570 "2021-01-01T00:00:00Z"^^xsd:dateTime ;
+            psv:P570 v:068defc300d06ed22eb72f44c2fe8914 .
+        v:068defc300d06ed22eb72f44c2fe8914 a wikibase:TimeValue ;
+            wikibase:timeValue "2021-01-01T00:00:00Z"^^xsd:dateTime ;
+            wikibase:timePrecision "9"^^xsd:integer ;
+            wikibase:timeTimezone "0"^^xsd:integer ;
+            wikibase:timeCalendarModel wd:Q1985727 .
+        """
+        old_triples = set(Graph().parse(data=old_ttl, format="turtle"))
+        new_triples = set(Graph().parse(data=new_ttl, format="turtle"))
+
+        old_entity = make_entity()
+        old_entity["claims"] = {}
+        new_entity = new_revision(old_entity)
+        new_entity["claims"]["P570"] = [
+            time_statement("Q1$C", "P570", "+2021-00-00T00:00:00Z", 9)
+        ]
+        removed, added = diff_entities(old_entity, new_entity)
+
+        self.assertEqual(removed, old_triples - new_triples)
+        self.assertEqual(added, new_triples - old_triples)
+
+
+class TestMain(unittest.TestCase):
+
+    @patch("wikidata_update.json_diff.revision_content.fetch_revisions")
+    def test_main_diffs_fetched_revisions(self, mock_fetch):
+        old_entity = make_entity()
+        new_entity = new_revision(old_entity)
+        new_entity["labels"]["en"]["value"] = "Changed"
+        mock_fetch.return_value = {100: old_entity, 101: new_entity}
+
+        result = main("Q1", 100, 101, False, False)
+
+        mock_fetch.assert_called_once_with([100, 101])
+        self.assertIn("DELETE", result)
+        self.assertIn('rdfs:label "Changed"@en', result)
+
+    @patch("wikidata_update.json_diff.revision_content.fetch_revisions")
+    def test_main_missing_revision(self, mock_fetch):
+        mock_fetch.return_value = {101: make_entity()}
+        self.assertIsNone(main("Q1", 100, 101, False, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update import new_entity_rdf
+from wikidata_update.new_entity_rdf import render_many
+from wikidata_update.new_entity_rdf import render_entity
+
+
+def make_entity(entity_id):
+    return {
+        "id": entity_id,
+        "labels": {"en": {"language": "en", "value": f"label {entity_id}"}},
+        "descriptions": {},
+        "aliases": {},
+        "claims": {
+            "P31": [
+                {
+                    "mainsnak": {
+                        "datavalue": {
+                            "type": "wikibase-entityid",
+                            "value": {"id": "Q5"},
+                        }
+                    }
+                }
+            ]
+        },
+    }
+
+
+def make_response(data):
+    mock_response = MagicMock()
+    mock_response.json.return_value = data
+    return mock_response
+
+
+def entities_response(url, params=None, **kwargs):
+    entities = {}
+    for entity_id in params["ids"].split("|"):
+        if entity_id == "Q404":
+            entities[entity_id] = {"id": entity_id, "missing": ""}
+        else:
+            entities[entity_id] = make_entity(entity_id)
+    return make_response({"entities": entities})
+
+
+class TestRenderEntity(unittest.TestCase):
+
+    def test_render_entity(self):
+        insert_data = render_entity(make_entity("Q1"))
+        self.assertIn("wd:Q1 a schema:Thing ;", insert_data)
+        self.assertIn('schema:name "label Q1"@en ;', insert_data)
+        self.assertIn("wdt:P31 wd:Q5 .", insert_data)
+
+
+class TestRenderMany(unittest.TestCase):
+
+    @patch("wikidata_update.new_entity_rdf.http_client.get", side_effect=entities_response)
+    def test_batches_of_fifty(self, mock_get):
+        entity_ids = [f"Q{number}" for number in range(1, 121)]
+
+        rendered = render_many(entity_ids)
+
+        self.assertEqual(mock_get.call_count, 3)
+        batch_sizes = [
+            len(call[1]["params"]["ids"].split("|")) for call in mock_get.call_args_list
+        ]
+        self.assertEqual(batch_sizes, [50, 50, 20])
+        self.assertEqual(list(rendered), entity_ids)
+        self.assertTrue(all(rendered.values()))
+
+    @patch("wikidata_update.new_entity_rdf.http_client.get", side_effect=entities_response)
+    def test_invalid_and_missing_ids_are_isolated(self, mock_get):
+        rendered = render_many(["Q1", "P31", "Q404", "Q2", "Q1"])
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args[1]["params"]["ids"], "Q1|Q404|Q2")
+        self.assertIsNotNone(rendered["Q1"])
+        self.assertIsNotNone(rendered["Q2"])
+        self.assertIsNone(rendered["P31"])
+        self.assertIsNone(rendered["Q404"])
+
+    @patch("wikidata_update.new_entity_rdf.http_client.get")
+    def test_rejected_batch_is_fetched_one_by_one(self, mock_get):
+        def response(url, params=None, **kwargs):
+            if "|" in params["ids"] or params["ids"] == "Q3":
+                return make_response({"error": {"info": "Invalid id"}})
+            return entities_response(url, params)
+
+        mock_get.side_effect = response
+
+        rendered = render_many(["Q1", "Q2", "Q3"])
+
+        self.assertEqual(mock_get.call_count, 4)
+        self.assertIsNotNone(rendered["Q1"])
+        self.assertIsNotNone(rendered["Q2"])
+        self.assertIsNone(rendered["Q3"])
+
+    @patch("wikidata_update.new_entity_rdf.http_client.get", side_effect=entities_response)
+    def test_batch_size_is_configurable(self, mock_get):
+        with patch("wikidata_update.new_entity_rdf.BATCH_SIZE", 2):
+            render_many(["Q1", "Q2", "Q3"])
+        self.assertEqual(mock_get.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+from unittest.mock import patch
+import gzip
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.output_sink import open_sink
+from wikidata_update.output_sink import write
+from wikidata_update.output_sink import write_change
+from wikidata_update.output_sink import flush
+from wikidata_update.output_sink import close_sink
+from wikidata_update.output_sink import part_name
+from wikidata_update.output_sink import compression_of
+from wikidata_update import output_sink
+from rdflib import URIRef
+
+
+class TestOutputSink(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "changes.ttl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self):
+        with open(self.file_name, encoding="utf-8") as file:
+            return file.read()
+
+    def test_prefixes_and_changes_layout(self):
+        sink = open_sink(self.file_name, "PREFIX wd: <http://www.wikidata.org/entity/>")
+        write_change(sink, ["Entity change 1", "DELETE {\n}"])
+        write_change(sink, ["Entity change 2", "INSERT {\n}"])
+        close_sink(sink)
+        self.assertEqual(
+            self.read(),
+            "PREFIX wd: <http://www.wikidata.org/entity/>\n"
+            "Entity change 1\n\nDELETE {\n}\n\n"
+            "Entity change 2\n\nINSERT {\n}\n\n",
+        )
+        self.assertTrue(sink["file"].closed)
+        self.assertEqual(sink["changes"], 2)
+
+    def test_unwritable_file(self):
+        file_name = os.path.join(self.temp_dir.name, "missing", "changes.ttl")
+        with self.assertRaises(IOError):
+            open_sink(file_name, "PREFIX wd: <http://www.wikidata.org/entity/>")
+
+    @patch("wikidata_update.output_sink.FLUSH_INTERVAL", 3600)
+    def test_buffer_is_written_when_full(self):
+        with patch("wikidata_update.output_sink.FLUSH_BYTES", 10):
+            sink = open_sink(self.file_name)
+            write(sink, "12345")
+            self.assertEqual(self.read(), "")
+            write(sink, "67890")
+            self.assertEqual(self.read(), "1234567890")
+            self.assertEqual(sink["buffer"], [])
+            close_sink(sink)
+
+    @patch("wikidata_update.output_sink.FLUSH_BYTES", 1024)
+    def test_buffer_is_written_periodically(self):
+        with patch("wikidata_update.output_sink.time.monotonic", side_effect=[0, 1, 10, 10]):
+            sink = open_sink(self.file_name)
+            write(sink, "first")
+            self.assertEqual(self.read(), "")
+            write(sink, "second")
+            self.assertEqual(self.read(), "firstsecond")
+        close_sink(sink)
+
+    def test_flush(self):
+        sink = open_sink(self.file_name)
+        write(sink, "Entity change")
+        flush(sink)
+        self.assertEqual(self.read(), "Entity change")
+        self.assertEqual(sink["written"], len("Entity change"))
+        close_sink(sink)
+
+    def test_changeset_format(self):
+        changeset = {
+            "entity": "Q42",
+            "revid": 7,
+            "timestamp": "2024-12-19T15:08:49Z",
+            "changes": [("A", URIRef("http://a"), URIRef("http://b"), URIRef("http://c"))],
+        }
+        sink = open_sink(self.file_name, output_format="rdf-patch")
+        write_change(sink, ["changes for entity: Q42", changeset, "===="])
+        write_change(sink, ["changes for entity: Q64", dict(changeset, changes=[]), "===="])
+        close_sink(sink)
+        self.assertEqual(self.read(), "TX .\nA <http://a> <http://b> <http://c> .\nTC .\n")
+        self.assertEqual(sink["changes"], 2)
+
+    def test_open_error(self):
+        with self.assertRaises(IOError):
+            open_sink(os.path.join(self.temp_dir.name, "missing", "changes.ttl"))
+
+
+class TestCompressedOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_compression_of(self):
+        self.assertEqual(compression_of("changes.ttl.gz"), "gzip")
+        self.assertEqual(compression_of("changes.ttl.zst"), "zstd")
+        self.assertIsNone(compression_of("changes.ttl"))
+
+    def test_part_name(self):
+        self.assertEqual(part_name("out/changes.ttl.gz", 2), "out/changes.0002.ttl.gz")
+        self.assertEqual(part_name("changes.txt", 12), "changes.0012.txt")
+
+    def test_gzip(self):
+        sink = open_sink(self.path("changes.ttl.gz"), "PREFIX wd: <http://www.wikidata.org/entity/>")
+        self.assertIsNotNone(sink["thread"])
+        for i in range(100):
+            write_change(sink, [f"Entity change {i}", "INSERT {\n wd:Q42 wdt:P31 wd:Q5 .\n}"])
+        close_sink(sink)
+        self.assertFalse(sink["thread"].is_alive())
+        with gzip.open(self.path("changes.ttl.gz"), "rt", encoding="utf-8") as file:
+            content = file.read()
+        self.assertTrue(content.startswith("PREFIX wd: <http://www.wikidata.org/entity/>\nEntity change 0\n\n"))
+        self.assertEqual(content.count("INSERT {"), 100)
+        self.assertLess(os.path.getsize(self.path("changes.ttl.gz")), len(content) / 10)
+
+    @unittest.skipUnless(output_sink.zstandard, "zstandard is not installed")
+    def test_zstd(self):
+        sink = open_sink(self.path("changes.ttl.zst"))
+        write_change(sink, ["Entity change", "DELETE {\n}"])
+        close_sink(sink)
+        with output_sink.zstandard.open(self.path("changes.ttl.zst"), "rt", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "Entity change\n\nDELETE {\n}\n\n")
+
+    def test_rotate_by_changes(self):
+        sink = open_sink(self.path("changes.ttl.gz"), "HEADER", rotate_changes=2)
+        for i in range(5):
+            write_change(sink, [f"change {i}"])
+        close_sink(sink)
+        self.assertEqual(
+            sink["paths"],
+            [self.path(f"changes.000{part}.ttl.gz") for part in (1, 2, 3)],
+        )
+        with gzip.open(self.path("changes.0002.ttl.gz"), "rt", encoding="utf-8") as file:
+            self.assertEqual(file.read(), "HEADER\nchange 2\n\nchange 3\n\n")
+
+    def test_rotate_by_size(self):
+        sink = open_sink(self.path("changes.ttl"), rotate_bytes=10)
+        for i in range(3):
+            write_change(sink, ["0123456789"])
+        close_sink(sink)
+        self.assertEqual(len(sink["paths"]), 3)
+        with open(self.path("changes.0003.ttl"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), "0123456789\n\n")
+
+    def test_rotate_by_time(self):
+        with patch("wikidata_update.output_sink.time.monotonic", return_value=0):
+            sink = open_sink(self.path("changes.ttl"), rotate_seconds=60)
+            write_change(sink, ["change 0"])
+            write_change(sink, ["change 1"])
+        with patch("wikidata_update.output_sink.time.monotonic", return_value=61):
+            write_change(sink, ["change 2"])
+        close_sink(sink)
+        self.assertEqual(len(sink["paths"]), 2)
+        with open(self.path("changes.0001.ttl"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), "change 0\n\nchange 1\n\n")
+
+    def test_background_error_is_raised(self):
+        sink = open_sink(self.path("changes.ttl.gz"), rotate_changes=1)
+        write_change(sink, ["change 0"])
+        with patch("wikidata_update.output_sink.open_file", side_effect=IOError("disk full")):
+            write_change(sink, ["change 1"])
+            with self.assertRaises(IOError):
+                close_sink(sink)
+        self.assertFalse(sink["thread"].is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update import revision_cache
+from wikidata_update.revision_cache import configure
+from wikidata_update.revision_cache import cache_path
+from wikidata_update.revision_cache import get
+from wikidata_update.revision_cache import put
+
+
+class TestRevisionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        configure(self.temp_dir.name, max_bytes=1000)
+        revision_cache.HITS = 0
+        revision_cache.MISSES = 0
+
+    def tearDown(self):
+        configure(None)
+        self.temp_dir.cleanup()
+
+    def test_get_missing_revision(self):
+        self.assertIsNone(get("Q42", 123))
+        self.assertEqual(revision_cache.MISSES, 1)
+        self.assertEqual(revision_cache.HITS, 0)
+
+    def test_put_and_get(self):
+        put("Q42", 123, "wd:Q42 wdt:P31 wd:Q5 .")
+        self.assertEqual(get("Q42", 123), "wd:Q42 wdt:P31 wd:Q5 .")
+        self.assertEqual(revision_cache.HITS, 1)
+
+    def test_key_includes_format(self):
+        put("Q42", 123, "ttl content")
+        self.assertIsNone(get("Q42", 123, fmt="nt"))
+        self.assertNotEqual(cache_path("Q42", 123), cache_path("Q42", 123, fmt="nt"))
+
+    def test_revision_zero_is_not_cached(self):
+        put("Q42", 0, "content")
+        self.assertIsNone(get("Q42", 0))
+        self.assertEqual(revision_cache.MISSES, 0)
+
+    def test_no_temporary_files_left(self):
+        put("Q42", 123, "content")
+        for _, _, file_names in os.walk(self.temp_dir.name):
+            for file_name in file_names:
+                self.assertFalse(file_name.startswith(".tmp-"))
+
+    def test_evicts_least_recently_used(self):
+        put("Q1", 1, "a" * 400)
+        put("Q2", 2, "b" * 400)
+        # make Q1 the most recently used revision
+        past = time.time() - 60
+        os.utime(cache_path("Q2", 2), (past, past))
+        os.utime(cache_path("Q1", 1), (past - 60, past - 60))
+        get("Q1", 1)
+
+        put("Q3", 3, "c" * 400)
+
+        self.assertIsNotNone(get("Q1", 1))
+        self.assertIsNone(get("Q2", 2))
+        self.assertIsNotNone(get("Q3", 3))
+
+    def test_rewriting_a_revision_counts_its_size_once(self):
+        put("Q1", 1, "a" * 400)
+        put("Q1", 1, "a" * 300)
+        self.assertEqual(revision_cache._CACHE_BYTES, 300)
+
+        # rewriting a revision many times does not evict the other revisions
+        put("Q2", 2, "b" * 400)
+        for _ in range(5):
+            put("Q1", 1, "a" * 300)
+        self.assertIsNotNone(get("Q2", 2))
+
+    def test_disabled_cache(self):
+        configure(None)
+        put("Q42", 123, "content")
+        self.assertIsNone(get("Q42", 123))
+        self.assertEqual(revision_cache.MISSES, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update import revision_content
+from wikidata_update.revision_content import change_revision_ids
+from wikidata_update.revision_content import fetch_revisions
+from wikidata_update.revision_content import fetch_change_revisions
+from wikidata_update.revision_content import iter_latest_revisions
+from wikidata_update.revision_content import prefetch_changes
+
+
+def make_revision(revision_id):
+    return {
+        "revid": revision_id,
+        "parentid": revision_id - 1,
+        "sha1": "0" * 40,
+        "slots": {
+            "main": {
+                "contentmodel": "wikibase-item",
+                "content": json.dumps({"id": "Q42", "lastrevid": revision_id}),
+            }
+        },
+    }
+
+
+def revisions_response(url, params=None, **kwargs):
+    revision_ids = [int(revision_id) for revision_id in params["revids"].split("|")]
+    mock_response = MagicMock()
+    mock_response.json.return_value = {
+        "query": {
+            "pages": [
+                {
+                    "title": "Q42",
+                    "revisions": [
+                        make_revision(revision_id)
+                        for revision_id in revision_ids
+                        if revision_id != 404
+                    ],
+                }
+            ],
+            "badrevids": {"404": {"revid": 404}} if 404 in revision_ids else {},
+        }
+    }
+    return mock_response
+
+
+class TestChangeRevisionIds(unittest.TestCase):
+
+    def test_collects_old_and_new_revisions(self):
+        changes = [
+            {"revid": 12, "old_revid": 11},
+            {"revid": 11, "old_revid": 10},
+            {"revid": 20, "old_revid": 0},
+        ]
+        self.assertEqual(change_revision_ids(changes), [10, 11, 12, 20])
+
+
+class TestFetchRevisions(unittest.TestCase):
+
+    def setUp(self):
+        revision_content.revision_cache.configure(None)
+        revision_content.clear()
+
+    @patch("wikidata_update.revision_content.http_client.get", side_effect=revisions_response)
+    def test_fetches_in_chunks(self, mock_get):
+        contents = fetch_revisions(range(1, 121))
+
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(len(contents), 120)
+        self.assertEqual(contents[7], {"id": "Q42", "lastrevid": 7})
+        params = mock_get.call_args_list[0][1]["params"]
+        self.assertEqual(params["rvslots"], "main")
+        self.assertEqual(params["rvprop"], "content|ids|sha1|timestamp")
+
+    @patch("wikidata_update.revision_content.http_client.get", side_effect=revisions_response)
+    def test_unknown_revisions_are_left_out(self, mock_get):
+        contents = fetch_revisions([1, 404, 2])
+        self.assertEqual(sorted(contents), [1, 2])
+
+    @patch("wikidata_update.revision_content.http_client.get")
+    def test_follows_continuation(self, mock_get):
+        first = MagicMock()
+        first.json.return_value = {
+            "continue": {"rvcontinue": "2", "continue": "||"},
+            "query": {"pages": [{"title": "Q42", "revisions": [make_revision(1)]}]},
+        }
+        second = MagicMock()
+        second.json.return_value = {
+            "query": {"pages": [{"title": "Q42", "revisions": [make_revision(2)]}]}
+        }
+        mock_get.side_effect = [first, second]
+
+        contents = fetch_revisions([1, 2])
+
+        self.assertEqual(sorted(contents), [1, 2])
+        self.assertEqual(mock_get.call_args_list[1][1]["params"]["rvcontinue"], "2")
+
+    @patch("wikidata_update.revision_content.http_client.get", side_effect=revisions_response)
+    def test_cached_revisions_are_not_downloaded(self, mock_get):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            revision_content.revision_cache.configure(cache_dir)
+            try:
+                fetch_change_revisions([{"revid": 2, "old_revid": 1}])
+                contents = fetch_change_revisions([{"revid": 3, "old_revid": 2}])
+            finally:
+                revision_content.revision_cache.configure(None)
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args[1]["params"]["revids"], "3")
+        self.assertEqual(sorted(contents), [2, 3])
+
+    @patch("wikidata_update.revision_content.http_client.get", side_effect=revisions_response)
+    def test_recent_revisions_are_kept_in_memory(self, mock_get):
+        fetch_revisions([1, 2])
+        contents = fetch_revisions([2])
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(contents[2]["lastrevid"], 2)
+
+    @patch("wikidata_update.revision_content.http_client.get", side_effect=revisions_response)
+    def test_prefetch_changes(self, mock_get):
+        changes = [{"revid": revid, "old_revid": revid - 1} for revid in range(2, 62, 2)]
+        with patch("wikidata_update.revision_content.CHUNK_SIZE", 20):
+            prefetched = list(prefetch_changes(iter(changes)))
+        self.assertEqual(prefetched, changes)
+        # 10 changes with 20 revisions per request
+        self.assertEqual(mock_get.call_count, 3)
+
+
+class TestIterLatestRevisions(unittest.TestCase):
+
+    @patch("wikidata_update.revision_content.http_client.get")
+    def test_uses_recentchanges_generator(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "query": {"pages": [{"title": "Q42", "revisions": [make_revision(5)]}]}
+        }
+        mock_get.return_value = mock_response
+
+        revisions = list(
+            iter_latest_revisions("2023-10-01T00:00:00Z", "2023-10-02T00:00:00Z")
+        )
+
+        self.assertEqual(revisions, [("Q42", 5, {"id": "Q42", "lastrevid": 5})])
+        params = mock_get.call_args[1]["params"]
+        self.assertEqual(params["generator"], "recentchanges")
+        self.assertEqual(params["grcstart"], "2023-10-02T00:00:00Z")
+
+
+if __name__ == "__main__":
+    unittest.main()
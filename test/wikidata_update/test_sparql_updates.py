@@ -3,15 +3,27 @@ from unittest.mock import patch, MagicMock
 import sys
 import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from sparql_updates import get_wikidata_updates
-from sparql_updates import verify_date
-from sparql_updates import write_to_file
-from sparql_updates import verify_args
-from sparql_updates import main
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.sparql_updates import get_wikidata_updates
+from wikidata_update.sparql_updates import iter_wikidata_updates
+from wikidata_update.sparql_updates import WikidataAPIError
+from wikidata_update.sparql_updates import verify_date
+from wikidata_update.sparql_updates import verify_args
+from wikidata_update.sparql_updates import main
+from wikidata_update.sparql_updates import process_change
+from wikidata_update.sparql_updates import process_changes
+from wikidata_update.sparql_updates import process_changes_in_processes
+from wikidata_update.sparql_updates import process_changes_async
+from wikidata_update.sparql_updates import coalesce_changes
+from wikidata_update.sparql_updates import describe_change
+from wikidata_update.sparql_updates import follow_changes
+from wikidata_update import sparql_updates
+from wikidata_update import ttl_compare
+import tempfile
 import requests
 import argparse
 from datetime import datetime, timedelta
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 import sys
@@ -20,7 +32,7 @@ import os
 
 class TestGetWikidataUpdates(unittest.TestCase):
 
-    @patch("sparql_updates.requests.get")
+    @patch("wikidata_update.sparql_updates.http_client.get")
     def test_get_wikidata_updates_success(self, mock_get):
         # Mock response data
         mock_response = MagicMock()
@@ -57,7 +69,7 @@ class TestGetWikidataUpdates(unittest.TestCase):
         self.assertIsInstance(changes[0]["old_revid"], int)
         self.assertEqual(changes[0]["old_revid"], 444)
 
-    @patch("sparql_updates.requests.get")
+    @patch("wikidata_update.sparql_updates.http_client.get")
     def test_get_wikidata_updates_no_changes(self, mock_get):
         # Mock response data
         mock_response = MagicMock()
@@ -73,7 +85,7 @@ class TestGetWikidataUpdates(unittest.TestCase):
         # Assertions
         self.assertEqual(len(changes), 0)
 
-    @patch("sparql_updates.requests.get")
+    @patch("wikidata_update.sparql_updates.http_client.get")
     def test_get_wikidata_updates_request_exception(self, mock_get):
         # Mock request exception
         mock_get.side_effect = requests.exceptions.RequestException("Network error")
@@ -86,7 +98,7 @@ class TestGetWikidataUpdates(unittest.TestCase):
         # Assertions
         self.assertIsNone(changes)
 
-    @patch("sparql_updates.requests.get")
+    @patch("wikidata_update.sparql_updates.http_client.get")
     def test_get_wikidata_updates_api_error(self, mock_get):
         # Mock response data with error
         mock_response = MagicMock()
@@ -103,6 +115,97 @@ class TestGetWikidataUpdates(unittest.TestCase):
         self.assertIsNone(changes)
 
 
+class TestIterWikidataUpdates(unittest.TestCase):
+
+    def make_page(self, first_revid, count, rccontinue=None):
+        mock_response = MagicMock()
+        data = {
+            "query": {
+                "recentchanges": [
+                    {"title": "Q1", "revid": revid, "old_revid": revid - 1}
+                    for revid in range(first_revid, first_revid - count, -1)
+                ]
+            }
+        }
+        if rccontinue:
+            data["continue"] = {"rccontinue": rccontinue, "continue": "-||"}
+        mock_response.json.return_value = data
+        return mock_response
+
+    @patch("wikidata_update.sparql_updates.http_client.get")
+    def test_follows_rccontinue(self, mock_get):
+        mock_get.side_effect = [
+            self.make_page(1000, 500, "20231001120000|42"),
+            self.make_page(500, 200),
+        ]
+
+        changes = list(
+            iter_wikidata_updates("2023-10-01T00:00:00Z", "2023-10-02T00:00:00Z")
+        )
+
+        self.assertEqual(len(changes), 700)
+        self.assertEqual(mock_get.call_count, 2)
+        first_params = mock_get.call_args_list[0][1]["params"]
+        second_params = mock_get.call_args_list[1][1]["params"]
+        self.assertNotIn("rccontinue", first_params)
+        self.assertEqual(second_params["rccontinue"], "20231001120000|42")
+        self.assertEqual(second_params["continue"], "-||")
+
+    @patch("wikidata_update.sparql_updates.http_client.get")
+    def test_stops_at_max_changes(self, mock_get):
+        mock_get.side_effect = [
+            self.make_page(1000, 500, "20231001120000|42"),
+            self.make_page(500, 100, "20231001110000|41"),
+        ]
+
+        changes = list(
+            iter_wikidata_updates(
+                "2023-10-01T00:00:00Z", "2023-10-02T00:00:00Z", max_changes=600
+            )
+        )
+
+        self.assertEqual(len(changes), 600)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args_list[0][1]["params"]["rclimit"], 500)
+        self.assertEqual(mock_get.call_args_list[1][1]["params"]["rclimit"], 100)
+
+    @patch("wikidata_update.sparql_updates.http_client.get")
+    def test_pages_are_fetched_lazily(self, mock_get):
+        mock_get.side_effect = [
+            self.make_page(1000, 500, "20231001120000|42"),
+            self.make_page(500, 500),
+        ]
+
+        changes = iter_wikidata_updates("2023-10-01T00:00:00Z", "2023-10-02T00:00:00Z")
+        self.assertEqual(mock_get.call_count, 0)
+        next(changes)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("wikidata_update.sparql_updates.http_client.get")
+    def test_newer_direction_starts_at_start_time(self, mock_get):
+        mock_get.return_value = self.make_page(10, 1)
+
+        list(
+            iter_wikidata_updates(
+                "2023-10-01T00:00:00Z", "2023-10-02T00:00:00Z", direction="newer"
+            )
+        )
+
+        params = mock_get.call_args[1]["params"]
+        self.assertEqual(params["rcdir"], "newer")
+        self.assertEqual(params["rcstart"], "2023-10-01T00:00:00Z")
+        self.assertEqual(params["rcend"], "2023-10-02T00:00:00Z")
+
+    @patch("wikidata_update.sparql_updates.http_client.get")
+    def test_api_error_is_raised(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"error": {"info": "Some error occurred"}}
+        mock_get.return_value = mock_response
+
+        with self.assertRaises(WikidataAPIError):
+            list(iter_wikidata_updates("2023-10-01T00:00:00Z", "2023-10-02T00:00:00Z"))
+
+
 class TestVerifyArgs(unittest.TestCase):
 
     def setUp(self):
@@ -144,7 +247,7 @@ class TestVerifyArgs(unittest.TestCase):
         args = self.parser.parse_args(["--number", "0"])
         self.assertFalse(verify_args(args))
 
-        args = self.parser.parse_args(["--number", "501"])
+        args = self.parser.parse_args(["--number", "-1"])
         self.assertFalse(verify_args(args))
 
         args = self.parser.parse_args(["--number", "invalid_number"])
@@ -197,6 +300,12 @@ class TestVerifyArgs(unittest.TestCase):
         args = self.parser.parse_args(["--number", "5"])
         self.assertTrue(verify_args(args))
 
+        args = self.parser.parse_args(["--number", "2000"])
+        self.assertTrue(verify_args(args))
+
+        args = self.parser.parse_args(["--number", "all"])
+        self.assertTrue(verify_args(args))
+
         args = self.parser.parse_args(["--id", "Q123"])
         self.assertTrue(verify_args(args))
 
@@ -234,44 +343,434 @@ class TestVerifyDate(unittest.TestCase):
         self.assertFalse(verify_date(date))
 
 
-class TestWriteToFile(unittest.TestCase):
+class TestProcessChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = [
+            {"title": f"Q{i}", "old_revid": 100 + i, "revid": 200 + i}
+            for i in range(1, 9)
+        ]
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.main")
+    def test_process_change_skips_non_items(self, mock_main):
+        change = {"title": "Property:P31", "old_revid": 1, "revid": 2}
+        self.assertEqual(process_change(change), [])
+        mock_main.assert_not_called()
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.main")
+    def test_process_change_item(self, mock_main):
+        mock_main.return_value = "mocked SPARQL update"
+        result = process_change(self.changes[0])
+        self.assertEqual(result[1], "mocked SPARQL update")
+        self.assertIn("Q1", result[0])
+        mock_main.assert_called_once_with("Q1", 101, 201, False, False)
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.DIFF_RESULT", "changes")
+    @patch("wikidata_update.sparql_updates.ttl_compare.main")
+    def test_process_change_keeps_changed_triples_with_the_change(self, mock_main):
+        rows = [("A", "s", "p", "o")]
+        mock_main.return_value = rows
+        change = dict(self.changes[0], timestamp="2024-07-22T11:56:10Z")
+        self.assertEqual(
+            process_change(change)[1],
+            {"entity": "Q1", "revid": 201, "timestamp": "2024-07-22T11:56:10Z", "changes": rows},
+        )
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.main")
+    def test_process_changes_keeps_order_with_workers(self, mock_main):
+        def slow_first(entity_id, old_revid, new_revid, debug, print_output):
+            # the earliest changes finish last
+            time.sleep(0.01 * (10 - int(entity_id[1:])))
+            return entity_id
+
+        mock_main.side_effect = slow_first
+        results = list(process_changes(self.changes, workers=4))
+        self.assertEqual(
+            [result[1] for result in results],
+            [change["title"] for change in self.changes],
+        )
 
-    @patch("sparql_updates.open", new_callable=unittest.mock.mock_open)
-    def test_write_to_file_success(self, mock_open):
-        # Mock data
-        data = ["Entity change 1", "Entity change 2"]
-        # Mock global variables
-        file_name = "test_file.ttl"
-        prefixes = "PREFIX wd: <http://www.wikidata.org/entity/>\n"
+    @patch("wikidata_update.sparql_updates.ttl_compare.main")
+    def test_process_changes_sequential(self, mock_main):
+        mock_main.side_effect = lambda entity_id, *args: entity_id
+        results = list(process_changes(self.changes))
+        self.assertEqual(len(results), len(self.changes))
+        self.assertEqual(results[0][1], "Q1")
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.diff_changes")
+    def test_process_changes_async_streams_in_order(self, mock_diff_changes):
+        mock_diff_changes.side_effect = lambda changes, limit: (
+            f"{change['title']}:{change['old_revid']}->{change['revid']}" for change in changes
+        )
+        changes = self.changes[:2] + [{"title": "Property:P31", "old_revid": 1, "revid": 2}] + self.changes[2:]
 
-        # Call the function
-        write_to_file(data, file_name, prefixes)
-        # Assertions
-        mock_open.assert_called_once_with(file_name, "w")
-        handle = mock_open()
-        handle.write.assert_any_call(prefixes)
-        handle.write.assert_any_call("\n")
-        handle.write.assert_any_call("Entity change 1")
-        handle.write.assert_any_call("\n\n")
-        handle.write.assert_any_call("Entity change 2")
-        handle.write.assert_any_call("\n\n")
-
-    @patch("sparql_updates.open", new_callable=unittest.mock.mock_open)
-    def test_write_to_file_io_error(self, mock_open):
-        # Mock data
-        data = ["Entity change 1", "Entity change 2"]
-        # Mock global variables
-        file_name = "test_file.ttl"
-        prefixes = "PREFIX wd: <http://www.wikidata.org/entity/>\n"
-
-        # Simulate IOError
-        mock_open.side_effect = IOError("Unable to open file")
-
-        # Call the function and assert IOError is raised
-        with self.assertRaises(IOError):
-            write_to_file(data, file_name, prefixes)
-            sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+        results = process_changes_async(iter(changes), limit=3)
+
+        self.assertIn("Q1", next(results)[0])
+        self.assertEqual(
+            [result[1] for result in results],
+            [f"Q{i}:{100 + i}->{200 + i}" for i in range(2, 9)],
+        )
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.diff_ttl_pairs")
+    @patch("wikidata_update.sparql_updates.ttl_compare.get_ttl_pair")
+    def test_process_changes_in_processes(self, mock_get_ttl_pair, mock_diff_ttl_pairs):
+        mock_get_ttl_pair.side_effect = lambda entity_id, old, new: (old, new, entity_id)
+        mock_diff_ttl_pairs.side_effect = lambda pairs, processes, chunksize: [
+            f"{entity_id}:{old}->{new}" for old, new, entity_id in pairs
+        ]
+        changes = self.changes + [{"title": "Property:P31", "old_revid": 1, "revid": 2}]
+
+        results = list(
+            process_changes_in_processes(changes, workers=3, processes=2, chunksize=1)
+        )
+
+        self.assertEqual(
+            [result[1] for result in results],
+            [f"Q{i}:{100 + i}->{200 + i}" for i in range(1, 9)],
+        )
+        # 8 changes in batches of 2 * processes * chunksize
+        self.assertEqual(mock_diff_ttl_pairs.call_count, 2)
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.diff_ttl_pairs")
+    @patch("wikidata_update.sparql_updates.ttl_compare.get_ttl_pair")
+    def test_process_changes_in_processes_downloads_next_batch(self, mock_get_ttl_pair, mock_diff_ttl_pairs):
+        mock_get_ttl_pair.side_effect = lambda entity_id, old, new: (old, new, entity_id)
+        mock_diff_ttl_pairs.side_effect = lambda pairs, processes, chunksize: [
+            entity_id for _, _, entity_id in pairs
+        ]
+
+        results = process_changes_in_processes(self.changes, workers=1, processes=1, chunksize=2)
+
+        self.assertEqual(next(results)[1], "Q1")
+        # the second batch of 4 changes was downloaded while the first one was diffed
+        self.assertEqual(mock_get_ttl_pair.call_count, 8)
+        self.assertEqual(mock_diff_ttl_pairs.call_count, 1)
+        self.assertEqual([result[1] for result in results], [f"Q{i}" for i in range(2, 9)])
+
+    @patch("wikidata_update.sparql_updates.ttl_compare.diff_ttl_pairs")
+    @patch("wikidata_update.sparql_updates.ttl_compare.get_ttl_pair")
+    def test_process_changes_in_processes_fetch_error(self, mock_get_ttl_pair, mock_diff_ttl_pairs):
+        def get_ttl_pair(entity_id, old, new):
+            if entity_id == "Q2":
+                raise requests.exceptions.ConnectionError("offline")
+            return old, new, entity_id
+
+        mock_get_ttl_pair.side_effect = get_ttl_pair
+        mock_diff_ttl_pairs.side_effect = lambda pairs, processes, chunksize: [
+            entity_id for _, _, entity_id in pairs
+        ]
+        results = list(process_changes_in_processes(self.changes[:3], processes=1, chunksize=2))
+        self.assertEqual([result[1] for result in results], ["Q1", None, "Q3"])
+
+
+class TestFollowChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_file = os.path.join(self.temp_dir.name, "checkpoint.json")
+        self.output_file = os.path.join(self.temp_dir.name, "changes.ttl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_change(self, rcid):
+        return {
+            "type": "edit",
+            "title": f"Q{rcid}",
+            "rcid": rcid,
+            "revid": rcid * 10,
+            "old_revid": rcid * 10 - 1,
+            "user": "test_user",
+            "timestamp": "2023-10-01T12:00:00Z",
+        }
 
+    def fake_process_change(self, change):
+        return [f"change {change['rcid']}", f"diff {change['rcid']}", "sep"]
+
+    @patch("wikidata_update.sparql_updates.time.sleep")
+    @patch("wikidata_update.sparql_updates.iter_wikidata_updates")
+    def test_restart_has_no_gaps_or_duplicates(self, mock_iter, mock_sleep):
+        # the second poll lists changes 1 and 2 again, as it starts at the same second
+        mock_iter.side_effect = [
+            iter([self.make_change(1), self.make_change(2)]),
+            iter([self.make_change(1), self.make_change(2), self.make_change(3)]),
+        ]
+        with patch("wikidata_update.sparql_updates.process_change", side_effect=self.fake_process_change):
+            with patch("wikidata_update.sparql_updates.PRINT_OUTPUT", False):
+                follow_changes(self.checkpoint_file, self.output_file, max_polls=1)
+                follow_changes(self.checkpoint_file, self.output_file, max_polls=1)
+
+        with open(self.output_file) as file:
+            content = file.read()
+        for rcid in (1, 2, 3):
+            self.assertEqual(content.count(f"diff {rcid}\n"), 1)
+        # the second run starts at the timestamp of the checkpoint
+        self.assertEqual(mock_iter.call_args[0][0], "2023-10-01T12:00:00Z")
+        self.assertEqual(mock_iter.call_args[0][3], "newer")
+
+    @patch("wikidata_update.sparql_updates.time.sleep")
+    @patch("wikidata_update.sparql_updates.iter_wikidata_updates")
+    def test_uncheckpointed_output_is_dropped(self, mock_iter, mock_sleep):
+        mock_iter.side_effect = [
+            iter([self.make_change(1)]),
+            iter([self.make_change(1), self.make_change(2)]),
+        ]
+        with patch("wikidata_update.sparql_updates.process_change", side_effect=self.fake_process_change):
+            with patch("wikidata_update.sparql_updates.PRINT_OUTPUT", False):
+                follow_changes(self.checkpoint_file, self.output_file, max_polls=1)
+                # simulate a crash after writing change 2 but before checkpointing it
+                with open(self.output_file, "a") as file:
+                    file.write("change 2\n\ndiff 2\n\nsep\n\n")
+                follow_changes(self.checkpoint_file, self.output_file, max_polls=1)
+
+        with open(self.output_file) as file:
+            content = file.read()
+        self.assertEqual(content.count("diff 2\n"), 1)
+
+    @patch("wikidata_update.sparql_updates.time.sleep")
+    @patch("wikidata_update.sparql_updates.iter_wikidata_updates")
+    def test_polling_adapts_to_edit_rate(self, mock_iter, mock_sleep):
+        mock_iter.side_effect = [iter([]), iter([]), iter([self.make_change(1)]), iter([])]
+        with patch("wikidata_update.sparql_updates.process_change", side_effect=self.fake_process_change):
+            with patch("wikidata_update.sparql_updates.PRINT_OUTPUT", False):
+                follow_changes(self.checkpoint_file, max_polls=4)
+
+        intervals = [call[0][0] for call in mock_sleep.call_args_list]
+        self.assertEqual(intervals, [2, 4, 2])
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.temp_dir.name, "changes.ttl")
+        # main sets the module globals through verify_args
+        self.saved_globals = {
+            name: value for name, value in vars(sparql_updates).items() if name.isupper()
+        }
+
+    def tearDown(self):
+        vars(sparql_updates).update(self.saved_globals)
+        ttl_compare.REVISION_SOURCE = "ttl"
+        ttl_compare.GROUP_TRIPLES = False
+        self.temp_dir.cleanup()
+
+    def make_change(self, number):
+        return {
+            "type": "edit",
+            "title": f"Q{number}",
+            "rcid": number,
+            "revid": number * 10,
+            "old_revid": number * 10 - 1,
+            "user": "test_user",
+            "timestamp": "2023-10-01T12:00:00Z",
+        }
+
+    def run_main(self, changes, process_change):
+        argv = ["sparql_updates.py", "-n", str(len(changes)), "-op", "-f", self.output_file]
+        with patch("sys.argv", argv), patch("builtins.print"), patch(
+            "wikidata_update.sparql_updates.iter_wikidata_updates", return_value=iter(changes)
+        ), patch("wikidata_update.sparql_updates.process_change", side_effect=process_change):
+            main()
+        with open(self.output_file, encoding="utf-8") as file:
+            return file.read()
+
+    def test_changes_without_diff_are_skipped(self):
+        def process_change(change):
+            # the json engine returns None when a revision could not be fetched
+            diff = None if change["rcid"] == 2 else f"INSERT {{ diff {change['rcid']} }}"
+            return [f"change {change['rcid']}", diff, "sep"]
+
+        content = self.run_main([self.make_change(number) for number in (1, 2, 3)], process_change)
+        self.assertIn("diff 1", content)
+        self.assertIn("diff 3", content)
+        self.assertNotIn("change 2", content)
+
+    def test_process_pool_is_shut_down_on_errors(self):
+        def process_change(change):
+            raise RuntimeError("diff failed")
+
+        with patch("wikidata_update.sparql_updates.ttl_compare.shutdown_process_pool") as shutdown:
+            with self.assertRaises(RuntimeError):
+                self.run_main([self.make_change(1)], process_change)
+        shutdown.assert_called_once_with()
+
+    def test_listing_error_keeps_the_listed_changes(self):
+        def listed_changes():
+            yield self.make_change(1)
+            raise requests.exceptions.ConnectionError("offline")
+
+        def process_change(change):
+            return [f"change {change['rcid']}", f"INSERT {{ diff {change['rcid']} }}", "sep"]
+
+        argv = ["sparql_updates.py", "-n", "2", "-op", "-f", self.output_file]
+        with patch("sys.argv", argv), patch("builtins.print"), patch(
+            "wikidata_update.sparql_updates.iter_wikidata_updates", return_value=listed_changes()
+        ), patch("wikidata_update.sparql_updates.process_change", side_effect=process_change):
+            with self.assertLogs("wikidata_update.sparql_updates", "ERROR") as logs:
+                main()
+        self.assertIn("Listing changes failed", logs.output[0])
+        with open(self.output_file, encoding="utf-8") as file:
+            self.assertIn("diff 1", file.read())
+
+
+    def test_follow_diffs_with_the_engine(self):
+        checkpoint_file = os.path.join(self.temp_dir.name, "checkpoint.json")
+        sources = []
+        argv = ["sparql_updates.py", "--follow", "--checkpoint", checkpoint_file, "--engine", "mapped", "-op"]
+        with patch("sys.argv", argv), patch("builtins.print"), patch(
+            "wikidata_update.sparql_updates.follow_changes",
+            side_effect=lambda *args: sources.append(ttl_compare.REVISION_SOURCE),
+        ):
+            main()
+        self.assertEqual(sources, ["json"])
+
+    def test_follow_groups_triples(self):
+        checkpoint_file = os.path.join(self.temp_dir.name, "checkpoint.json")
+        grouped = []
+        argv = ["sparql_updates.py", "--follow", "--checkpoint", checkpoint_file, "--group-triples", "-op"]
+        with patch("sys.argv", argv), patch("builtins.print"), patch(
+            "wikidata_update.sparql_updates.follow_changes",
+            side_effect=lambda *args: grouped.append(ttl_compare.GROUP_TRIPLES),
+        ):
+            main()
+        self.assertEqual(grouped, [True])
+
+    def test_follow_with_the_ntriples_engine(self):
+        checkpoint_file = os.path.join(self.temp_dir.name, "checkpoint.json")
+        subject = "<http://www.wikidata.org/entity/Q1>"
+        revisions = {
+            9: f'{subject} <http://www.w3.org/2000/01/rdf-schema#label> "old"@en .\n',
+            10: f'{subject} <http://www.w3.org/2000/01/rdf-schema#label> "new"@en .\n',
+        }
+        argv = [
+            "sparql_updates.py", "--follow", "--checkpoint", checkpoint_file,
+            "--engine", "ntriples", "-op", "-f", self.output_file,
+        ]
+        ttl_compare.graph_cache.clear()
+        with patch("sys.argv", argv), patch("builtins.print"), patch(
+            "wikidata_update.sparql_updates.iter_wikidata_updates",
+            return_value=iter([self.make_change(1)]),
+        ), patch(
+            "wikidata_update.ttl_compare.get_entity_nt",
+            side_effect=lambda entity_id, revision_id: revisions[revision_id],
+        ) as mock_get_entity_nt, patch(
+            "wikidata_update.ttl_compare.get_entity_ttl"
+        ) as mock_get_entity_ttl, patch(
+            # stops following after the first poll
+            "wikidata_update.sparql_updates.time.sleep", side_effect=KeyboardInterrupt
+        ):
+            main()
+        ttl_compare.graph_cache.clear()
+
+        self.assertEqual(
+            sorted(call[0] for call in mock_get_entity_nt.call_args_list), [("Q1", 9), ("Q1", 10)]
+        )
+        mock_get_entity_ttl.assert_not_called()
+        with open(self.output_file, encoding="utf-8") as file:
+            content = file.read()
+        self.assertIn('"new"@en', content)
+        self.assertIn('"old"@en', content)
+
+    def test_stream_resumes_after_the_last_written_change(self):
+        changes = [dict(self.make_change(number), event_id=f"event-{number}") for number in (1, 2, 3)]
+        changes.insert(1, dict(self.make_change(4), title="P4", event_id="event-4"))
+
+        def process_change(change):
+            # the revisions of the last change could not be fetched, it is not written
+            diff = None if change["rcid"] == 3 else f"INSERT {{ diff {change['rcid']} }}"
+            return [f"change {change['rcid']}", diff, "sep"]
+
+        argv = ["sparql_updates.py", "--stream", "https://stream.example", "-op", "-f", self.output_file]
+        with patch("sys.argv", argv), patch("builtins.print"), patch(
+            "wikidata_update.event_stream.iter_stream_changes", return_value=iter(changes)
+        ), patch("wikidata_update.sparql_updates.process_change", side_effect=process_change):
+            with self.assertLogs("wikidata_update.sparql_updates", "INFO") as logs:
+                main()
+        resume = [line for line in logs.output if "--last-event-id" in line]
+        self.assertEqual(len(resume), 1)
+        self.assertIn("'event-2'", resume[0])
+
+    def test_stream_with_coalesce_is_rejected(self):
+        argv = ["sparql_updates.py", "--stream", "https://stream.example", "--coalesce"]
+        with patch("sys.argv", argv), patch("builtins.print") as printed, patch(
+            "wikidata_update.event_stream.iter_stream_changes"
+        ) as stream:
+            main()
+        stream.assert_not_called()
+        self.assertIn("oldest first", printed.call_args_list[0][0][0])
+
+class TestCoalesceChanges(unittest.TestCase):
+
+    def change(self, title, old_revid, revid, second, user="bot"):
+        return {
+            "title": title,
+            "old_revid": old_revid,
+            "revid": revid,
+            "timestamp": f"2024-07-22T11:56:{second:02d}Z",
+            "user": user,
+            "type": "edit",
+        }
+
+    def test_merges_adjacent_burst(self):
+        # newest first, as returned by recentchanges
+        changes = [
+            self.change("Q1", 12, 13, 30),
+            self.change("Q1", 11, 12, 20),
+            self.change("Q1", 10, 11, 10),
+            self.change("Q2", 20, 21, 5),
+        ]
+        result = list(coalesce_changes(changes))
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual((result[0]["old_revid"], result[0]["revid"]), (10, 13))
+        self.assertEqual((result[1]["old_revid"], result[1]["revid"]), (20, 21))
+        self.assertNotIn("revisions", result[0])
+
+    def test_does_not_merge_interleaved_without_window(self):
+        changes = [
+            self.change("Q1", 11, 12, 30),
+            self.change("Q2", 20, 21, 20),
+            self.change("Q1", 10, 11, 10),
+        ]
+        result = list(coalesce_changes(changes))
+        self.assertEqual([change["title"] for change in result], ["Q1", "Q2", "Q1"])
+
+    def test_merges_interleaved_inside_window(self):
+        changes = [
+            self.change("Q1", 11, 12, 30),
+            self.change("Q2", 20, 21, 20),
+            self.change("Q1", 10, 11, 10),
+            self.change("Q1", 9, 10, 0),
+        ]
+        result = list(coalesce_changes(changes, window=25))
+
+        self.assertEqual([change["title"] for change in result], ["Q1", "Q2", "Q1"])
+        self.assertEqual((result[0]["old_revid"], result[0]["revid"]), (10, 12))
+        self.assertEqual((result[2]["old_revid"], result[2]["revid"]), (9, 10))
+
+    def test_does_not_merge_broken_chain(self):
+        changes = [
+            self.change("Q1", 15, 16, 30),
+            self.change("Q1", 10, 11, 20),
+        ]
+        result = list(coalesce_changes(changes))
+        self.assertEqual(len(result), 2)
+
+    def test_keep_revisions(self):
+        changes = [
+            self.change("Q1", 11, 12, 30, user="B"),
+            self.change("Q1", 0, 11, 20, user="A"),
+        ]
+        changes[1]["type"] = "new"
+        result = list(coalesce_changes(changes, keep_revisions=True))
+
+        self.assertEqual(result[0]["type"], "new")
+        self.assertEqual(
+            [revision["user"] for revision in result[0]["revisions"]], ["A", "B"]
+        )
+        self.assertIn("merging 2 revisions: 11 by A", describe_change(result[0]))
 
 
 if __name__ == "__main__":
@@ -4,17 +4,28 @@ import requests
 import sys
 import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from ttl_compare import get_entity_ttl
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.ttl_compare import get_entity_ttl
 import unittest
 from rdflib import Graph
-from rdflib.term import Literal
-from ttl_compare import diff_ttls
-from ttl_compare import triples_to_sparql
-from ttl_compare import format_object_for_sparql
-from ttl_compare import replace_prefixes
-from ttl_compare import has_prefix
-from ttl_compare import main
+from rdflib.term import Literal, URIRef
+from wikidata_update.ttl_compare import diff_ttls
+from wikidata_update.ttl_compare import triples_to_sparql
+from wikidata_update.ttl_compare import format_object_for_sparql
+from wikidata_update.ttl_compare import replace_prefixes
+from wikidata_update.ttl_compare import has_prefix
+from wikidata_update.ttl_compare import main
+from wikidata_update.ttl_compare import diff_revisions_async
+from wikidata_update.ttl_compare import diff_changes
+from wikidata_update.ttl_compare import diff_ttl_pairs
+from wikidata_update.ttl_compare import shutdown_process_pool
+from wikidata_update.ttl_compare import parse_nt_line
+from wikidata_update.ttl_compare import diff_nts
+from wikidata_update.ttl_compare import diff_ttl_blocks
+from wikidata_update.ttl_compare import parse_ttl
+from wikidata_update.ttl_compare import split_blocks
+from wikidata_update import ttl_compare
+import asyncio
 
 
 FULL_PREFIXES_STR = """
@@ -53,7 +64,7 @@ FULL_PREFIXES_STR = """
 
 class TestGetEntityTTL(unittest.TestCase):
 
-    @patch("ttl_compare.requests.get")
+    @patch("wikidata_update.ttl_compare.http_client.get")
     def test_get_entity_ttl_success(self, mock_get):
         # Mock the response from requests.get
         mock_response = mock_get.return_value
@@ -71,7 +82,7 @@ class TestGetEntityTTL(unittest.TestCase):
         # Check if the function returns the correct content
         self.assertEqual(result, "mocked TTL content")
 
-    @patch("ttl_compare.requests.get")
+    @patch("wikidata_update.ttl_compare.http_client.get")
     def test_get_entity_ttl_failure(self, mock_get):
         # Mock the response from requests.get to simulate a failure
         mock_get.side_effect = requests.exceptions.RequestException
@@ -124,6 +135,133 @@ class TestDiffTTLs(unittest.TestCase):
         result = diff_ttls(self.old_ttl, self.old_ttl, self.entity_id)
         self.assertEqual(result.strip(), "")
 
+    def test_diff_ttls_bce_dates(self):
+        new_ttl = self.old_ttl + 'wd:Q42 wdt:P570 "-0500-01-01T00:00:00Z"^^xsd:dateTime .'
+        result = diff_ttls(self.old_ttl, new_ttl, self.entity_id)
+        self.assertIn('wd:Q42 wdt:P570 "-0500-01-01T00:00:00Z"^^xsd:dateTime .', result)
+
+    def test_parse_ttl_bce_dates_with_rdflib(self):
+        bce_date = 'wd:Q42 wdt:P570 "-0500-01-01T00:00:00Z"^^xsd:dateTime .\n'
+        # the long string makes rdflib parse the second document
+        fallback = 'wd:Q42 rdfs:comment """two\nlines"""@en .'
+        tokenized = parse_ttl(self.old_ttl + bce_date)
+        with_rdflib = parse_ttl(self.old_ttl + bce_date + fallback)
+        self.assertEqual(len(with_rdflib - tokenized), 1)
+        self.assertTrue(tokenized <= with_rdflib)
+
+    def test_parse_ttl_rdflib_keeps_lexical_forms(self):
+        literals = (
+            'wd:Q42 wdt:P1082 "+5"^^xsd:decimal .\n'
+            'wd:Q42 wdt:P1087 "01"^^xsd:integer .\n'
+            'wd:Q42 wdt:P2048 "1.50"^^xsd:double .\n'
+            'wd:Q42 wdt:P569 "1952-03-11T00:00:00Z"^^xsd:dateTime .\n'
+            'wd:Q42 wdt:P570 "-0500-01-01T00:00:00Z"^^xsd:dateTime .\n'
+            "wd:Q42 wikibase:sitelinks 12 .\n"
+        )
+        fallback = 'wd:Q42 rdfs:comment """two\nlines"""@en .'
+        tokenized = parse_ttl(self.old_ttl + literals)
+        with_rdflib = parse_ttl(self.old_ttl + literals + fallback)
+        # only the long string differs, which the tokenizer does not parse
+        self.assertEqual(len(with_rdflib - tokenized), 1)
+        self.assertEqual(tokenized - with_rdflib, frozenset())
+
+    def test_diff_ttls_rdflib_fallback(self):
+        # long strings are not written by Wikidata, rdflib parses this revision
+        new_ttl = self.old_ttl + 'wd:Q42 rdfs:comment """two\nlines"""@en .'
+        result = diff_ttls(self.old_ttl, new_ttl, self.entity_id)
+        self.assertIn('rdfs:comment "two\nlines"@en', result)
+        self.assertNotIn("wdt:P31", result)
+
+
+class TestDiffTTLBlocks(unittest.TestCase):
+
+    HEADER = """@prefix wd: <http://www.wikidata.org/entity/> .
+@prefix wdt: <http://www.wikidata.org/prop/direct/> .
+@prefix p: <http://www.wikidata.org/prop/> .
+@prefix ps: <http://www.wikidata.org/prop/statement/> .
+@prefix s: <http://www.wikidata.org/entity/statement/> .
+@prefix wikibase: <http://wikiba.se/ontology#> .
+
+"""
+    ENTITY = """wd:Q42 a wikibase:Item ;
+\twdt:P31 wd:Q5 .
+
+"""
+
+    @staticmethod
+    def statement(guid, value, prop="P31"):
+        return (
+            f"wd:Q42 p:{prop} s:{guid} .\n\n"
+            f"s:{guid} a wikibase:Statement ;\n\tps:{prop} wd:{value} .\n\n"
+        )
+
+    def test_split_blocks(self):
+        header, blocks = split_blocks(self.HEADER + self.ENTITY + self.statement("Q42-A", "Q5"))
+        self.assertEqual(header.count("@prefix"), 6)
+        self.assertEqual(len(blocks), 3)
+        self.assertIn("wd:Q42 p:P31 s:Q42-A .", blocks)
+
+    def test_only_changed_blocks_are_parsed(self):
+        old_ttl = self.HEADER + self.ENTITY + self.statement("Q42-A", "Q5")
+        new_ttl = old_ttl + self.statement("Q42-B", "Q36180", "P106")
+        with patch(
+            "wikidata_update.ttl_compare.ttl_tokenizer.iter_ttl_triples",
+            wraps=ttl_compare.ttl_tokenizer.iter_ttl_triples,
+        ) as mock_iter:
+            removed, added = diff_ttl_blocks(old_ttl, new_ttl)
+        # the header and the two new blocks
+        self.assertEqual(mock_iter.call_count, 3)
+        self.assertEqual(removed, set())
+        self.assertEqual(
+            added, set(parse_ttl(self.HEADER + self.statement("Q42-B", "Q36180", "P106")))
+        )
+
+    def test_triple_kept_in_unchanged_block(self):
+        # the truthy triple moves to another block of the same subject
+        old_ttl = self.HEADER + self.ENTITY + "wd:Q42 wdt:P21 wd:Q6581097 .\n"
+        new_ttl = self.HEADER + "wd:Q42 a wikibase:Item .\n\n" + "wd:Q42 wdt:P21 wd:Q6581097 ;\n\twdt:P31 wd:Q5 .\n"
+        removed, added = diff_ttl_blocks(
+            old_ttl + "wd:Q42 wdt:P31 wd:Q5 .\n", new_ttl + "wd:Q42 wdt:P31 wd:Q5 .\n"
+        )
+        self.assertEqual(removed, set())
+        self.assertEqual(added, set())
+
+    def test_same_output_as_full_diff(self):
+        old_ttl = self.HEADER + self.ENTITY + self.statement("Q42-A", "Q5")
+        new_ttl = self.HEADER + self.ENTITY + self.statement("Q42-A", "Q6")
+        full = ttl_compare.diff_triples(parse_ttl(old_ttl), parse_ttl(new_ttl), "Q42")
+        self.assertEqual(diff_ttls(old_ttl, new_ttl, "Q42"), full)
+
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    def test_main_without_graph_cache(self, mock_get_entity_ttl):
+        revisions = {
+            1: self.HEADER + self.ENTITY + self.statement("Q42-A", "Q5"),
+            2: self.HEADER + self.ENTITY + self.statement("Q42-A", "Q6"),
+        }
+        mock_get_entity_ttl.side_effect = lambda entity_id, revision_id: revisions[revision_id]
+        max_triples = ttl_compare.graph_cache.MAX_TRIPLES
+        ttl_compare.graph_cache.configure(0)
+        try:
+            result = main("Q42", 1, 2, False, False)
+        finally:
+            ttl_compare.graph_cache.configure(max_triples)
+        self.assertIn("s:Q42-A ps:P31 wd:Q5 .", result)
+        self.assertIn("s:Q42-A ps:P31 wd:Q6 .", result)
+
+
+class TestDiffBackend(unittest.TestCase):
+
+    def tearDown(self):
+        ttl_compare.DIFF_BACKEND = "set"
+
+    @unittest.skipUnless(ttl_compare.hash_diff.available(), "numpy is not installed")
+    def test_numpy_backend_same_output(self):
+        old_triples = parse_ttl(FULL_PREFIXES_STR + "wd:Q42 wdt:P31 wd:Q5 .\nwd:Q42 wdt:P21 wd:Q6581097 .")
+        new_triples = parse_ttl(FULL_PREFIXES_STR + 'wd:Q42 wdt:P31 wd:Q5 .\nwd:Q42 wdt:P569 "1952-03-11"^^xsd:date .')
+        expected = ttl_compare.diff_triples(old_triples, new_triples, "Q42")
+        ttl_compare.DIFF_BACKEND = "numpy"
+        self.assertEqual(ttl_compare.diff_triples(old_triples, new_triples, "Q42"), expected)
+
 
 class TestTriplesToSparql(unittest.TestCase):
 
@@ -206,6 +344,112 @@ class TestTriplesToSparql(unittest.TestCase):
         self.assertEqual(result.strip(), expected_sparql.strip())
 
 
+class TestDiffResult(unittest.TestCase):
+
+    def setUp(self):
+        self.removed = [
+            (URIRef("http://www.wikidata.org/entity/Q42"), URIRef("http://www.wikidata.org/prop/direct/P31"), URIRef("http://www.wikidata.org/entity/Q6")),
+            (URIRef("http://www.wikidata.org/entity/Q1"), URIRef("http://www.wikidata.org/prop/direct/P31"), URIRef("http://www.wikidata.org/entity/Q5")),
+        ]
+        self.added = [
+            (URIRef("http://www.wikidata.org/entity/Q42"), URIRef("http://www.wikidata.org/prop/direct/P31"), URIRef("http://www.wikidata.org/entity/Q5")),
+            (URIRef("http://www.wikidata.org/entity/Q42"), URIRef("http://www.w3.org/2002/07/owl#sameAs"), URIRef("http://www.wikidata.org/entity/Q5")),
+        ]
+
+    def test_changes(self):
+        with patch("wikidata_update.ttl_compare.DIFF_RESULT", "changes"):
+            rows = ttl_compare.diff_result(self.removed, self.added, "Q42")
+        # other entities and owl triples are skipped like in the SPARQL update
+        self.assertEqual(rows, [("D",) + self.removed[0], ("A",) + self.added[0]])
+
+    def test_changes_to_sparql(self):
+        with patch("wikidata_update.ttl_compare.DIFF_RESULT", "changes"):
+            rows = ttl_compare.diff_result(self.removed, self.added, "Q42")
+        self.assertEqual(
+            ttl_compare.changes_to_sparql(rows, "Q42"),
+            ttl_compare.diff_result(self.removed, self.added, "Q42"),
+        )
+
+
+class TestGroupTriples(unittest.TestCase):
+
+    def setUp(self):
+        statement = "http://www.wikidata.org/entity/statement/Q42-1"
+        self.triples = [
+            (URIRef(statement), URIRef("http://www.wikidata.org/prop/statement/P31"), URIRef("http://www.wikidata.org/entity/Q5")),
+            (URIRef("http://www.wikidata.org/entity/Q42"), URIRef("http://www.wikidata.org/prop/direct/P31"), URIRef("http://www.wikidata.org/entity/Q5")),
+            (URIRef(statement), URIRef("http://wikiba.se/ontology#rank"), URIRef("http://wikiba.se/ontology#NormalRank")),
+            (URIRef("http://www.wikidata.org/entity/Q42"), URIRef("http://www.w3.org/2000/01/rdf-schema#label"), Literal("Douglas Adams", lang="en")),
+            (URIRef("http://www.wikidata.org/entity/Q42"), URIRef("http://www.w3.org/2000/01/rdf-schema#label"), Literal('Дуглас "Адамс"', lang="ru")),
+        ]
+
+    def test_group_triples(self):
+        with patch("wikidata_update.ttl_compare.GROUP_TRIPLES", True):
+            result = triples_to_sparql(self.triples, "INSERT", "Q42")
+        self.assertEqual(
+            result,
+            "\nINSERT {\n"
+            ' s:Q42-1 ps:P31 wd:Q5 ;\n'
+            "  wikibase:rank wikibase:NormalRank .\n"
+            ' wd:Q42 rdfs:label "Douglas Adams"@en, "Дуглас \\"Адамс\\""@ru ;\n'
+            "  wdt:P31 wd:Q5 .\n"
+            "}",
+        )
+
+    def test_same_triples_as_ungrouped(self):
+        prefixes = "".join(
+            f"@prefix {prefix}: <{uri}> .\n" for uri, prefix in ttl_compare.PREFIXES.items()
+        )
+        graphs = []
+        for group in (False, True):
+            with patch("wikidata_update.ttl_compare.GROUP_TRIPLES", group):
+                body = triples_to_sparql(self.triples, "DELETE", "Q42")
+            graphs.append(Graph().parse(data=prefixes + body[len("\nDELETE {"):-1], format="turtle"))
+        self.assertEqual(len(graphs[1]), len(self.triples))
+        self.assertEqual(set(graphs[0]), set(graphs[1]))
+
+    def test_empty(self):
+        self.assertEqual(ttl_compare.group_triples([]), "")
+        with patch("wikidata_update.ttl_compare.GROUP_TRIPLES", True):
+            self.assertEqual(triples_to_sparql([], "INSERT", "Q42"), "\nINSERT {\n\n}")
+
+
+class TestSerializeTerm(unittest.TestCase):
+
+    def setUp(self):
+        ttl_compare.serialize_term.cache_clear()
+
+    def test_repeated_terms_are_serialized_once(self):
+        subject = URIRef("http://www.wikidata.org/entity/Q42")
+        predicate = URIRef("http://www.wikidata.org/prop/direct/P31")
+        triples = [
+            (subject, predicate, URIRef(f"http://www.wikidata.org/entity/Q{i % 3}"))
+            for i in range(30)
+        ]
+        with patch("wikidata_update.ttl_compare.format_object_for_sparql", wraps=format_object_for_sparql) as formatter:
+            triples_to_sparql(triples, "INSERT", "Q42")
+        self.assertEqual(formatter.call_count, 3)
+        self.assertEqual(ttl_compare.serialize_term.cache_info().currsize, 5)
+
+    def test_positions(self):
+        rdf_type = URIRef("http://www.w3.org/1999/02/22-rdf-syntax-ns#type")
+        self.assertEqual(ttl_compare.serialize_term(rdf_type, ttl_compare.PREDICATE), "a")
+        self.assertEqual(ttl_compare.serialize_term(rdf_type, ttl_compare.SUBJECT), "rdf:type")
+        self.assertIsNone(ttl_compare.serialize_term(URIRef("http://www.w3.org/2002/07/owl#Thing")))
+
+    def test_literals_are_not_confused_with_iris(self):
+        iri = URIRef("http://www.wikidata.org/entity/Q5")
+        self.assertEqual(ttl_compare.serialize_term(iri), "wd:Q5")
+        self.assertEqual(ttl_compare.serialize_term(Literal(str(iri))), '"wd:Q5"')
+
+    def test_printed_output_is_returned_output(self):
+        triples = [(f"wd:Q42", "wdt:P31", "wd:Q5")]
+        with patch("wikidata_update.ttl_compare.PRINT_OUTPUT", True), patch("builtins.print") as printer:
+            result = triples_to_sparql(triples, "INSERT", "Q42")
+        printer.assert_called_once_with(result)
+        self.assertEqual(result, "\nINSERT {\n wd:Q42 wdt:P31 wd:Q5 .\n}")
+
+
 class TestFormatObjectForSparql(unittest.TestCase):
 
     def test_format_literal_with_quotes(self):
@@ -304,6 +548,31 @@ class TestReplacePrefixes(unittest.TestCase):
         result = replace_prefixes(url)
         self.assertEqual(result, expected)
 
+    def test_replace_prefixes_longest_namespace(self):
+        self.assertEqual(
+            replace_prefixes("http://www.wikidata.org/entity/statement/Q42-A"), "s:Q42-A"
+        )
+        self.assertEqual(
+            replace_prefixes("http://www.wikidata.org/prop/qualifier/value/P580"), "pqv:P580"
+        )
+        self.assertEqual(replace_prefixes("http://www.wikidata.org/prop/P31"), "p:P31")
+
+    def test_same_result_as_linear_replacement(self):
+        from wikidata_update.benchmark_prefixes import linear_replace_prefixes, sample_terms
+
+        terms = sample_terms(40) + [
+            "http://wikiba.se/ontology#Statement",
+            "http://www.wikidata.org/prop/direct-normalized/P214",
+            "see http://schema.org/ and http://www.wikidata.org/value/abc",
+        ]
+        for term in terms:
+            self.assertEqual(replace_prefixes(term), linear_replace_prefixes(term))
+
+    def test_replace_prefixes_rdflib_terms(self):
+        result = replace_prefixes(Literal("http://www.wikidata.org/entity/Q42"))
+        self.assertEqual(result, "wd:Q42")
+        self.assertIs(type(result), str)
+
 
 class TestHasPrefix(unittest.TestCase):
 
@@ -344,19 +613,31 @@ class TestHasPrefix(unittest.TestCase):
         result = has_prefix(element)
         self.assertFalse(result)
 
+    def test_same_result_as_linear_scan(self):
+        from wikidata_update.benchmark_prefixes import linear_has_prefix
+
+        for element in ("wikibase:statement:x", "wikibase:Item", "xsd:", "wd", ":Q42", "rdfs:label"):
+            self.assertEqual(has_prefix(element), linear_has_prefix(element))
+
 
 class TestMainFunction(unittest.TestCase):
 
-    @patch("ttl_compare.get_entity_ttl")
-    @patch("ttl_compare.diff_ttls")
-    def test_main_function(self, mock_diff_ttls, mock_get_entity_ttl):
-        # Mock the responses from get_entity_ttl
-        mock_get_entity_ttl.side_effect = [
-            "mocked old TTL content",
-            "mocked new TTL content",
-        ]
-        # Mock the response from diff_ttls
-        mock_diff_ttls.return_value = "mocked SPARQL update"
+    def setUp(self):
+        ttl_compare.graph_cache.clear()
+        self.revisions = {
+            123455: FULL_PREFIXES_STR + "wd:Q42 wdt:P31 wd:Q5 .",
+            123456: FULL_PREFIXES_STR + "wd:Q42 wdt:P31 wd:Q5 .\nwd:Q42 wdt:P21 wd:Q6581097 .",
+            123457: FULL_PREFIXES_STR + 'wd:Q42 wdt:P31 wd:Q5 .\nwd:Q42 wdt:P569 "1952-03-11"^^xsd:date .',
+        }
+
+    def tearDown(self):
+        ttl_compare.graph_cache.clear()
+
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    @patch("wikidata_update.ttl_compare.diff_triples")
+    def test_main_function(self, mock_diff_triples, mock_get_entity_ttl):
+        mock_get_entity_ttl.side_effect = lambda entity_id, revision_id: self.revisions[revision_id]
+        mock_diff_triples.return_value = "mocked SPARQL update"
 
         entity_id = "Q42"
         old_revision_id = 123456
@@ -369,26 +650,22 @@ class TestMainFunction(unittest.TestCase):
         mock_get_entity_ttl.assert_any_call(entity_id, old_revision_id)
         mock_get_entity_ttl.assert_any_call(entity_id, new_revision_id)
 
-        # Check if diff_ttls was called with the correct arguments
-        mock_diff_ttls.assert_called_once_with(
-            "mocked old TTL content", "mocked new TTL content", entity_id
-        )
+        # Check if diff_triples was called with the parsed revisions
+        old_triples, new_triples, called_entity_id = mock_diff_triples.call_args[0]
+        self.assertEqual(len(old_triples), 2)
+        self.assertEqual(len(new_triples), 2)
+        self.assertEqual(called_entity_id, entity_id)
 
         # Check if the function returns the correct content
         self.assertEqual(result, "mocked SPARQL update")
 
-    @patch("ttl_compare.get_entity_ttl")
-    @patch("ttl_compare.diff_ttls")
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    @patch("wikidata_update.ttl_compare.diff_triples")
     def test_main_function_with_old_revision_id_zero(
-        self, mock_diff_ttls, mock_get_entity_ttl
+        self, mock_diff_triples, mock_get_entity_ttl
     ):
-        # Mock the response from get_entity_ttl for the new revision
-        mock_get_entity_ttl.side_effect = [
-            "",  # old_ttl should be empty when old_revision_id is 0
-            "mocked new TTL content",
-        ]
-        # Mock the response from diff_ttls
-        mock_diff_ttls.return_value = "mocked SPARQL update"
+        mock_get_entity_ttl.side_effect = lambda entity_id, revision_id: self.revisions[revision_id]
+        mock_diff_triples.return_value = "mocked SPARQL update"
 
         entity_id = "Q42"
         old_revision_id = 0
@@ -397,16 +674,262 @@ class TestMainFunction(unittest.TestCase):
 
         result = main(entity_id, old_revision_id, new_revision_id, debug)
 
-        # Check if get_entity_ttl was called with the correct arguments
-        mock_get_entity_ttl.assert_any_call(entity_id, old_revision_id)
-        mock_get_entity_ttl.assert_any_call(entity_id, new_revision_id)
-
-        # Check if diff_ttls was called with the correct arguments
-        mock_diff_ttls.assert_called_once_with("", "mocked new TTL content", entity_id)
+        # the old revision does not exist, so it is not downloaded
+        mock_get_entity_ttl.assert_called_once_with(entity_id, new_revision_id)
+        old_triples, new_triples, _ = mock_diff_triples.call_args[0]
+        self.assertEqual(old_triples, frozenset())
+        self.assertEqual(len(new_triples), 2)
 
         # Check if the function returns the correct content
         self.assertEqual(result, "mocked SPARQL update")
 
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    def test_main_function_reuses_parsed_revisions(self, mock_get_entity_ttl):
+        mock_get_entity_ttl.side_effect = lambda entity_id, revision_id: self.revisions[revision_id]
+
+        # the listing is newest first, the revision 123456 is used by both changes
+        first = main("Q42", 123456, 123457, False, False)
+        second = main("Q42", 123455, 123456, False, False)
+
+        self.assertEqual(mock_get_entity_ttl.call_count, 3)
+        self.assertIn("wdt:P569", first)
+        self.assertIn("wdt:P21", second)
+        self.assertEqual(ttl_compare.graph_cache.HITS, 1)
+
+
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    def test_main_function_fetch_error(self, mock_get_entity_ttl):
+        mock_get_entity_ttl.side_effect = requests.exceptions.ConnectionError("offline")
+        # a failed fetch is not reported as an entity without changes
+        self.assertIsNone(main("Q42", 123456, 123457, False, False))
+
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    def test_main_function_parse_error(self, mock_get_entity_ttl):
+        mock_get_entity_ttl.return_value = "wd:Q42 wdt:P31 ."
+        self.assertIsNone(main("Q42", 123456, 123457, False, False))
+
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    def test_main_function_interrupt_is_not_swallowed(self, mock_get_entity_ttl):
+        mock_get_entity_ttl.side_effect = KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            main("Q42", 123456, 123457, False, False)
+
+
+class TestMappedRevisions(unittest.TestCase):
+
+    def setUp(self):
+        ttl_compare.graph_cache.clear()
+        ttl_compare.REVISION_SOURCE = "json"
+
+    def tearDown(self):
+        ttl_compare.graph_cache.clear()
+        ttl_compare.REVISION_SOURCE = "ttl"
+
+    @staticmethod
+    def make_entity(revision_id, label):
+        return {
+            "type": "item",
+            "id": "Q42",
+            "lastrevid": revision_id,
+            "modified": "2024-12-19T15:08:49Z",
+            "labels": {"en": {"language": "en", "value": label}},
+            "claims": {},
+        }
+
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    @patch("wikidata_update.ttl_compare.revision_content.fetch_revisions")
+    def test_main_maps_entity_json(self, mock_fetch, mock_get_entity_ttl):
+        entities = {
+            123456: self.make_entity(123456, "Douglas Adams"),
+            123457: self.make_entity(123457, "Douglas Noel Adams"),
+        }
+        mock_fetch.side_effect = lambda revision_ids: {
+            revision_id: entities[revision_id] for revision_id in revision_ids
+        }
+
+        result = main("Q42", 123456, 123457, False, False)
+
+        mock_get_entity_ttl.assert_not_called()
+        self.assertIn('rdfs:label "Douglas Adams"@en', result)
+        self.assertIn('rdfs:label "Douglas Noel Adams"@en', result)
+        self.assertIn("schema:version", result)
+
+    @patch("wikidata_update.ttl_compare.revision_content.fetch_revisions")
+    def test_missing_revision(self, mock_fetch):
+        mock_fetch.return_value = {}
+        with self.assertRaises(ValueError):
+            ttl_compare.get_revision_triples("Q42", 123456)
+
+
+class TestNTriples(unittest.TestCase):
+
+    OLD_NT = """
+<http://www.wikidata.org/entity/Q42> <http://www.w3.org/2000/01/rdf-schema#label> "Douglas Adams"@en .
+<http://www.wikidata.org/entity/Q42> <http://www.wikidata.org/prop/direct/P31> <http://www.wikidata.org/entity/Q5> .
+<https://www.wikidata.org/wiki/Special:EntityData/Q42> <http://schema.org/version> "123456"^^<http://www.w3.org/2001/XMLSchema#integer> .
+"""
+    NEW_NT = """
+<http://www.wikidata.org/entity/Q42> <http://www.w3.org/2000/01/rdf-schema#label> "Douglas \\"Noel\\" Adams \\u00E9"@en .
+<http://www.wikidata.org/entity/Q42> <http://www.wikidata.org/prop/direct/P31> <http://www.wikidata.org/entity/Q5> .
+<http://www.wikidata.org/entity/Q42> <http://www.wikidata.org/prop/direct/P569> "-0500-01-01T00:00:00Z"^^<http://www.w3.org/2001/XMLSchema#dateTime> .
+<https://www.wikidata.org/wiki/Special:EntityData/Q42> <http://schema.org/version> "123457"^^<http://www.w3.org/2001/XMLSchema#integer> .
+"""
+
+    def test_parse_nt_line(self):
+        s, p, o = parse_nt_line(
+            '<http://www.wikidata.org/entity/Q42> <http://www.w3.org/2000/01/rdf-schema#label> "a\\tb"@en-gb .'
+        )
+        self.assertEqual(str(s), "http://www.wikidata.org/entity/Q42")
+        self.assertEqual(o, Literal("a\tb", lang="en-gb"))
+
+    def test_parse_invalid_line(self):
+        with self.assertRaises(ValueError):
+            parse_nt_line("<http://www.wikidata.org/entity/Q42> wdt:P31 wd:Q5 .")
+
+    def test_same_output_as_ttl_diff(self):
+        old_graph = Graph().parse(data=self.OLD_NT, format="nt")
+        new_graph = Graph().parse(data=self.NEW_NT, format="nt")
+        old_ttl = old_graph.serialize(format="turtle")
+        new_ttl = new_graph.serialize(format="turtle")
+
+        nt_result = diff_nts(self.OLD_NT, self.NEW_NT, "Q42")
+        ttl_result = diff_ttls(old_ttl, new_ttl, "Q42")
+
+        self.assertEqual(sorted(nt_result.splitlines()), sorted(ttl_result.splitlines()))
+        self.assertIn('rdfs:label "Douglas \\"Noel\\" Adams \u00e9"@en', nt_result)
+        self.assertIn('"-0500-01-01T00:00:00Z"^^xsd:dateTime', nt_result)
+        self.assertNotIn("wdt:P31", nt_result)
+
+    @patch("wikidata_update.ttl_compare.get_entity_ttl")
+    @patch("wikidata_update.ttl_compare.get_entity_nt")
+    def test_main_diffs_lines(self, mock_get_entity_nt, mock_get_entity_ttl):
+        ttl_compare.graph_cache.clear()
+        ttl_compare.REVISION_SOURCE = "ntriples"
+        revisions = {123456: self.OLD_NT, 123457: self.NEW_NT}
+        mock_get_entity_nt.side_effect = lambda entity_id, revision_id: revisions[revision_id]
+        try:
+            result = main("Q42", 123456, 123457, False, False)
+        finally:
+            ttl_compare.REVISION_SOURCE = "ttl"
+            ttl_compare.graph_cache.clear()
+
+        mock_get_entity_ttl.assert_not_called()
+        self.assertEqual(result, diff_nts(self.OLD_NT, self.NEW_NT, "Q42"))
+
+
+class TestDiffTTLPairs(unittest.TestCase):
+
+    def tearDown(self):
+        shutdown_process_pool()
+
+    def test_diff_ttl_pairs_matches_diff_ttls(self):
+        old_ttl = FULL_PREFIXES_STR + "wd:Q42 wdt:P31 wd:Q5 ."
+        new_ttl = FULL_PREFIXES_STR + 'wd:Q42 wdt:P31 wd:Q5 .\nwd:Q42 wdt:P569 "1952-03-11"^^xsd:date .'
+        ttl_pairs = [
+            (old_ttl, new_ttl, "Q42"),
+            (new_ttl, old_ttl, "Q42"),
+            ("", old_ttl, "Q42"),
+        ]
+
+        result = list(diff_ttl_pairs(ttl_pairs, processes=2, chunksize=2))
+
+        self.assertEqual(
+            result, [diff_ttls(old, new, entity_id) for old, new, entity_id in ttl_pairs]
+        )
+        self.assertIn("wdt:P569", result[0].split("INSERT")[1])
+        self.assertIn("wdt:P569", result[1].split("INSERT")[0])
+
+
+class TestAsyncDiff(unittest.TestCase):
+
+    def setUp(self):
+        ttl_compare.graph_cache.clear()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def tearDown(self):
+        ttl_compare.graph_cache.clear()
+
+    async def fake_get_text_async(self, url, params=None, session=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            # also when the download is cancelled
+            self.in_flight -= 1
+        return url.split("revision=")[1].split("&")[0]
+
+    @staticmethod
+    def fake_diff_triples(old_triples, new_triples, entity_id):
+        old = "".join(old_triples)
+        new = "".join(new_triples)
+        return f"{entity_id}:{old}->{new}"
+
+    @patch("wikidata_update.ttl_compare.parse_ttl", lambda ttl: frozenset([ttl]))
+    @patch("wikidata_update.ttl_compare.diff_triples")
+    def test_diff_revisions_async_fetches_concurrently(self, mock_diff_triples):
+        mock_diff_triples.side_effect = self.fake_diff_triples
+        with patch("wikidata_update.ttl_compare.http_client.get_text_async", self.fake_get_text_async):
+            result = asyncio.run(diff_revisions_async("Q42", 1, 2))
+
+        self.assertEqual(result, "Q42:1->2")
+        self.assertEqual(self.max_in_flight, 2)
+
+    @patch("wikidata_update.ttl_compare.parse_ttl", lambda ttl: frozenset([ttl]))
+    @patch("wikidata_update.ttl_compare.diff_triples")
+    def test_diff_revisions_async_old_revision_zero(self, mock_diff_triples):
+        mock_diff_triples.side_effect = self.fake_diff_triples
+        with patch("wikidata_update.ttl_compare.http_client.get_text_async", self.fake_get_text_async):
+            result = asyncio.run(diff_revisions_async("Q42", 0, 2))
+
+        self.assertEqual(result, "Q42:->2")
+
+    @patch("wikidata_update.ttl_compare.parse_ttl", lambda ttl: frozenset([ttl]))
+    @patch("wikidata_update.ttl_compare.http_client.create_async_session")
+    @patch("wikidata_update.ttl_compare.diff_triples")
+    def test_diff_changes_respects_limit_and_order(
+        self, mock_diff_triples, mock_create_async_session
+    ):
+        mock_create_async_session.return_value = None
+        mock_diff_triples.side_effect = self.fake_diff_triples
+        changes = [
+            {"title": f"Q{i}", "old_revid": 10 * i, "revid": 10 * i + 1}
+            for i in range(1, 11)
+        ]
+        with patch("wikidata_update.ttl_compare.http_client.get_text_async", self.fake_get_text_async):
+            result = list(diff_changes(changes, limit=3))
+
+        self.assertEqual(
+            result, [f"Q{i}:{10 * i}->{10 * i + 1}" for i in range(1, 11)]
+        )
+        self.assertLessEqual(self.max_in_flight, 3)
+
+    @patch("wikidata_update.ttl_compare.parse_ttl", lambda ttl: frozenset([ttl]))
+    @patch("wikidata_update.ttl_compare.http_client.create_async_session")
+    @patch("wikidata_update.ttl_compare.diff_triples")
+    def test_diff_changes_yields_before_listing_everything(
+        self, mock_diff_triples, mock_create_async_session
+    ):
+        mock_create_async_session.return_value = None
+        mock_diff_triples.side_effect = self.fake_diff_triples
+        listed = []
+
+        def changes():
+            for i in range(1, 101):
+                listed.append(i)
+                yield {"title": f"Q{i}", "old_revid": 10 * i, "revid": 10 * i + 1}
+
+        with patch("wikidata_update.ttl_compare.http_client.get_text_async", self.fake_get_text_async):
+            change_diffs = diff_changes(changes(), limit=3)
+            self.assertEqual(next(change_diffs), "Q1:10->11")
+            self.assertEqual(len(listed), 3)
+            self.assertEqual(next(change_diffs), "Q2:20->21")
+            change_diffs.close()
+
+        self.assertEqual(len(listed), 4)
+        self.assertEqual(self.in_flight, 0)
+
 
 if __name__ == "__main__":
     unittest.main()
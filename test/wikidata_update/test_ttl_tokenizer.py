@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.ttl_tokenizer import iter_ttl_triples
+from wikidata_update.ttl_tokenizer import from_rdflib
+from wikidata_update.ttl_tokenizer import to_rdflib
+from wikidata_update.ttl_tokenizer import TurtleSyntaxError
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import XSD
+
+# the layout Wikibase writes: one subject block per node, tabs, ; and , abbreviations
+WIKIDATA_TTL = """@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix schema: <http://schema.org/> .
+@prefix wikibase: <http://wikiba.se/ontology#> .
+@prefix wd: <http://www.wikidata.org/entity/> .
+@prefix data: <https://www.wikidata.org/wiki/Special:EntityData/> .
+@prefix s: <http://www.wikidata.org/entity/statement/> .
+@prefix v: <http://www.wikidata.org/value/> .
+@prefix wdt: <http://www.wikidata.org/prop/direct/> .
+@prefix p: <http://www.wikidata.org/prop/> .
+@prefix ps: <http://www.wikidata.org/prop/statement/> .
+@prefix psv: <http://www.wikidata.org/prop/statement/value/> .
+
+data:Q42 a schema:Dataset ;
+\tschema:about wd:Q42 ;
+\tschema:version "2267876853"^^xsd:integer ;
+\tschema:dateModified "2024-12-19T15:08:49Z"^^xsd:dateTime .
+
+wd:Q42 a wikibase:Item ;
+\trdfs:label "Douglas Adams"@en, "Douglas Adams"@de-ch, "\\u0414\\u0443\\u0433\\u043B\\u0430\\u0441"@ru ;
+\tschema:description "English writer and \\"humorist\\"\\n(1952\\u20132001)"@en ;
+\twdt:P31 wd:Q5 ;
+\twdt:P569 "-0500-01-01T00:00:00Z"^^xsd:dateTime ;
+\tp:P569 s:Q42-D8404CDA-56A1-4334-BD4E-5A8D9A8D1C2E .
+
+s:Q42-D8404CDA-56A1-4334-BD4E-5A8D9A8D1C2E a wikibase:Statement,
+\t\twikibase:BestRank ;
+\twikibase:rank wikibase:NormalRank ;
+\tps:P569 "-0500-01-01T00:00:00Z"^^xsd:dateTime ;
+\tpsv:P569 v:5a1e4d0a0b7d52ecb1b0f6a9ae1c7d64 .
+
+<https://en.wikipedia.org/wiki/Douglas_Adams> a schema:Article ;
+\tschema:about wd:Q42 ;
+\tschema:inLanguage "en" .
+"""
+
+
+class TestIterTTLTriples(unittest.TestCase):
+
+    def test_same_triples_as_rdflib(self):
+        triples = set(iter_ttl_triples(WIKIDATA_TTL))
+        # rdflib cannot read negative years, compare the document without them
+        ttl = WIKIDATA_TTL.replace("-0500-01-01", "0500-01-01")
+        expected = set(Graph().parse(data=ttl, format="turtle"))
+        self.assertEqual(
+            {
+                tuple(to_rdflib(term) for term in triple)
+                for triple in triples
+                if "-0500" not in str(triple[2])
+            },
+            {triple for triple in expected if "0500" not in str(triple[2])},
+        )
+        self.assertEqual(len(triples), len(expected))
+
+    def test_negative_years(self):
+        triples = set(iter_ttl_triples(WIKIDATA_TTL.encode("utf-8")))
+        self.assertIn(
+            (
+                "http://www.wikidata.org/entity/Q42",
+                "http://www.wikidata.org/prop/direct/P569",
+                ("-0500-01-01T00:00:00Z", None, "http://www.w3.org/2001/XMLSchema#dateTime"),
+            ),
+            triples,
+        )
+
+    def test_escapes(self):
+        triples = set(iter_ttl_triples(WIKIDATA_TTL))
+        descriptions = [o for s, p, o in triples if p == "http://schema.org/description"]
+        self.assertEqual(
+            descriptions, [('English writer and "humorist"\n(1952–2001)', "en", None)]
+        )
+
+    def test_unsupported_turtle(self):
+        for ttl in (
+            '<http://a> <http://b> [ <http://c> "d" ] .',
+            '<http://a> <http://b> """long\nstring""" .',
+            "ex:a <http://b> <http://c> .",
+            "<http://a> <http://b> <http://c>",
+        ):
+            with self.assertRaises(TurtleSyntaxError):
+                list(iter_ttl_triples(ttl))
+
+
+class TestRdflibTerms(unittest.TestCase):
+
+    def test_round_trip(self):
+        for term in (
+            URIRef("http://www.wikidata.org/entity/Q42"),
+            Literal("Douglas Adams", lang="en"),
+            Literal("42", datatype=XSD.integer),
+            Literal("plain"),
+        ):
+            self.assertEqual(to_rdflib(from_rdflib(term)), term)
+
+    def test_rdflib_terms_are_kept(self):
+        term = URIRef("http://www.wikidata.org/entity/Q42")
+        self.assertIs(to_rdflib(term), term)
+
+    def test_bce_dates_are_not_cast(self):
+        lexical = "-0500-01-01T00:00:00Z"
+        with self.assertNoLogs("rdflib.term", "WARNING"):
+            term = to_rdflib((lexical, None, str(XSD.dateTime)))
+        self.assertEqual(term, Literal(lexical, datatype=XSD.dateTime))
+        self.assertEqual(from_rdflib(term), (lexical, None, str(XSD.dateTime)))
+        self.assertEqual(term.n3(), f'"{lexical}"^^<{XSD.dateTime}>')
+
+if __name__ == "__main__":
+    unittest.main()
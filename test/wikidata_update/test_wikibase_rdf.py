@@ -0,0 +1,252 @@
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "src")))
+from wikidata_update.wikibase_rdf import value_hash
+from wikidata_update.wikibase_rdf import clean_time
+from wikidata_update.wikibase_rdf import sitelink_triples
+from wikidata_update.wikibase_rdf import statement_node
+from wikidata_update.wikibase_rdf import truthy_triples
+from wikidata_update.wikibase_rdf import entity_triples
+from wikidata_update.wikibase_rdf import julian_to_gregorian
+from wikidata_update.wikibase_rdf import WD, WDT, WIKIBASE, SCHEMA
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF
+
+
+def time_value(time, precision):
+    return {
+        "type": "time",
+        "value": {
+            "time": time,
+            "timezone": 0,
+            "before": 0,
+            "after": 0,
+            "precision": precision,
+            "calendarmodel": "http://www.wikidata.org/entity/Q1985727",
+        },
+    }
+
+
+TTL = """
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix skos: <http://www.w3.org/2004/02/skos/core#> .
+@prefix schema: <http://schema.org/> .
+@prefix cc: <http://creativecommons.org/ns#> .
+@prefix wikibase: <http://wikiba.se/ontology#> .
+@prefix wd: <http://www.wikidata.org/entity/> .
+@prefix data: <https://www.wikidata.org/wiki/Special:EntityData/> .
+@prefix s: <http://www.wikidata.org/entity/statement/> .
+@prefix v: <http://www.wikidata.org/value/> .
+@prefix wdt: <http://www.wikidata.org/prop/direct/> .
+@prefix p: <http://www.wikidata.org/prop/> .
+@prefix ps: <http://www.wikidata.org/prop/statement/> .
+@prefix psv: <http://www.wikidata.org/prop/statement/value/> .
+
+data:Q1 a schema:Dataset ; schema:about wd:Q1 ;
+    cc:license <http://creativecommons.org/publicdomain/zero/1.0/> ;
+    schema:softwareVersion "1.0.0" ; schema:version "101"^^xsd:integer ;
+    schema:dateModified "2024-12-19T15:25:49Z"^^xsd:dateTime ;
+    wikibase:statements "2"^^xsd:integer ; wikibase:sitelinks "0"^^xsd:integer ;
+    wikibase:identifiers "0"^^xsd:integer .
+wd:Q1 a wikibase:Item ; rdfs:label "Example"@en ; skos:prefLabel "Example"@en ;
+    schema:name "Example"@en ; schema:description "an example"@en ;
+    wdt:P31 wd:Q5 ; p:P31 s:Q1-A ;
+    wdt:P570 "2021-01-01T00:00:00Z"^^xsd:dateTime ; p:P570 s:Q1-C .
+s:Q1-A a wikibase:Statement, wikibase:BestRank ;
+    wikibase:rank wikibase:NormalRank ;
+    ps:P31 wd:Q5 .
+s:Q1-C a wikibase:Statement, wikibase:BestRank ;
+    wikibase:rank wikibase:NormalRank ;
+    ps:P570 "2021-01-01T00:00:00Z"^^xsd:dateTime ;
+    psv:P570 v:068defc300d06ed22eb72f44c2fe8914 .
+v:068defc300d06ed22eb72f44c2fe8914 a wikibase:TimeValue ;
+    wikibase:timeValue "2021-01-01T00:00:00Z"^^xsd:dateTime ;
+    wikibase:timePrecision "9"^^xsd:integer ;
+    wikibase:timeTimezone "0"^^xsd:integer ;
+    wikibase:timeCalendarModel wd:Q1985727 .
+"""
+
+
+def quantity_value(amount, unit):
+    return {"type": "quantity", "value": {"amount": amount, "unit": unit}}
+
+
+def statement(guid, rank, value):
+    return {
+        "id": guid,
+        "rank": rank,
+        "mainsnak": {
+            "snaktype": "value",
+            "property": "P31",
+            "datatype": "wikibase-item",
+            "datavalue": {"type": "wikibase-entityid", "value": {"id": value}},
+        },
+    }
+
+
+class TestValueHash(unittest.TestCase):
+    # the value nodes of these values were taken from the Wikidata TTL
+
+    def test_time_value_hash(self):
+        self.assertEqual(
+            value_hash(time_value("+2021-00-00T00:00:00Z", 9)),
+            "068defc300d06ed22eb72f44c2fe8914",
+        )
+
+    def test_quantity_value_hash(self):
+        self.assertEqual(
+            value_hash(quantity_value("+33.51", "http://www.wikidata.org/entity/Q712226")),
+            "1fbce37c693fca5b2295e7b58bcc079d",
+        )
+        self.assertEqual(
+            value_hash(quantity_value("+175", "http://www.wikidata.org/entity/Q174728")),
+            "e896124cd2c5012bd7bbe977021a6ace",
+        )
+
+    def test_unitless_quantity_value_hash(self):
+        self.assertEqual(
+            value_hash(quantity_value("+11960", "1")),
+            "ad4f7b2b9978e8191e015783bba44486",
+        )
+
+    def test_simple_values_have_no_hash(self):
+        self.assertIsNone(value_hash({"type": "string", "value": "abc"}))
+
+
+class TestCleanTime(unittest.TestCase):
+
+    def test_year_precision(self):
+        self.assertEqual(
+            clean_time(time_value("+2021-00-00T00:00:00Z", 9)["value"]),
+            "2021-01-01T00:00:00Z",
+        )
+
+    def test_day_precision(self):
+        self.assertEqual(
+            clean_time(time_value("+1952-03-11T00:00:00Z", 11)["value"]),
+            "1952-03-11T00:00:00Z",
+        )
+
+    def test_bce_years_use_xsd11_numbering(self):
+        self.assertEqual(
+            clean_time(time_value("-0500-00-00T00:00:00Z", 9)["value"]),
+            "-0499-01-01T00:00:00Z",
+        )
+        self.assertEqual(
+            clean_time(time_value("-0001-00-00T00:00:00Z", 9)["value"]),
+            "0000-01-01T00:00:00Z",
+        )
+
+
+class TestJulianToGregorian(unittest.TestCase):
+
+    def test_gregorian_reform(self):
+        # the day after 4 October 1582 (Julian) was 15 October 1582 (Gregorian)
+        self.assertEqual(julian_to_gregorian(1582, 10, 4), (1582, 10, 14))
+        self.assertEqual(julian_to_gregorian(1582, 10, 5), (1582, 10, 15))
+
+    def test_julian_day_precision_is_converted(self):
+        value = time_value("+1643-01-04T00:00:00Z", 11)["value"]
+        value["calendarmodel"] = "http://www.wikidata.org/entity/Q1985786"
+        self.assertEqual(clean_time(value), "1643-01-14T00:00:00Z")
+
+    def test_julian_year_precision_is_kept(self):
+        value = time_value("+1643-00-00T00:00:00Z", 9)["value"]
+        value["calendarmodel"] = "http://www.wikidata.org/entity/Q1985786"
+        self.assertEqual(clean_time(value), "1643-01-01T00:00:00Z")
+
+
+class TestSitelinkTriples(unittest.TestCase):
+
+    def test_wikipedia_sitelink(self):
+        triples = set(
+            sitelink_triples("Q42", "enwiki", {"site": "enwiki", "title": "Douglas Adams", "badges": []})
+        )
+        article = URIRef("https://en.wikipedia.org/wiki/Douglas_Adams")
+        self.assertIn((article, SCHEMA.about, WD.Q42), triples)
+        self.assertIn((article, SCHEMA.name, Literal("Douglas Adams", lang="en")), triples)
+        self.assertIn(
+            (URIRef("https://en.wikipedia.org/"), WIKIBASE.wikiGroup, Literal("wikipedia")),
+            triples,
+        )
+
+    def test_commons_sitelink(self):
+        triples = set(
+            sitelink_triples(
+                "Q1",
+                "commonswiki",
+                {"title": "Category:Stations of Chengdu Metro Line 27", "badges": []},
+            )
+        )
+        article = URIRef(
+            "https://commons.wikimedia.org/wiki/Category:Stations_of_Chengdu_Metro_Line_27"
+        )
+        self.assertIn((article, SCHEMA.inLanguage, Literal("en")), triples)
+        self.assertIn(
+            (URIRef("https://commons.wikimedia.org/"), WIKIBASE.wikiGroup, Literal("commons")),
+            triples,
+        )
+
+
+class TestTruthyTriples(unittest.TestCase):
+
+    def test_preferred_rank_wins(self):
+        statements = [
+            statement("Q1$a", "normal", "Q5"),
+            statement("Q1$b", "preferred", "Q6"),
+            statement("Q1$c", "deprecated", "Q7"),
+        ]
+        triples = set(truthy_triples("Q1", statements))
+        self.assertEqual(
+            triples,
+            {
+                (statement_node("Q1$b"), RDF.type, WIKIBASE.BestRank),
+                (WD.Q1, WDT.P31, WD.Q6),
+            },
+        )
+
+    def test_somevalue_is_left_out(self):
+        unknown = statement("Q1$a", "normal", "Q5")
+        unknown["mainsnak"] = {"snaktype": "somevalue", "property": "P31", "hash": "abc"}
+        triples = set(truthy_triples("Q1", [unknown]))
+        self.assertEqual(triples, {(statement_node("Q1$a"), RDF.type, WIKIBASE.BestRank)})
+
+class TestEntityTriples(unittest.TestCase):
+
+    def test_same_triples_as_ttl(self):
+        time_statement = {
+            "id": "Q1$C",
+            "type": "statement",
+            "rank": "normal",
+            "mainsnak": {
+                "snaktype": "value",
+                "property": "P570",
+                "datatype": "time",
+                "datavalue": time_value("+2021-00-00T00:00:00Z", 9),
+            },
+        }
+        entity = {
+            "type": "item",
+            "id": "Q1",
+            "lastrevid": 101,
+            "modified": "2024-12-19T15:25:49Z",
+            "labels": {"en": {"language": "en", "value": "Example"}},
+            "descriptions": {"en": {"language": "en", "value": "an example"}},
+            "aliases": {},
+            "sitelinks": {},
+            "claims": {
+                "P31": [statement("Q1$A", "normal", "Q5")],
+                "P570": [time_statement],
+            },
+        }
+        self.assertEqual(
+            entity_triples(entity), frozenset(Graph().parse(data=TTL, format="turtle"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()